@@ -0,0 +1,435 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit
+
+BATCH_SIZE = 1000
+READ_CHUNK = 64 * 1024
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ftp': 21}
+FOLDER_SEPARATOR = '/'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    id INTEGER PRIMARY KEY,
+    parent_id INTEGER REFERENCES folders(id),
+    title TEXT NOT NULL,
+    UNIQUE (parent_id, title)
+);
+CREATE TABLE IF NOT EXISTS bookmarks (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    url_hash INTEGER NOT NULL,
+    title TEXT,
+    folder_id INTEGER REFERENCES folders(id),
+    added_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    bookmark_id INTEGER NOT NULL REFERENCES bookmarks(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, bookmark_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bookmarks_url_hash ON bookmarks(url_hash);
+CREATE INDEX IF NOT EXISTS bookmarks_folder ON bookmarks(folder_id);
+CREATE INDEX IF NOT EXISTS tags_bookmark ON tags(bookmark_id);
+"""
+
+def normalize_url(url):
+    # Same page, same key: lowercase scheme and host, no default port, no fragment, "/" for an empty path
+    url = url.strip()
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if ':' in host:
+        host = f'[{host}]'
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f'{host}:{port}'
+    if parts.username:
+        credentials = parts.username + (f':{parts.password}' if parts.password else '')
+        netloc = f'{credentials}@{netloc}'
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+def url_hash(normalized):
+    # 63 bits of a stable hash, so it fits SQLite's signed INTEGER. Collisions are resolved by comparing `normalized`.
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'big') >> 1
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA foreign_keys=ON')
+    return connection
+
+class BookmarkStore:
+    # Bookmarks in SQLite, looked up by a hash of the normalized URL. Every
+    # thread gets its own connection, so imports and exports can stream on a
+    # worker thread while the GUI keeps adding and looking up bookmarks.
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self.connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = connect(self.path)
+        return connection
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def find(self, url):
+        normalized = normalize_url(url)
+        row = self.connection().execute(
+            "SELECT id FROM bookmarks WHERE url_hash = ? AND normalized = ?", (url_hash(normalized), normalized)).fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, url):
+        return self.find(url) is not None
+
+    def __len__(self):
+        return self.connection().execute("SELECT count(*) FROM bookmarks").fetchone()[0]
+
+    def __iter__(self):
+        # URLs in the order they were added; streams, so it is safe on large stores
+        cursor = self.connection().execute("SELECT url FROM bookmarks ORDER BY id")
+        for (url,) in cursor:
+            yield url
+
+    def dated(self):
+        # (url, title, added_at) in the order they were added, streamed like __iter__
+        yield from self.connection().execute("SELECT url, title, added_at FROM bookmarks ORDER BY id")
+
+    def add(self, url, title=None, folder=None, tags=(), added_at=None):
+        # Returns the new id, or None if the URL is already bookmarked
+        with self.connection() as connection:
+            return self.insert(connection, url, title, folder, tags, added_at, {})
+
+    def insert(self, connection, url, title, folder, tags, added_at, folder_cache):
+        normalized = normalize_url(url)
+        digest = url_hash(normalized)
+        if connection.execute("SELECT 1 FROM bookmarks WHERE url_hash = ? AND normalized = ?", (digest, normalized)).fetchone():
+            return None
+        folder_id = self.folder_id(connection, folder, folder_cache) if folder else None
+        cursor = connection.execute(
+            "INSERT INTO bookmarks (url, normalized, url_hash, title, folder_id, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (url, normalized, digest, title, folder_id, time.time() if added_at is None else added_at))
+        bookmark_id = cursor.lastrowid
+        connection.executemany("INSERT OR IGNORE INTO tags (bookmark_id, tag) VALUES (?, ?)",
+                               [(bookmark_id, tag.strip().lower()) for tag in tags if tag.strip()])
+        return bookmark_id
+
+    def folder_id(self, connection, path, cache):
+        # "Toolbar/News" -> id of News inside Toolbar, creating folders on the way
+        if path in cache:
+            return cache[path]
+        parent_id = None
+        for title in path.split(FOLDER_SEPARATOR):
+            row = connection.execute("SELECT id FROM folders WHERE parent_id IS ? AND title = ?", (parent_id, title)).fetchone()
+            if row:
+                parent_id = row[0]
+            else:
+                parent_id = connection.execute("INSERT INTO folders (parent_id, title) VALUES (?, ?)", (parent_id, title)).lastrowid
+        cache[path] = parent_id
+        return parent_id
+
+    def remove(self, url):
+        bookmark_id = self.find(url)
+        if bookmark_id is not None:
+            with self.connection() as connection:
+                connection.execute("DELETE FROM bookmarks WHERE id = ?", (bookmark_id,))
+        return bookmark_id is not None
+
+    def tags(self, url):
+        return [tag for (tag,) in self.connection().execute(
+            "SELECT tags.tag FROM tags JOIN bookmarks ON bookmarks.id = tags.bookmark_id "
+            "WHERE bookmarks.url_hash = ? AND bookmarks.normalized = ? ORDER BY tags.tag",
+            (url_hash(normalize_url(url)), normalize_url(url)))]
+
+    def tagged(self, tag):
+        return [url for (url,) in self.connection().execute(
+            "SELECT bookmarks.url FROM tags JOIN bookmarks ON bookmarks.id = tags.bookmark_id WHERE tags.tag = ? ORDER BY bookmarks.id",
+            (tag.lower(),))]
+
+    def folder_paths(self):
+        # id -> "Parent/Child" for every folder; folders are few next to bookmarks
+        rows = {folder_id: (parent_id, title) for folder_id, parent_id, title in self.connection().execute("SELECT id, parent_id, title FROM folders")}
+        paths = {}
+        def path_of(folder_id):
+            if folder_id not in paths:
+                parent_id, title = rows[folder_id]
+                paths[folder_id] = title if parent_id is None else path_of(parent_id) + FOLDER_SEPARATOR + title
+            return paths[folder_id]
+        for folder_id in rows:
+            path_of(folder_id)
+        return paths
+
+    def in_folder(self, path):
+        connection = self.connection()
+        folder_id = None
+        for title in path.split(FOLDER_SEPARATOR) if path else []:
+            row = connection.execute("SELECT id FROM folders WHERE parent_id IS ? AND title = ?", (folder_id, title)).fetchone()
+            if row is None:
+                return []
+            folder_id = row[0]
+        return [url for (url,) in connection.execute(
+            "SELECT url FROM bookmarks WHERE folder_id IS ? ORDER BY id", (folder_id,))]
+
+    def page(self, before_id=None, until_id=None, limit=100):
+        # Newest first by id: (id, url, title). Keyset paging, like HistoryStore.page().
+        upper = min(before_id if before_id is not None else 2 ** 63 - 1, (until_id + 1) if until_id is not None else 2 ** 63 - 1)
+        return self.connection().execute(
+            "SELECT id, url, title FROM bookmarks WHERE id < ? ORDER BY id DESC LIMIT ?", (upper, limit)).fetchall()
+
+    def last_id(self):
+        return self.connection().execute("SELECT coalesce(max(id), 0) FROM bookmarks").fetchone()[0]
+
+    def entries(self):
+        # (url, title, folder path, [tags], added_at) in id order, streamed with one tags query per batch
+        folders = self.folder_paths()
+        connection = self.connection()
+        last = 0
+        while True:
+            rows = connection.execute(
+                "SELECT id, url, title, folder_id, added_at FROM bookmarks WHERE id > ? ORDER BY id LIMIT ?", (last, BATCH_SIZE)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            tags = {}
+            for bookmark_id, tag in connection.execute(
+                    "SELECT bookmark_id, tag FROM tags WHERE bookmark_id BETWEEN ? AND ?", (rows[0][0], last)):
+                tags.setdefault(bookmark_id, []).append(tag)
+            for bookmark_id, url, title, folder_id, added_at in rows:
+                yield url, title, folders.get(folder_id), sorted(tags.get(bookmark_id, [])), added_at
+
+    def import_entries(self, entries, progress=None):
+        # Commits every BATCH_SIZE entries, so memory stays flat however big the source is
+        connection = self.connection()
+        folder_cache = {}
+        added = seen = 0
+        batch = []
+        def commit():
+            nonlocal added
+            with connection:
+                for entry in batch:
+                    added += self.insert(connection, *entry, folder_cache) is not None
+            batch.clear()
+            if progress is not None:
+                progress(seen, added)
+        for url, title, folder, tags, added_at in entries:
+            seen += 1
+            batch.append((url, title, folder, tags, added_at))
+            if len(batch) >= BATCH_SIZE:
+                commit()
+        commit()
+        return added
+
+    def import_file(self, path, progress=None):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            first = f.read(READ_CHUNK)
+            reader = read_json if first.lstrip().startswith(('[', '{')) else read_netscape
+            return self.import_entries(reader(chained(first, f)), progress)
+
+    def export_file(self, path, progress=None):
+        writer = write_json if path.lower().endswith('.json') else write_netscape
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            count = writer(self.entries(), f, progress)
+        os.replace(tmp_path, path)
+        return count
+
+def chained(first, f):
+    # The chunk already read to sniff the format, then the rest of the file
+    yield first
+    while True:
+        chunk = f.read(READ_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+class NetscapeParser(HTMLParser):
+    # The bookmark.htm format every browser exports: <DT><H3> opens a folder
+    # whose <DL> follows, <DT><A HREF=... ADD_DATE=... TAGS=...> is a bookmark.
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.folders = []
+        self.pending_folder = None
+        self.entries = []
+        self.current = None
+        self.text = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a':
+            self.current = attrs
+            self.text = []
+        elif tag == 'h3':
+            self.text = []
+            self.pending_folder = ''
+        elif tag == 'dl':
+            # The top-level <DL> has no folder heading in front of it
+            self.folders.append(self.pending_folder)
+            self.pending_folder = None
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self.current is not None:
+            href = self.current.get('href') or ''
+            if href and not href.lower().startswith(('javascript:', 'place:')):
+                folder = FOLDER_SEPARATOR.join(f for f in self.folders if f)
+                tags = [t for t in (self.current.get('tags') or '').split(',') if t]
+                try:
+                    added_at = float(self.current.get('add_date') or 0) or None
+                except ValueError:
+                    added_at = None
+                self.entries.append((href, ''.join(self.text).strip() or None, folder or None, tags, added_at))
+            self.current = self.text = None
+        elif tag == 'h3' and self.text is not None:
+            self.pending_folder = ''.join(self.text).strip().replace(FOLDER_SEPARATOR, '-') or 'Untitled'
+            self.text = None
+        elif tag == 'dl' and self.folders:
+            self.folders.pop()
+
+    def handle_data(self, data):
+        if self.text is not None:
+            self.text.append(data)
+
+def read_netscape(chunks):
+    parser = NetscapeParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.entries
+        parser.entries.clear()
+    parser.close()
+    yield from parser.entries
+
+def write_netscape(entries, f, progress=None):
+    # Entries come grouped by nothing in particular, so each one opens and closes its own folder path
+    f.write('<!DOCTYPE NETSCAPE-Bookmark-file-1>\n'
+            '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+            '<TITLE>Bookmarks</TITLE>\n<H1>Bookmarks</H1>\n<DL><p>\n')
+    open_folders = []
+    count = 0
+    for url, title, folder, tags, added_at in entries:
+        path = folder.split(FOLDER_SEPARATOR) if folder else []
+        common = 0
+        while common < min(len(path), len(open_folders)) and path[common] == open_folders[common]:
+            common += 1
+        while len(open_folders) > common:
+            open_folders.pop()
+            f.write('    ' * (len(open_folders) + 1) + '</DL><p>\n')
+        for name in path[common:]:
+            indent = '    ' * (len(open_folders) + 1)
+            f.write(f'{indent}<DT><H3>{escape(name)}</H3>\n{indent}<DL><p>\n')
+            open_folders.append(name)
+        tag_attr = f' TAGS="{escape(",".join(tags))}"' if tags else ''
+        f.write(f'{"    " * (len(open_folders) + 1)}<DT><A HREF="{escape(url)}" ADD_DATE="{int(added_at or 0)}"{tag_attr}>'
+                f'{escape(title or url)}</A>\n')
+        count += 1
+        if progress is not None and count % BATCH_SIZE == 0:
+            progress(count, count)
+    while open_folders:
+        open_folders.pop()
+        f.write('    ' * (len(open_folders) + 1) + '</DL><p>\n')
+    f.write('</DL><p>\n')
+    return count
+
+def read_json(chunks):
+    # Our own export is one array element per line and is streamed. Anything
+    # else (Chrome's Bookmarks file, Firefox backups) is a nested document and
+    # is walked after a regular load.
+    chunks = iter(chunks)
+    buffer = next(chunks, '')
+    if buffer.lstrip().startswith('{'):
+        document = json.loads(buffer + ''.join(chunks))
+        yield from walk_json(document, [])
+        return
+    decoder = json.JSONDecoder()
+    position = buffer.index('[') + 1
+    finished = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if finished:
+                raise
+            chunk = next(chunks, None)
+            if chunk is None:
+                finished = True
+            else:
+                buffer = buffer[position:] + chunk
+                position = 0
+            continue
+        position = end
+        if position > READ_CHUNK:
+            buffer, position = buffer[position:], 0
+        yield from walk_json(item, [])
+
+def walk_json(node, path):
+    # Handles our flat entries as well as Chrome ("roots", type url/folder) and Firefox (children, uri) trees
+    if isinstance(node, list):
+        for child in node:
+            yield from walk_json(child, path)
+        return
+    if not isinstance(node, dict):
+        return
+    url = node.get('url') or node.get('uri')
+    if url and node.get('type') != 'folder':
+        tags = node.get('tags') or []
+        if isinstance(tags, str):
+            tags = [t for t in tags.split(',') if t]
+        added_at = node.get('added') or node.get('dateAdded') or node.get('date_added')
+        try:
+            added_at = normalize_timestamp(float(added_at)) if added_at else None
+        except ValueError:
+            added_at = None
+        folder = node.get('folder') or FOLDER_SEPARATOR.join(path) or None
+        yield url, node.get('title') or node.get('name') or None, folder, list(tags), added_at
+        return
+    children = node.get('children')
+    if 'roots' in node:
+        children = list(node['roots'].values())
+    if children is not None:
+        name = node.get('name') or node.get('title')
+        yield from walk_json(children, path + [name.replace(FOLDER_SEPARATOR, '-')] if name else path)
+
+def normalize_timestamp(value):
+    # Seconds; Firefox stores microseconds since 1970, Chrome microseconds since 1601
+    if value > 1e16:
+        return value / 1e6 - 11644473600
+    if value > 1e14:
+        return value / 1e6
+    return value
+
+def write_json(entries, f, progress=None):
+    f.write('[\n')
+    count = 0
+    for url, title, folder, tags, added_at in entries:
+        if count:
+            f.write(',\n')
+        f.write(json.dumps({'url': url, 'title': title, 'folder': folder, 'tags': tags, 'added': added_at}, ensure_ascii=False))
+        count += 1
+        if progress is not None and count % BATCH_SIZE == 0:
+            progress(count, count)
+    f.write('\n]\n')
+    return count
@@ -0,0 +1,287 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import os
+import json
+import time
+import threading
+import requests
+from http.cookiejar import DefaultCookiePolicy
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+
+DEFAULT_SEGMENTS = 4
+DEFAULT_WORKERS = 8
+MIN_SEGMENT_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+PROGRESS_INTERVAL = 0.25  # Seconds between progress callbacks
+STATE_INTERVAL = 1.0  # Seconds between resume state writes
+RETRIES = 3
+TIMEOUT = 30
+
+class DownloadError(Exception):
+    pass
+
+class NotSegmentable(DownloadError):
+    # With handoff set: the server offers nothing a browser download would not, answers HEAD
+    # with an error (a login it wants, say) or with another content type. Nothing was written.
+    pass
+
+def cookie_jar(cookies):
+    # A requests jar from {'name', 'value', 'domain', 'path', 'secure'} dicts
+    jar = requests.cookies.RequestsCookieJar()
+    for cookie in cookies or ():
+        jar.set_cookie(requests.cookies.create_cookie(cookie['name'], cookie['value'], domain=cookie['domain'],
+                                                      path=cookie['path'], secure=cookie['secure']))
+    return jar
+
+def base_type(content_type):
+    return (content_type or '').split(';')[0].strip().lower()
+
+def split_segments(size, segments):
+    # [start, end, done] triples with inclusive ends, as in a Range header
+    count = max(1, min(segments, size // MIN_SEGMENT_SIZE))
+    step = size // count
+    ranges = []
+    for i in range(count):
+        start = i * step
+        end = size - 1 if i == count - 1 else start + step - 1
+        ranges.append([start, end, 0])
+    return ranges
+
+def numbered(path, n):
+    # "name.ext" -> "name (n).ext", the way browsers keep downloads apart
+    stem, ext = os.path.splitext(path)
+    return f'{stem} ({n}){ext}'
+
+class SegmentedDownload:
+    def __init__(self, engine, url, path, on_progress=None, on_finished=None, headers=None, cookies=None,
+                 handoff=False, mime_type=None):
+        self.engine = engine
+        self.requested_url = url  # What resume state is kept under; self.url follows redirects
+        self.url = url
+        self.path = path
+        self.headers = dict(headers or {})  # Sent with every request, e.g. the Referer
+        self.cookies = cookie_jar(cookies)
+        self.handoff = handoff
+        self.mime_type = mime_type
+        self.part_path = path + '.part'
+        self.state_path = path + '.valdl'
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.size = None
+        self.segments = []
+        self.received = 0
+        self.error = None
+        self.finished = threading.Event()
+        self._validator = ''
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._last_progress = 0.0
+        self._last_state = 0.0
+
+    @property
+    def progress(self):
+        if not self.size:
+            return 0
+        return int(self.received * 100 / self.size)
+
+    def cancel(self):
+        # Leaves the .part and .valdl files behind, so the download can be resumed
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def run(self):
+        try:
+            self._run()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished.set()
+            if self.on_finished:
+                self.on_finished(self, self.error is None and not self._cancelled.is_set())
+
+    def _run(self):
+        session = self.engine.session
+        head = session.head(self.url, allow_redirects=True, timeout=TIMEOUT, headers=self.headers, cookies=self.cookies)
+        self.url = head.url
+        if self.handoff and not head.ok:
+            raise NotSegmentable(f'HEAD answered {head.status_code}')
+        head.raise_for_status()
+        size = int(head.headers.get('Content-Length') or 0)
+        ranged = head.headers.get('Accept-Ranges', '').lower() == 'bytes' and size > 0
+        validator = head.headers.get('ETag') or head.headers.get('Last-Modified') or ''
+        if self.handoff:
+            expected, served = base_type(self.mime_type), base_type(head.headers.get('Content-Type'))
+            if not ranged:
+                raise NotSegmentable('No byte ranges')
+            if expected and served and expected != served:
+                raise NotSegmentable(f'Served {served}, not {expected}')
+
+        if not ranged:
+            self.size = size or None
+            self._stream_whole()
+            self._complete()
+            return
+
+        self.size = size
+        if not self._load_state(size, validator):
+            self.segments = split_segments(size, self.engine.segments)
+            with open(self.part_path, 'wb') as f:
+                f.truncate(size)
+        self.received = sum(segment[2] for segment in self.segments)
+        self._validator = validator
+        self._save_state()
+
+        pending = [segment for segment in self.segments if segment[0] + segment[2] <= segment[1]]
+        futures = [self.engine.executor.submit(self._fetch_segment, segment) for segment in pending]
+        wait(futures)
+        for future in futures:
+            future.result()
+        self._save_state()
+        if self._cancelled.is_set():
+            return
+        self._complete()
+
+    def _load_state(self, size, validator):
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get('url') != self.requested_url or state.get('size') != size or state.get('validator') != validator:
+            return False
+        if not os.path.exists(self.part_path) or os.path.getsize(self.part_path) != size:
+            return False
+        self.segments = state['segments']
+        return True
+
+    def _save_state(self):
+        with self._state_lock:
+            with self._lock:
+                state = {'url': self.requested_url, 'size': self.size, 'validator': self._validator,
+                         'segments': [list(segment) for segment in self.segments]}
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+            self._last_state = time.monotonic()
+
+    def _fetch_segment(self, segment):
+        attempt = 0
+        while not self._cancelled.is_set():
+            start, end, done = segment
+            if start + done > end:
+                return
+            try:
+                headers = dict(self.headers, Range=f'bytes={start + done}-{end}')
+                with self.engine.session.get(self.url, headers=headers, cookies=self.cookies, stream=True, timeout=TIMEOUT) as response:
+                    if response.status_code != 206:
+                        raise DownloadError(f'Server ignored range request ({response.status_code})')
+                    # Unbuffered, so the resume state never claims bytes that are not on disk yet
+                    with open(self.part_path, 'r+b', buffering=0) as f:
+                        f.seek(start + done)
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            if self._cancelled.is_set():
+                                return
+                            f.write(chunk)
+                            self._advance(segment, len(chunk))
+                return
+            except (requests.RequestException, DownloadError):
+                attempt += 1
+                if attempt >= RETRIES:
+                    raise
+                time.sleep(0.5 * attempt)
+
+    def _stream_whole(self):
+        with self.engine.session.get(self.url, headers=self.headers, cookies=self.cookies, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            with open(self.part_path, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if self._cancelled.is_set():
+                        raise DownloadError('Cancelled')
+                    f.write(chunk)
+                    self._advance(None, len(chunk))
+
+    def _advance(self, segment, count):
+        with self._lock:
+            if segment is not None:
+                segment[2] += count
+            self.received += count
+            now = time.monotonic()
+            report = now - self._last_progress >= PROGRESS_INTERVAL
+            if report:
+                self._last_progress = now
+            persist = segment is not None and now - self._last_state >= STATE_INTERVAL
+            if persist:
+                self._last_state = now
+        if report and self.on_progress:
+            self.on_progress(self)
+        if persist:
+            self._save_state()
+
+    def _complete(self):
+        # A file that appeared under our name while downloading is kept, the download moves aside
+        path, n = self.path, 1
+        while os.path.exists(path):
+            path = numbered(self.path, n)
+            n += 1
+        os.replace(self.part_path, path)
+        self.path = path
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        if self.size is None:
+            self.size = self.received
+        if self.on_progress:
+            self.on_progress(self)
+
+class DownloadEngine:
+    # Splits downloads into HTTP Range segments fetched on a shared thread pool.
+    # All segments go through one pooled requests.Session. Cookies come with each
+    # download and the session never keeps any, so downloads from private tabs stay apart.
+    def __init__(self, segments=DEFAULT_SEGMENTS, workers=DEFAULT_WORKERS):
+        self.segments = segments
+        self.session = requests.Session()
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='val-download')
+        self.downloads = []
+
+    def free_path(self, url, path):
+        # path, or "name (n).ext" if a file or another running download has it. Resume
+        # state left for the same URL keeps the name, so an interrupted download continues.
+        active = {download.path for download in self.downloads if not download.finished.is_set()}
+        candidate, n = path, 1
+        while candidate in active or os.path.exists(candidate) or not self._resumable(url, candidate):
+            candidate = numbered(path, n)
+            n += 1
+        return candidate
+
+    def _resumable(self, url, path):
+        # False if resume state under path belongs to another URL, as requested before any redirect
+        try:
+            with open(path + '.valdl', 'r') as f:
+                return json.load(f).get('url') == url
+        except (OSError, ValueError):
+            return True
+
+    def download(self, url, path, on_progress=None, on_finished=None, **request):
+        # The file ends up at download.path, which differs from path if that was taken.
+        # request: headers, cookies, handoff and mime_type, see SegmentedDownload.
+        download = SegmentedDownload(self, url, self.free_path(url, path), on_progress, on_finished, **request)
+        self.downloads.append(download)
+        # The coordinator waits on its segments, so it gets its own thread rather than a pool slot
+        threading.Thread(target=download.run, name='val-download-coordinator', daemon=True).start()
+        return download
+
+    def shutdown(self):
+        for download in self.downloads:
+            download.cancel()
+        self.executor.shutdown(wait=False)
+        self.session.close()
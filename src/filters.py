@@ -0,0 +1,320 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import re
+
+# Rules that reproduce the interceptor's original hardcoded behaviour
+DEFAULT_RULES = ['popup', '|about:blank']
+
+RESOURCE_TYPES = frozenset([
+    'document', 'subdocument', 'stylesheet', 'script', 'image', 'font', 'object',
+    'media', 'xmlhttprequest', 'ping', 'websocket', 'popup', 'other',
+])
+TYPE_ALIASES = {'xhr': 'xmlhttprequest', 'css': 'stylesheet', 'frame': 'subdocument', 'object-subrequest': 'object'}
+
+HOSTS_ADDRESSES = frozenset(['0.0.0.0', '127.0.0.1', '::', '::1'])
+HOSTS_IGNORED = frozenset(['localhost', 'localhost.localdomain', 'local', 'broadcasthost', '0.0.0.0', 'ip6-localhost', 'ip6-loopback'])
+
+TOKEN_RE = re.compile(r'[a-z0-9%]{2,}')
+PURE_HOST_RE = re.compile(r'^[a-z0-9.-]+$')
+CACHE_SIZE = 65536
+
+BLOCK = 1
+ALLOW = 2
+
+def url_host(url):
+    start = url.find('://')
+    if start < 0:
+        return ''
+    start += 3
+    end = len(url)
+    for sep in '/?#':
+        i = url.find(sep, start, end)
+        if i >= 0:
+            end = i
+    host = url[start:end]
+    at = host.rfind('@')
+    if at >= 0:
+        host = host[at + 1:]
+    if host.startswith('['):
+        return host[1:host.find(']')]
+    colon = host.find(':')
+    if colon >= 0:
+        host = host[:colon]
+    return host.rstrip('.')
+
+def site_of(host):
+    # Without a public suffix list the last two labels stand in for the site
+    return '.'.join(host.rsplit('.', 2)[-2:])
+
+def matches_domain(host, domain):
+    return host == domain or host.endswith('.' + domain)
+
+def pattern_to_regex(pattern):
+    parts = []
+    i = 0
+    if pattern.startswith('||'):
+        parts.append(r'^[a-z][a-z0-9+.-]*:/+(?:[^/?#]*\.)?')
+        i = 2
+    elif pattern.startswith('|'):
+        parts.append('^')
+        i = 1
+    end = len(pattern)
+    anchored_end = end > i and pattern.endswith('|')
+    if anchored_end:
+        end -= 1
+    for ch in pattern[i:end]:
+        if ch == '*':
+            parts.append('.*')
+        elif ch == '^':
+            parts.append(r'(?:[^a-z0-9_.%-]|$)')
+        else:
+            parts.append(re.escape(ch))
+    if anchored_end:
+        parts.append('$')
+    return re.compile(''.join(parts))
+
+def pick_keyword(pattern, counts):
+    # A keyword must sit between non-token characters, so that it equals a whole
+    # token of any URL the rule matches. The least used candidate wins.
+    body = pattern
+    start_bounded = False
+    if body.startswith('||') or body.startswith('|'):
+        body = body.lstrip('|')
+        start_bounded = True
+    end_bounded = body.endswith('|')
+    body = body.rstrip('|')
+    best = None
+    for match in TOKEN_RE.finditer(body):
+        s, e = match.span()
+        before = body[s - 1] if s else None
+        after = body[e] if e < len(body) else None
+        if before == '*' or after == '*':
+            continue
+        if before is None and not start_bounded:
+            continue
+        if after is None and not end_bounded:
+            continue
+        token = match.group()
+        if best is None or (counts.get(token, 0), -len(token)) < (counts.get(best, 0), -len(best)):
+            best = token
+    return best or ''
+
+class Rule:
+    __slots__ = ('pattern', 'exception', 'types', 'third_party', 'domains', 'not_domains', 'literal', '_regex')
+
+    def __init__(self, pattern, exception=False, types=None, third_party=None, domains=(), not_domains=()):
+        self.pattern = pattern
+        self.exception = exception
+        self.types = types
+        self.third_party = third_party
+        self.domains = domains
+        self.not_domains = not_domains
+        self.literal = pattern if not any(c in pattern for c in '*^|') else None
+        self._regex = None
+
+    def applies_to(self, resource_type, third_party, first_party_host):
+        if self.types is not None and resource_type not in self.types:
+            return False
+        if self.third_party is not None and third_party is not None and self.third_party != third_party:
+            return False
+        if self.domains and not any(matches_domain(first_party_host, d) for d in self.domains):
+            return False
+        if self.not_domains and any(matches_domain(first_party_host, d) for d in self.not_domains):
+            return False
+        return True
+
+    def matches_url(self, url):
+        if self.literal is not None:
+            return self.literal in url
+        if self._regex is None:
+            # Compiled on first candidate hit so loading 100k rules stays cheap
+            self._regex = pattern_to_regex(self.pattern)
+        return self._regex.search(url) is not None
+
+def parse_options(text):
+    types = set()
+    not_types = set()
+    third_party = None
+    domains = []
+    not_domains = []
+    for option in text.split(','):
+        option = option.strip()
+        negated = option.startswith('~')
+        name = option.lstrip('~')
+        name = TYPE_ALIASES.get(name, name)
+        if name in RESOURCE_TYPES:
+            (not_types if negated else types).add(name)
+        elif name in ('third-party', '3p'):
+            third_party = not negated
+        elif name in ('first-party', '1p'):
+            third_party = negated
+        elif name.startswith('domain='):
+            for domain in name[7:].split('|'):
+                if domain.startswith('~'):
+                    not_domains.append(domain[1:])
+                elif domain:
+                    domains.append(domain)
+        else:
+            # Options we cannot honour (redirect=, csp=, ...) drop the whole rule
+            return None
+    if not_types:
+        types = (types or set(RESOURCE_TYPES)) - not_types
+    return (frozenset(types) if types else None, third_party, tuple(domains), tuple(not_domains))
+
+class DomainTrie:
+    # Host labels stored right to left, so a lookup walks example.com before ads.example.com
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, domain, rule):
+        node = self.root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        node.setdefault(None, []).append(rule)
+        self.size += 1
+
+    def lookup(self, host):
+        found = []
+        node = self.root
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            rules = node.get(None)
+            if rules:
+                found.extend(rules)
+        return found
+
+class KeywordIndex:
+    # Multi-pattern matcher: each rule is filed under one URL token, so a decision
+    # costs one regex tokenisation plus a dict lookup per token instead of a scan
+    # over every rule.
+    def __init__(self):
+        self.buckets = {}
+        self.counts = {}
+        self.size = 0
+
+    def add(self, rule):
+        keyword = pick_keyword(rule.pattern, self.counts)
+        self.buckets.setdefault(keyword, []).append(rule)
+        self.counts[keyword] = self.counts.get(keyword, 0) + 1
+        self.size += 1
+
+    def candidates(self, url):
+        buckets = self.buckets
+        generic = buckets.get('')
+        if generic:
+            yield from generic
+        for token in set(TOKEN_RE.findall(url)):
+            rules = buckets.get(token)
+            if rules:
+                yield from rules
+
+class FilterEngine:
+    def __init__(self):
+        self.domains = DomainTrie()
+        self.blocks = KeywordIndex()
+        self.exceptions = KeywordIndex()
+        self.cache = {}
+        self.skipped = 0
+
+    @classmethod
+    def with_defaults(cls, paths=()):
+        engine = cls()
+        engine.add_rules(DEFAULT_RULES)
+        for path in paths:
+            engine.load_file(path)
+        return engine
+
+    def __len__(self):
+        return self.domains.size + self.blocks.size + self.exceptions.size
+
+    def load_file(self, path):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            self.add_rules(f)
+
+    def add_rules(self, lines):
+        for line in lines:
+            if not self.add_rule(line):
+                self.skipped += 1
+        self.cache.clear()
+
+    def add_rule(self, line):
+        line = line.strip().lower()
+        if not line or line.startswith('!') or line.startswith('[') or line.startswith('#'):
+            return True
+        if '##' in line or '#@#' in line or '#?#' in line or '#$#' in line:
+            return False  # Element hiding is cosmetic, nothing to do for requests
+
+        fields = line.split()
+        if len(fields) >= 2 and fields[0] in HOSTS_ADDRESSES:
+            for host in fields[1:]:
+                if host.startswith('#'):
+                    break
+                if host not in HOSTS_IGNORED:
+                    self.domains.add(host, Rule(host))
+            return True
+
+        exception = line.startswith('@@')
+        if exception:
+            line = line[2:]
+        options = (None, None, (), ())
+        dollar = line.rfind('$')
+        if dollar > 0 and not (line.startswith('/') and line.endswith('/')):
+            options = parse_options(line[dollar + 1:])
+            if options is None:
+                return False
+            line = line[:dollar]
+        if line.startswith('/') and line.endswith('/') and len(line) > 2:
+            return False  # Regex rules are rare and too slow to run on every request
+
+        if not line or line in ('*', '|', '||'):
+            return False
+        types, third_party, domains, not_domains = options
+        rule = Rule(line, exception, types, third_party, domains, not_domains)
+
+        if line.startswith('||') and not domains and not not_domains:
+            host = line[2:].rstrip('^|')
+            if host and PURE_HOST_RE.match(host) and line[2:] in (host, host + '^', host + '^|'):
+                self.domains.add(host, rule)
+                return True
+        (self.exceptions if exception else self.blocks).add(rule)
+        return True
+
+    def host_decision(self, host, resource_type, third_party):
+        key = (host, resource_type, third_party)
+        decision = self.cache.get(key)
+        if decision is None:
+            decision = 0
+            for rule in self.domains.lookup(host):
+                if rule.applies_to(resource_type, third_party, ''):
+                    if rule.exception:
+                        decision = ALLOW
+                        break
+                    decision = BLOCK
+            if len(self.cache) >= CACHE_SIZE:
+                self.cache.clear()
+            self.cache[key] = decision
+        return decision
+
+    def should_block(self, url, resource_type='other', first_party_url=None):
+        url = url.lower()
+        host = url_host(url)
+        first_party_host = url_host(first_party_url.lower()) if first_party_url else ''
+        third_party = site_of(host) != site_of(first_party_host) if first_party_host and host else None
+
+        decision = self.host_decision(host, resource_type, third_party) if host else 0
+        if decision == ALLOW:
+            return False
+        for rule in self.exceptions.candidates(url):
+            if rule.applies_to(resource_type, third_party, first_party_host) and rule.matches_url(url):
+                return False
+        if decision == BLOCK:
+            return True
+        for rule in self.blocks.candidates(url):
+            if rule.applies_to(resource_type, third_party, first_party_host) and rule.matches_url(url):
+                return True
+        return False
@@ -0,0 +1,219 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import re
+import math
+import time
+import zlib
+import queue
+import hashlib
+import sqlite3
+import threading
+from history import connect, should_record
+
+MAX_INDEX_BYTES = 256 * 1024 * 1024
+MAX_PAGE_CHARS = 200000     # Text past this is not indexed
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 2.0
+EVICT_TARGET = 0.9         # Eviction frees room for more than one batch
+EVICT_PASSES = 3
+TITLE_WEIGHT = 4.0
+RECENCY_DAYS = 180          # A page visited this long ago ranks at half its text score
+SNIPPET_CHARS = 160
+CANDIDATES = 2000           # Matches ranked per search, newest first
+
+# Page text lives zlib-compressed in `pages`; the FTS5 table is contentless, so
+# the index holds postings only. Removing a row from a contentless table means
+# handing FTS5 the text it was built from, which is why the text is kept.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    body BLOB NOT NULL,
+    digest BLOB NOT NULL,
+    visited_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_visited_at ON pages(visited_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(
+    title, body, content='', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+# Run in the application world after a load; innerText leaves out scripts, styles and hidden text
+PAGE_TEXT_SCRIPT = "document.body ? document.body.innerText.slice(0, %d) : ''" % MAX_PAGE_CHARS
+
+WORD = re.compile(r'\w+', re.UNICODE)
+SPACE = re.compile(r'\s+')
+
+def match_query(text):
+    # Words as quoted FTS5 strings, every one required; the last may be unfinished
+    words = WORD.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def pack(text):
+    return zlib.compress(text.encode('utf-8'), 6)
+
+def unpack(blob):
+    return zlib.decompress(blob).decode('utf-8')
+
+def snippet(text, query, width=SNIPPET_CHARS):
+    # Text around the first query word found, on one line
+    words = [word.lower() for word in WORD.findall(query)]
+    lowered = text.lower()
+    hits = [lowered.find(word) for word in words]
+    hits = [hit for hit in hits if hit >= 0]
+    start = max(0, min(hits) - width // 3) if hits else 0
+    excerpt = SPACE.sub(' ', text[start:start + width]).strip()
+    return ('…' if start else '') + excerpt + ('…' if start + width < len(text) else '')
+
+class FullTextIndex:
+    # Visited page text, indexed by one writer thread with the same batching as
+    # HistoryStore. The GUI thread only queues. Once the database holds more
+    # than max_bytes, the least recently visited pages are dropped.
+    def __init__(self, path, max_bytes=MAX_INDEX_BYTES, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.evicted = 0
+        self.queue = queue.Queue()
+        self.local = threading.local()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='fulltext-writer', daemon=True)
+        self.thread.start()
+
+    def add(self, url, title, text, visited_at=None):
+        if should_record(url) and text and text.strip():
+            self.queue.put(('page', url, title or None, text[:MAX_PAGE_CHARS], time.time() if visited_at is None else visited_at))
+
+    def remove(self, url):
+        self.queue.put(('remove', url))
+
+    def flush(self):
+        self.queue.put(('sync',))
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def run(self):
+        connection = connect(self.path)
+        connection.executescript(SCHEMA)
+        self.ready.set()
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None and batch[-1][0] != 'sync':
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            try:
+                self.write(connection, [item for item in batch if item is not None])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+        connection.close()
+
+    def write(self, connection, batch):
+        if not any(item[0] != 'sync' for item in batch):
+            return
+        with connection:
+            for item in batch:
+                if item[0] == 'page':
+                    self.index_page(connection, *item[1:])
+                elif item[0] == 'remove':
+                    row = connection.execute("SELECT id, title, body FROM pages WHERE url = ?", (item[1],)).fetchone()
+                    if row is not None:
+                        self.drop(connection, *row)
+        self.evict(connection)
+
+    def index_page(self, connection, url, title, text, visited_at):
+        digest = hashlib.blake2b(f'{title}\0{text}'.encode('utf-8'), digest_size=16).digest()
+        row = connection.execute("SELECT id, title, body, digest FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            page_id, old_title, old_body, old_digest = row
+            if old_digest == digest:
+                # A reload of the same content only counts as a visit
+                connection.execute("UPDATE pages SET visited_at = max(visited_at, ?) WHERE id = ?", (visited_at, page_id))
+                return
+            self.drop(connection, page_id, old_title, old_body)
+        cursor = connection.execute("INSERT INTO pages (url, title, body, digest, visited_at) VALUES (?, ?, ?, ?, ?)",
+                                    (url, title, pack(text), digest, visited_at))
+        connection.execute("INSERT INTO page_text (rowid, title, body) VALUES (?, ?, ?)", (cursor.lastrowid, title or '', text))
+
+    def drop(self, connection, page_id, title, body):
+        connection.execute("INSERT INTO page_text (page_text, rowid, title, body) VALUES ('delete', ?, ?, ?)",
+                           (page_id, title or '', unpack(body)))
+        connection.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+
+    def used_bytes(self, connection):
+        page_size, pages, free = (connection.execute(f"PRAGMA {name}").fetchone()[0]
+                                  for name in ('page_size', 'page_count', 'freelist_count'))
+        return (pages - free) * page_size
+
+    def evict(self, connection):
+        # Oldest visits go first. Space only comes back once FTS5 merges its
+        # segments, and a merge rewrites the index, so drop an estimated share
+        # of the pages at once (down to EVICT_TARGET of the cap) and merge once.
+        for _ in range(EVICT_PASSES):
+            used = self.used_bytes(connection)
+            if used <= self.max_bytes:
+                return
+            count = connection.execute("SELECT count(*) FROM pages").fetchone()[0]
+            share = max(1, math.ceil(count * (1 - self.max_bytes * EVICT_TARGET / used)))
+            rows = connection.execute("SELECT id, title, body FROM pages ORDER BY visited_at LIMIT ?", (share,)).fetchall()
+            if not rows:
+                return
+            with connection:
+                for row in rows:
+                    self.drop(connection, *row)
+                connection.execute("INSERT INTO page_text (page_text) VALUES ('optimize')")
+            self.evicted += len(rows)
+
+    def reader(self):
+        self.ready.wait()
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = connect(self.path)
+        return connection
+
+    def search(self, text, limit=20, since=None, now=None):
+        # Best first: [(url, title, snippet, visited_at)]. Text relevance (BM25,
+        # titles weighted up) fades with the age of the visit.
+        query = match_query(text)
+        if query is None:
+            return []
+        now = time.time() if now is None else now
+        connection = self.reader()
+        try:
+            # BM25 costs about as much per match as everything else together, so
+            # words found on most pages only rank the most recently indexed
+            # CANDIDATES matches. Walking the doclist by rowid to find them is cheap.
+            floor = connection.execute("SELECT rowid FROM page_text WHERE page_text MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                                       (query, CANDIDATES - 1)).fetchone()
+            rows = connection.execute(
+                "SELECT pages.url, pages.title, pages.body, pages.visited_at FROM page_text "
+                "JOIN pages ON pages.id = page_text.rowid "
+                "WHERE page_text MATCH ? AND page_text.rowid >= ? AND pages.visited_at >= ? "
+                "ORDER BY bm25(page_text, ?, 1.0) / (1.0 + (? - pages.visited_at) / ?) LIMIT ?",
+                (query, floor[0] if floor else 0, since or 0.0, TITLE_WEIGHT, now, RECENCY_DAYS * 86400.0, limit)).fetchall()
+        except sqlite3.OperationalError:
+            return []
+        return [(url, title, snippet(unpack(body), text), visited_at) for url, title, body, visited_at in rows]
+
+    def __len__(self):
+        return self.reader().execute("SELECT count(*) FROM pages").fetchone()[0]
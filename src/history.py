@@ -0,0 +1,201 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import time
+import queue
+import logging
+import sqlite3
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0  # Seconds a visit may wait in memory before it is written
+RECORDED_SCHEMES = ('http', 'https', 'file')
+MAX_ROWID = 2 ** 63 - 1
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    host TEXT NOT NULL,
+    title TEXT,
+    visit_count INTEGER NOT NULL DEFAULT 0,
+    last_visit REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    url_id INTEGER NOT NULL REFERENCES urls(id),
+    host TEXT NOT NULL,
+    visited_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_host ON urls(host);
+CREATE INDEX IF NOT EXISTS urls_last_visit ON urls(last_visit);
+CREATE INDEX IF NOT EXISTS visits_visited_at ON visits(visited_at);
+CREATE INDEX IF NOT EXISTS visits_host ON visits(host, visited_at);
+CREATE INDEX IF NOT EXISTS visits_url ON visits(url_id, visited_at);
+"""
+
+UPSERT_URL = """
+INSERT INTO urls (url, host, title, visit_count, last_visit) VALUES (?, ?, ?, 1, ?)
+ON CONFLICT(url) DO UPDATE SET
+    visit_count = visit_count + 1,
+    last_visit = max(last_visit, excluded.last_visit),
+    title = coalesce(excluded.title, title)
+"""
+
+INSERT_VISIT = "INSERT INTO visits (url_id, host, visited_at) SELECT id, host, ? FROM urls WHERE url = ?"
+
+UPDATE_TITLE = "UPDATE urls SET title = ? WHERE url = ?"
+
+VISIT_COLUMNS = "urls.url, urls.title, visits.visited_at, urls.visit_count"
+
+def host_of(url):
+    return (urlsplit(url).hostname or '').lower()
+
+def should_record(url):
+    return urlsplit(url).scheme in RECORDED_SCHEMES
+
+def connect(path, check_same_thread=True):
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=check_same_thread)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')  # WAL keeps this crash-safe, just not power-loss durable
+    return connection
+
+class HistoryStore:
+    # Visits are queued by the GUI thread and written in batches by one writer
+    # thread, one transaction per batch. Reads use their own connection per
+    # thread; WAL lets them run while the writer is busy.
+    def __init__(self, path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.unwritten = deque()  # (url, title, visited_at) of queued visits, oldest first
+        self.unwritten_lock = threading.Lock()
+        self.local = threading.local()
+        self.readers = []  # Every thread's reader connection, so close() can reach them all
+        self.readers_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='history-writer', daemon=True)
+        self.thread.start()
+
+    def record(self, url, title=None, visited_at=None):
+        if should_record(url):
+            visit = (url, title or None, time.time() if visited_at is None else visited_at)
+            with self.unwritten_lock:
+                self.unwritten.append(visit)
+                self.queue.put(('visit',) + visit)
+
+    def unwritten_visits(self):
+        # Visits queued but not committed yet, oldest first. The writer commits in
+        # order, so every visit on disk is older than the first of these.
+        with self.unwritten_lock:
+            return list(self.unwritten)
+
+    def set_title(self, url, title):
+        # Titles usually arrive after the navigation is committed
+        if title and should_record(url):
+            self.queue.put(('title', url, title))
+
+    def flush(self):
+        # Blocks until everything queued so far is committed, without waiting out the batch interval.
+        # Not for the GUI thread, which reads unwritten_visits() instead of waiting for the writer.
+        self.queue.put(('sync',))
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        with self.readers_lock:
+            readers, self.readers = self.readers, []
+        for connection in readers:
+            connection.close()
+        self.local.connection = None
+
+    def run(self):
+        connection = connect(self.path)
+        connection.executescript(SCHEMA)
+        self.ready.set()
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None and batch[-1][0] != 'sync':
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            try:
+                self.write(connection, [item for item in batch if item is not None])
+            except Exception:
+                # The batch is rolled back and lost, but the writer lives on so later visits and flush() still work
+                log.exception('could not write %d history items', len(batch))
+            finally:
+                with self.unwritten_lock:
+                    for item in batch:
+                        if item is not None and item[0] == 'visit':
+                            self.unwritten.popleft()
+                for _ in batch:
+                    self.queue.task_done()
+        connection.close()
+
+    def write(self, connection, batch):
+        if not batch:
+            return
+        with connection:
+            for item in batch:
+                if item[0] == 'visit':
+                    _, url, title, visited_at = item
+                    connection.execute(UPSERT_URL, (url, host_of(url), title, visited_at))
+                    connection.execute(INSERT_VISIT, (visited_at, url))
+                elif item[0] == 'title':
+                    _, url, title = item
+                    connection.execute(UPDATE_TITLE, (title, url))
+
+    def reader(self):
+        self.ready.wait()
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            # Only ever used by its own thread, but close() shuts it from another
+            connection = self.local.connection = connect(self.path, check_same_thread=False)
+            with self.readers_lock:
+                self.readers.append(connection)
+        return connection
+
+    def recent(self, limit=100):
+        # Newest first: (url, title, visited_at, visit_count)
+        return self.reader().execute(
+            f"SELECT {VISIT_COLUMNS} FROM visits JOIN urls ON urls.id = visits.url_id "
+            "ORDER BY visits.visited_at DESC LIMIT ?", (limit,)).fetchall()
+
+    def visits_to_host(self, host, limit=100):
+        return self.reader().execute(
+            f"SELECT {VISIT_COLUMNS} FROM visits JOIN urls ON urls.id = visits.url_id "
+            "WHERE visits.host = ? ORDER BY visits.visited_at DESC LIMIT ?", (host.lower(), limit)).fetchall()
+
+    def page(self, before_id=None, until=None, limit=100):
+        # Keyset paging for views that scroll through everything, newest first:
+        # (visit id, url, title, visited_at). Walks the primary key, so the cost
+        # per page does not depend on how deep into the history it is.
+        return self.reader().execute(
+            "SELECT visits.id, urls.url, urls.title, visits.visited_at FROM visits JOIN urls ON urls.id = visits.url_id "
+            "WHERE visits.id < ? AND visits.visited_at < ? ORDER BY visits.id DESC LIMIT ?",
+            (MAX_ROWID if before_id is None else before_id, float('inf') if until is None else until, limit)).fetchall()
+
+    def url_rows(self, after_id=0, limit=500):
+        # Every distinct URL once, in id order: (id, url, title, visit_count, last_visit)
+        return self.reader().execute(
+            "SELECT id, url, title, visit_count, last_visit FROM urls WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)).fetchall()
+
+    def visit_count(self, url):
+        row = self.reader().execute("SELECT visit_count FROM urls WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else 0
+
+    def __len__(self):
+        return self.reader().execute("SELECT count(*) FROM visits").fetchone()[0]
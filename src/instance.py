@@ -0,0 +1,119 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Single-instance mode. The first Val process listens on a local socket; later
+# invocations hand their URLs over and exit instead of starting a second
+# QApplication and WebEngine. Only QtCore and QtNetwork are imported here, so a
+# forwarding process never loads the GUI.
+
+#imports
+import os
+import json
+import hashlib
+import getpass
+from functools import partial
+from PyQt5.QtCore import QObject, QUrl, QStandardPaths, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+CONNECT_TIMEOUT_MS = 200  # A live instance accepts at once; anything slower means there is none
+REPLY_TIMEOUT_MS = 2000
+STANDALONE_FLAG = '--standalone'
+# Qt's own command line options that take a value, so the value is not mistaken for a URL
+QT_VALUE_OPTIONS = {'-platform', '-platformpluginpath', '-platformtheme', '-plugin', '-style', '-stylesheet',
+                    '-session', '-display', '-geometry', '-title', '-qwindowgeometry', '-qwindowtitle', '-qwindowicon'}
+
+def server_name():
+    # One instance per user and data directory, so separate profiles (and tests) do not meet
+    base = QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation) or os.path.expanduser('~')
+    data_dir = os.path.abspath(os.path.join(base, 'val'))
+    return f'val-{getpass.getuser()}-{hashlib.sha1(data_dir.encode()).hexdigest()[:12]}'
+
+def command_line_urls(args, cwd=None):
+    # Positional arguments as URLs: existing files become file:// URLs, the rest go through fromUserInput
+    cwd = cwd or os.getcwd()
+    urls = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+            continue
+        if arg.startswith('-'):
+            skip = arg in QT_VALUE_OPTIONS
+            continue
+        path = os.path.join(cwd, arg)
+        if os.path.exists(path):
+            urls.append(QUrl.fromLocalFile(os.path.abspath(path)).toString())
+        else:
+            url = QUrl.fromUserInput(arg)
+            if url.isValid():
+                urls.append(url.toString())
+    return urls
+
+def forward(urls, name=None, connect_timeout=CONNECT_TIMEOUT_MS, reply_timeout=REPLY_TIMEOUT_MS):
+    # True once a running instance has taken the URLs
+    socket = QLocalSocket()
+    socket.connectToServer(name or server_name())
+    if not socket.waitForConnected(connect_timeout):
+        return False
+    try:
+        socket.write(json.dumps({'urls': urls}).encode() + b'\n')
+        if not socket.waitForBytesWritten(reply_timeout):
+            return False
+        while not socket.canReadLine():
+            if not socket.waitForReadyRead(reply_timeout):
+                return False
+        return bytes(socket.readLine()).strip() == b'ok'
+    finally:
+        socket.abort()
+
+def instance_alive(name):
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    alive = socket.waitForConnected(CONNECT_TIMEOUT_MS)
+    socket.abort()
+    return alive
+
+def forward_command_line(args):
+    if STANDALONE_FLAG in args:
+        return False
+    return forward(command_line_urls(args))
+
+class InstanceServer(QObject):
+    # Accepts URL handoffs for the running browser, one JSON line per request
+    urls_received = pyqtSignal(list)
+
+    def __init__(self, name=None, parent=None):
+        super().__init__(parent)
+        self.name = name or server_name()
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)  # Other users may not hand us URLs
+        self.server.newConnection.connect(self.accept)
+
+    def listen(self):
+        # False if another live instance holds the name. Asked first, because with
+        # access options set Qt renames its socket over whatever is in the way.
+        if instance_alive(self.name):
+            return False
+        QLocalServer.removeServer(self.name)  # Left behind by a process that did not exit cleanly
+        return self.server.listen(self.name)
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(partial(self.read, socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def read(self, socket):
+        while socket.canReadLine():
+            try:
+                request = json.loads(bytes(socket.readLine()))
+                urls = [str(url) for url in request.get('urls', [])]
+            except (ValueError, AttributeError):
+                socket.write(b'error\n')
+                continue
+            socket.write(b'ok\n')
+            socket.flush()
+            self.urls_received.emit(urls)
+
+    def close(self):
+        self.server.close()
@@ -0,0 +1,278 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import os
+import json
+import time
+import logging
+import threading
+import psutil
+from array import array
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SAMPLE_INTERVAL = 2.0  # Seconds
+RING_SIZE = 150  # Five minutes of samples at the default interval
+RENDERER_NAME = 'QtWebEngineProcess'
+
+log = logging.getLogger(__name__)
+
+class RingBuffer:
+    # Fixed-size float series; appends overwrite the oldest sample
+    def __init__(self, size=RING_SIZE):
+        self.data = array('d', bytes(8 * size))
+        self.size = size
+        self.count = 0
+        self.head = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def latest(self):
+        return self.data[self.head - 1] if self.count else 0.0
+
+    def values(self):
+        # Oldest to newest
+        if self.count < self.size:
+            return self.data[:self.count].tolist()
+        return (self.data[self.head:] + self.data[:self.head]).tolist()
+
+class Series:
+    METRICS = ('cpu', 'rss', 'read', 'write')
+
+    def __init__(self, title, size=RING_SIZE):
+        self.title = title
+        self.buffers = {name: RingBuffer(size) for name in self.METRICS}
+        self.updated = 0.0
+
+    def record(self, values):
+        for name in self.METRICS:
+            self.buffers[name].append(values.get(name, 0.0))
+        self.updated = time.time()
+
+    def latest(self):
+        return {name: buffer.latest() for name, buffer in self.buffers.items()}
+
+class ResourceSampler(threading.Thread):
+    # Walks the QtWebEngine renderer process tree off the GUI thread. The GUI
+    # thread only hands over the tab -> renderer pid mapping via set_targets().
+    def __init__(self, interval=SAMPLE_INTERVAL, size=RING_SIZE, jsonl_path=None):
+        super().__init__(name='val-sampler', daemon=True)
+        self.interval = interval
+        self.size = size
+        self.jsonl_path = jsonl_path
+        self.targets = {}
+        self.series = {}
+        self.system = {'cpu': 0.0, 'memory': 0.0}
+        self.gauges = {}
+        self.published = {}  # Gauge values as of the last publish_gauges(), read under the lock
+        self.broken_gauges = set()
+        self.lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._last_sample = time.monotonic()
+        self._processes = {}
+        self._io = {}
+
+    def set_targets(self, targets):
+        # {tab_id: (title, renderer pid or 0)}
+        self.targets = dict(targets)
+
+    def add_gauge(self, name, help_text, read):
+        # Extra values for the exporters. read() may touch GUI state, so it is only
+        # called by publish_gauges() on the GUI thread; exporters see the published numbers.
+        self.gauges[name] = (help_text, read)
+
+    def publish_gauges(self):
+        values = {}
+        for name, (help_text, read) in self.gauges.items():
+            try:
+                values[name] = (help_text, float(read()))
+            except Exception:
+                # A broken gauge is left out rather than taking the exporter down; said once, not every tick
+                if name not in self.broken_gauges:
+                    self.broken_gauges.add(name)
+                    log.exception('Gauge %s failed and is left out of the metrics', name)
+        with self.lock:
+            self.published = values
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        psutil.cpu_percent()  # Prime the system-wide counter
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def renderers(self):
+        found = {}
+        try:
+            children = psutil.Process().children(recursive=True)
+        except psutil.Error:
+            return found
+        for child in children:
+            try:
+                if RENDERER_NAME in child.name():
+                    # Reuse Process objects so cpu_percent() measures since the last tick
+                    found[child.pid] = self._processes.get(child.pid, child)
+            except psutil.Error:
+                continue
+        self._processes = found
+        return found
+
+    def read_process(self, process, elapsed):
+        try:
+            with process.oneshot():
+                values = {'cpu': process.cpu_percent(), 'rss': float(process.memory_info().rss)}
+                try:
+                    io = process.io_counters()
+                except (AttributeError, psutil.Error):
+                    io = None  # Not available on macOS
+        except psutil.Error:
+            return None
+        if io is not None:
+            previous = self._io.get(process.pid)
+            if previous is not None and elapsed > 0:
+                values['read'] = max(io.read_bytes - previous[0], 0) / elapsed
+                values['write'] = max(io.write_bytes - previous[1], 0) / elapsed
+            self._io[process.pid] = (io.read_bytes, io.write_bytes)
+        return values
+
+    def sample(self):
+        now = time.monotonic()
+        elapsed = now - self._last_sample
+        self._last_sample = now
+
+        per_pid = {}
+        for pid, process in self.renderers().items():
+            values = self.read_process(process, elapsed)
+            if values is not None:
+                per_pid[pid] = values
+
+        targets = self.targets
+        sharing = {}
+        for _, pid in targets.values():
+            sharing[pid] = sharing.get(pid, 0) + 1
+
+        with self.lock:
+            self.system = {'cpu': psutil.cpu_percent(), 'memory': psutil.virtual_memory().percent}
+            for tab_id, (title, pid) in targets.items():
+                values = per_pid.get(pid)
+                if values is None:
+                    continue
+                # Tabs sharing a renderer split its usage evenly
+                share = sharing[pid]
+                series = self.series.get(tab_id)
+                if series is None:
+                    series = self.series[tab_id] = Series(title, self.size)
+                series.title = title
+                series.record({name: value / share for name, value in values.items()})
+            for tab_id in list(self.series):
+                if tab_id not in targets:
+                    del self.series[tab_id]
+
+        if self.jsonl_path:
+            self.write_jsonl()
+
+    def snapshot(self):
+        with self.lock:
+            return {tab_id: (series.title, {name: buffer.values() for name, buffer in series.buffers.items()})
+                    for tab_id, series in self.series.items()}
+
+    def read_gauges(self):
+        with self.lock:
+            return dict(self.published)
+
+    def write_jsonl(self):
+        with self.lock:
+            record = {
+                'time': time.time(),
+                'system': dict(self.system),
+                'tabs': {str(tab_id): dict(series.latest(), title=series.title) for tab_id, series in self.series.items()},
+            }
+        record['gauges'] = {name: value for name, (_, value) in self.read_gauges().items()}
+        with open(self.jsonl_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text(sampler):
+    lines = []
+    with sampler.lock:
+        system = dict(sampler.system)
+        tabs = [(tab_id, series.title, series.latest()) for tab_id, series in sampler.series.items()]
+
+    lines.append('# HELP val_system_cpu_percent System-wide CPU usage.')
+    lines.append('# TYPE val_system_cpu_percent gauge')
+    lines.append(f'val_system_cpu_percent {system["cpu"]}')
+    lines.append('# HELP val_system_memory_percent System-wide memory usage.')
+    lines.append('# TYPE val_system_memory_percent gauge')
+    lines.append(f'val_system_memory_percent {system["memory"]}')
+
+    for name, metric, help_text in (
+        ('cpu', 'val_tab_cpu_percent', 'CPU usage of the renderer behind a tab.'),
+        ('rss', 'val_tab_rss_bytes', 'Resident memory of the renderer behind a tab.'),
+        ('read', 'val_tab_io_read_bytes_per_second', 'Disk reads of the renderer behind a tab.'),
+        ('write', 'val_tab_io_write_bytes_per_second', 'Disk writes of the renderer behind a tab.'),
+    ):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} gauge')
+        for tab_id, title, latest in tabs:
+            lines.append(f'{metric}{{tab="{tab_id}",title="{escape_label(title)}"}} {latest[name]}')
+
+    for name, (help_text, value) in sorted(sampler.read_gauges().items()):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+class MetricsServer(ThreadingHTTPServer):
+    # Serves /metrics in Prometheus text format on localhost
+    daemon_threads = True
+
+    def __init__(self, sampler, port, host='127.0.0.1'):
+        super().__init__((host, port), MetricsHandler)
+        self.sampler = sampler
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='val-metrics', daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text(self.server.sampler).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def exporter_from_environment(sampler):
+    # VAL_METRICS_PORT serves /metrics, VAL_METRICS_JSONL appends one line per sample
+    sampler.jsonl_path = os.environ.get('VAL_METRICS_JSONL') or None
+    port = os.environ.get('VAL_METRICS_PORT')
+    if not port:
+        return None
+    # Metrics are a diagnostic; a taken or malformed port must not stop the browser starting
+    try:
+        server = MetricsServer(sampler, int(port))
+    except (OSError, ValueError, OverflowError) as e:
+        log.warning('Not serving metrics on VAL_METRICS_PORT=%s: %s', port, e)
+        return None
+    server.start()
+    return server
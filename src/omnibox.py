@@ -0,0 +1,308 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import re
+import math
+import time
+import threading
+from heapq import nlargest
+from PyQt5.QtCore import QObject, pyqtSignal
+
+SUGGESTIONS = 8
+TOP_K = 16            # Best entries cached at every trie node and posting list
+BUCKET_SIZE = 256     # Entries a trie leaf holds before it bursts into a node
+MIN_GRAM, MAX_GRAM = 2, 12
+HALF_LIFE = 30 * 24 * 60 * 60  # A visit counts half as much after 30 days
+DECAY = math.log(2) / HALF_LIFE
+BOOKMARK_BONUS = math.log(4)   # A bookmark is worth four fresh visits
+BUILD_CHUNK = 512
+
+WORD = re.compile(r'[a-z0-9]+')
+SCHEME = re.compile(r'^[a-z][a-z0-9+.-]*://')
+
+def url_key(url):
+    # What people type: no scheme, no leading www.
+    key = SCHEME.sub('', url.strip().lower(), count=1)
+    return key[4:] if key.startswith('www.') else key
+
+def tokens(key, title):
+    # Host and path words from the URL key, and the words of the title
+    return {word for word in WORD.findall(key + ' ' + (title or '').lower()) if len(word) >= MIN_GRAM}
+
+def frecency(visit_count, last_visit):
+    # Frecency is a sum of visits decaying as exp(-DECAY * age). Stored as
+    # log(sum(exp(DECAY * visited_at))), the ranking does not depend on the
+    # current time, so cached orderings never go stale and a visit is just
+    # logaddexp(score, DECAY * visited_at). Without per-visit times, all of a
+    # URL's visits are taken to be at its last visit.
+    return math.log(max(visit_count, 1)) + DECAY * last_visit
+
+def add_visit(score, visited_at):
+    visit = DECAY * visited_at
+    high, low = max(score, visit), min(score, visit)
+    return high + math.log1p(math.exp(low - high))
+
+def offer(top, entry_id, scores):
+    # Keep `top` as the TOP_K best ids, best first. Scores only ever grow.
+    score = scores[entry_id]
+    if len(top) == TOP_K and score <= scores[top[-1]] and top[-1] != entry_id:
+        return
+    if entry_id in top:
+        top.remove(entry_id)
+    position = len(top)
+    while position and scores[top[position - 1]] < score:
+        position -= 1
+    top.insert(position, entry_id)
+    del top[TOP_K:]
+
+class TrieNode:
+    # A leaf holds a bucket of entry ids. Once the bucket overflows it bursts
+    # into children keyed by the next character and caches its TOP_K entries,
+    # so a prefix that ends on a node is answered without visiting the subtree.
+    __slots__ = ('bucket', 'children', 'ends', 'top')
+
+    def __init__(self):
+        self.bucket = []
+        self.children = None
+        self.ends = None
+        self.top = None
+
+class OmniboxIndex:
+    # Prefix trie over URL keys plus an edge n-gram token index over host, path
+    # and title words. Entries live in parallel lists indexed by id; lookups
+    # read at most one bucket and a handful of cached lists.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.urls = []
+        self.keys = []
+        self.titles = []
+        self.scores = []
+        self.ids = {}
+        self.bookmarked = set()
+        self.root = TrieNode()
+        self.postings = {}
+        self.built = False
+        self.stopping = threading.Event()
+
+    def __len__(self):
+        return len(self.urls)
+
+    def add(self, url, title=None, visit_count=1, last_visit=0.0, bookmarked=False):
+        with self.lock:
+            self._add(url, title, frecency(visit_count, last_visit), bookmarked)
+
+    def add_many(self, rows):
+        # rows: (url, title, visit_count, last_visit). One lock round trip per chunk.
+        with self.lock:
+            for url, title, visit_count, last_visit in rows:
+                self._add(url, title, frecency(visit_count, last_visit), False)
+
+    def _add(self, url, title, score, bookmarked):
+        entry_id = self.ids.get(url)
+        if entry_id is not None:
+            # Already known (a live visit beat the builder to it): keep the better score
+            self._rescore(entry_id, max(self.scores[entry_id], score))
+            return entry_id
+        entry_id = len(self.urls)
+        key = url_key(url)
+        self.ids[url] = entry_id
+        self.urls.append(url)
+        self.keys.append(key)
+        self.titles.append(title)
+        self.scores.append(score + (BOOKMARK_BONUS if bookmarked else 0.0))
+        if bookmarked:
+            self.bookmarked.add(entry_id)
+        self._insert_key(entry_id, key)
+        self._index_tokens(entry_id, tokens(key, title))
+        return entry_id
+
+    def _insert_key(self, entry_id, key):
+        node, depth = self.root, 0
+        while node.children is not None:
+            offer(node.top, entry_id, self.scores)
+            if depth == len(key):
+                node.ends.append(entry_id)
+                return
+            child = node.children.get(key[depth])
+            if child is None:
+                child = node.children[key[depth]] = TrieNode()
+            node, depth = child, depth + 1
+        node.bucket.append(entry_id)
+        if len(node.bucket) > BUCKET_SIZE:
+            self._burst(node, depth)
+
+    def _burst(self, node, depth):
+        bucket, node.bucket = node.bucket, None
+        node.children, node.ends = {}, []
+        node.top = nlargest(TOP_K, bucket, key=self.scores.__getitem__)
+        for entry_id in bucket:
+            key = self.keys[entry_id]
+            if depth == len(key):
+                node.ends.append(entry_id)
+                continue
+            child = node.children.get(key[depth])
+            if child is None:
+                child = node.children[key[depth]] = TrieNode()
+            child.bucket.append(entry_id)
+        for child in node.children.values():
+            if len(child.bucket) > BUCKET_SIZE:
+                self._burst(child, depth + 1)
+
+    def _index_tokens(self, entry_id, words):
+        # Hot path of the build: most postings are full of better entries, so skip offer() for those
+        scores, postings = self.scores, self.postings
+        score = scores[entry_id]
+        for word in words:
+            for length in range(MIN_GRAM, min(len(word), MAX_GRAM) + 1):
+                gram = word[:length]
+                top = postings.get(gram)
+                if top is None:
+                    postings[gram] = [entry_id]
+                elif len(top) < TOP_K or score > scores[top[-1]] or top[-1] == entry_id:
+                    offer(top, entry_id, scores)
+
+    def _rescore(self, entry_id, score):
+        if score <= self.scores[entry_id]:
+            return
+        self.scores[entry_id] = score
+        key = self.keys[entry_id]
+        node, depth = self.root, 0
+        while node.children is not None:
+            offer(node.top, entry_id, self.scores)
+            if depth == len(key):
+                break
+            node, depth = node.children[key[depth]], depth + 1
+        self._index_tokens(entry_id, tokens(key, self.titles[entry_id]))
+
+    def record_visit(self, url, visited_at):
+        with self.lock:
+            entry_id = self.ids.get(url)
+            if entry_id is None:
+                self._add(url, None, frecency(1, visited_at), False)
+            else:
+                self._rescore(entry_id, add_visit(self.scores[entry_id], visited_at))
+
+    def set_title(self, url, title):
+        with self.lock:
+            entry_id = self.ids.get(url)
+            if entry_id is not None and title and title != self.titles[entry_id]:
+                self.titles[entry_id] = title
+                self._index_tokens(entry_id, tokens(self.keys[entry_id], title))
+
+    def set_bookmarked(self, url, title=None, added_at=None):
+        # A bookmark never visited counts as one visit when it was added; _add() gives it the bonus
+        with self.lock:
+            entry_id = self.ids.get(url)
+            if entry_id is None:
+                self._add(url, title, frecency(1, time.time() if added_at is None else added_at), True)
+            elif entry_id not in self.bookmarked:
+                self.bookmarked.add(entry_id)
+                self._rescore(entry_id, self.scores[entry_id] + BOOKMARK_BONUS)
+
+    def prefix_matches(self, prefix):
+        node, depth = self.root, 0
+        while node.children is not None:
+            if depth == len(prefix):
+                return list(node.top)
+            node = node.children.get(prefix[depth])
+            if node is None:
+                return []
+            depth += 1
+        keys = self.keys
+        return nlargest(TOP_K, (entry_id for entry_id in node.bucket if keys[entry_id].startswith(prefix)), key=self.scores.__getitem__)
+
+    def token_matches(self, words):
+        # The longest word narrows the most; the others must appear in the URL or title
+        longest = max(words, key=len)
+        candidates = self.postings.get(longest[:MAX_GRAM], [])
+        rest = [word for word in words if word is not longest]
+        if len(longest) <= MAX_GRAM and not rest:
+            return list(candidates)
+        matches = []
+        for entry_id in candidates:
+            haystack = self.keys[entry_id] + ' ' + (self.titles[entry_id] or '').lower()
+            if longest in haystack and all(word in haystack for word in rest):
+                matches.append(entry_id)
+        return matches
+
+    def query(self, text, limit=SUGGESTIONS):
+        # Best first: URLs that start with what was typed, then word matches. [(url, title)]
+        text = text.strip().lower()
+        if not text:
+            return []
+        with self.lock:
+            found = self.prefix_matches(url_key(text))
+            words = [word for word in WORD.findall(text) if len(word) >= MIN_GRAM]
+            if len(found) < limit and words:
+                seen = set(found)
+                extra = [entry_id for entry_id in self.token_matches(words) if entry_id not in seen]
+                extra.sort(key=self.scores.__getitem__, reverse=True)
+                found.extend(extra)
+            return [(self.urls[entry_id], self.titles[entry_id]) for entry_id in found[:limit]]
+
+    def build(self, history=None, bookmarks=None, chunk=BUILD_CHUNK):
+        # Runs on a worker thread. Takes the lock per chunk, so typing is never blocked for long.
+        if history is not None:
+            after = 0
+            while not self.stopping.is_set():
+                rows = history.url_rows(after, chunk)
+                if not rows:
+                    break
+                after = rows[-1][0]
+                self.add_many([row[1:] for row in rows])
+        if self.stopping.is_set():
+            return
+        if bookmarks is not None:
+            for url, title, added_at in bookmarks.dated():
+                self.set_bookmarked(url, title, added_at)
+        self.built = True
+
+    def stop(self):
+        # Ends a running build() after its current chunk, so the stores can be closed under it
+        self.stopping.set()
+
+class Omnibox(QObject):
+    # Serves URL bar suggestions from a worker thread. Only the newest request
+    # is ever answered: a keystroke supersedes whatever was still pending, and
+    # answers that come back after a newer keystroke are dropped.
+    suggestions = pyqtSignal(int, str, object)  # generation, text, [(url, title)]
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.generation = 0
+        self.pending = None
+        self.closed = False
+        self.wake = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name='omnibox', daemon=True)
+        self.thread.start()
+
+    def request(self, text):
+        with self.wake:
+            self.generation += 1
+            self.pending = (self.generation, text)
+            self.wake.notify()
+        return self.generation
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def run(self):
+        while True:
+            with self.wake:
+                while self.pending is None and not self.closed:
+                    self.wake.wait()
+                if self.closed:
+                    return
+                generation, text = self.pending
+                self.pending = None
+            results = self.index.query(text)
+            if self.is_current(generation):
+                self.suggestions.emit(generation, text, results)
+
+    def close(self):
+        with self.wake:
+            self.closed = True
+            self.wake.notify()
+        self.thread.join()
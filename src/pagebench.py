@@ -0,0 +1,359 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Headless page-load benchmark. Loads a list of URLs through N concurrent
+# QWebEnginePages built by the same ProfileManager and RequestInterceptor as
+# browser tabs, and reports load times and request/block counts.
+#
+#   python val.py bench --fixture --concurrency 4 --repeat 5 --json results.json
+#   python val.py bench https://example.com https://example.org --csv pages.csv
+#
+# --fixture generates a small site (pages with stylesheets, scripts, images and
+# some /ads/ requests the fixture blocklist catches) and serves it from a local
+# http.server, so runs are comparable between machines and need no network.
+
+#imports
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+import threading
+from collections import deque
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from PyQt5.QtCore import QObject, QEvent, QTimer, QUrl, Qt, QCoreApplication, pyqtSignal
+
+CONCURRENCY = 4
+PAGE_TIMEOUT = 30.0
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+FIXTURE_PAGES = 20
+FIXTURE_RULES = ['/ads/*', '||tracker.invalid^']
+
+CSV_FIELDS = ('url', 'ok', 'error', 'load_started_ms', 'load_ms', 'ttfb_ms', 'dom_content_loaded_ms', 'requests', 'blocked')
+
+# Navigation Timing for the main document, relative to its navigation start
+NAVIGATION_TIMING = """
+(function () {
+    var nav = performance.getEntriesByType('navigation')[0];
+    return nav ? [nav.responseStart, nav.domContentLoadedEventEnd] : null;
+})()
+"""
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def distribution(values):
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    stats = {'count': len(values), 'mean': sum(values) / len(values), 'min': values[0], 'max': values[-1]}
+    for fraction in PERCENTILES:
+        stats[f'p{int(fraction * 100)}'] = percentile(values, fraction)
+    return stats
+
+def summarize(results, wall_time):
+    loaded = [result for result in results if result['ok']]
+    return {
+        'pages': len(results),
+        'failed': len(results) - len(loaded),
+        'wall_time_s': wall_time,
+        'pages_per_s': len(results) / wall_time if wall_time else None,
+        'requests': sum(result['requests'] for result in results),
+        'blocked': sum(result['blocked'] for result in results),
+        'load_ms': distribution(result['load_ms'] for result in loaded),
+        'ttfb_ms': distribution(result['ttfb_ms'] for result in loaded),
+        'dom_content_loaded_ms': distribution(result['dom_content_loaded_ms'] for result in loaded),
+    }
+
+def write_json(path, summary, results, settings):
+    with open(path, 'w') as f:
+        json.dump({'settings': settings, 'summary': summary, 'pages': results}, f, indent=2)
+
+def write_csv(path, results):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+def document_key(url):
+    # Subresource requests name their page by first-party URL, which has no fragment
+    return QUrl(url).adjusted(QUrl.RemoveFragment).toString()
+
+def fixture_site(directory, pages=FIXTURE_PAGES):
+    # A deterministic site: every page pulls a shared stylesheet and script, a
+    # few images of its own and two requests the fixture rules block. Returns
+    # the page paths.
+    for name in ('css', 'js', 'img', 'ads'):
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+    with open(os.path.join(directory, 'css', 'site.css'), 'w') as f:
+        f.write('body { font: 16px sans-serif; margin: 2em; }\n' + ''.join(f'.c{i} {{ color: #{i:06x}; }}\n' for i in range(200)))
+    with open(os.path.join(directory, 'js', 'site.js'), 'w') as f:
+        f.write('document.addEventListener("DOMContentLoaded", function () {\n'
+                '    document.body.dataset.ready = "1";\n});\n' + ''.join(f'function f{i}() {{ return {i}; }}\n' for i in range(200)))
+    with open(os.path.join(directory, 'ads', 'banner.js'), 'w') as f:
+        f.write('/* should never load */\n')
+    # Smallest valid GIF, a 1x1 transparent pixel
+    pixel = bytes.fromhex('47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b')
+    paths = []
+    for page in range(pages):
+        images = []
+        for image in range(4):
+            name = f'p{page}-{image}.gif'
+            with open(os.path.join(directory, 'img', name), 'wb') as f:
+                f.write(pixel)
+            images.append(f'<img src="/img/{name}" width="32" height="32" alt="">')
+        links = ''.join(f'<li><a href="/page{other}.html">Page {other}</a></li>' for other in range(pages) if other != page)
+        paragraphs = ''.join(f'<p class="c{(page * 7 + i) % 200}">Paragraph {i} of page {page}.</p>' for i in range(30))
+        with open(os.path.join(directory, f'page{page}.html'), 'w') as f:
+            f.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Fixture page {page}</title>\n'
+                    '<link rel="stylesheet" href="/css/site.css">\n<script src="/js/site.js"></script>\n'
+                    '<script src="/ads/banner.js"></script>\n</head><body>\n'
+                    f'<h1>Fixture page {page}</h1>\n{"".join(images)}\n{paragraphs}\n'
+                    '<img src="http://tracker.invalid/pixel.gif" width="1" height="1" alt="">\n'
+                    f'<ul>{links}</ul>\n</body></html>\n')
+        paths.append(f'/page{page}.html')
+    return paths
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class FixtureServer:
+    # Serves a directory on 127.0.0.1 from a background thread
+    def __init__(self, directory, port=0, handler=QuietHandler):
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), partial(handler, directory=directory))
+        self.thread = threading.Thread(target=self.server.serve_forever, name='pagebench-fixture', daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server.server_address[1]}{path}'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+class PageSlot:
+    # One page and the load it is running
+    def __init__(self, page):
+        self.page = page
+        self.result = None
+        self.key = None
+        self.started = 0.0
+        self.timer = None
+
+class PageLoadBench(QObject):
+    # Keeps `concurrency` pages busy until every URL has been loaded once. A URL
+    # is never in flight on two pages at once, so requests can be told apart
+    # by their first-party URL.
+    finished = pyqtSignal()
+
+    def __init__(self, profiles, urls, concurrency=CONCURRENCY, timeout=PAGE_TIMEOUT, is_private=False, parent=None):
+        super().__init__(parent)
+        self.profiles = profiles
+        self.pending = deque(urls)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.is_private = is_private
+        self.slots = []
+        self.active = {}  # document key -> PageSlot
+        self.results = []
+        self.started = None
+        self.wall_time = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.profiles.interceptor.observer = self.observe_request
+        for _ in range(min(self.concurrency, len(self.pending))):
+            page = self.profiles.new_page(self.is_private, self)
+            slot = PageSlot(page)
+            page.loadStarted.connect(partial(self.load_started, slot))
+            page.loadFinished.connect(partial(self.load_finished, slot))
+            page.urlChanged.connect(partial(self.url_changed, slot))
+            self.slots.append(slot)
+        self.fill()
+        if not self.active:
+            self.finish()
+
+    def next_url(self):
+        for _ in range(len(self.pending)):
+            url = self.pending.popleft()
+            if document_key(url) not in self.active:
+                return url
+            self.pending.append(url)
+        return None
+
+    def fill(self):
+        for slot in self.slots:
+            if slot.result is None:
+                url = self.next_url()
+                if url is None:
+                    return
+                self.load(slot, url)
+
+    def load(self, slot, url):
+        slot.result = {'url': url, 'ok': False, 'error': None, 'load_started_ms': None, 'load_ms': None,
+                       'ttfb_ms': None, 'dom_content_loaded_ms': None, 'requests': 0, 'blocked': 0}
+        slot.key = document_key(url)
+        self.active[slot.key] = slot
+        slot.timer = QTimer(self)
+        slot.timer.setSingleShot(True)
+        slot.timer.timeout.connect(partial(self.timed_out, slot, slot.result))
+        slot.timer.start(int(self.timeout * 1000))
+        slot.started = time.perf_counter()
+        slot.page.load(QUrl(url))
+
+    def observe_request(self, url, resource_type, first_party, blocked):
+        slot = self.active.get(document_key(first_party))
+        if slot is not None:
+            slot.result['requests'] += 1
+            slot.result['blocked'] += blocked
+
+    def url_changed(self, slot, url):
+        # Follow redirects, so later subresources still find their page
+        if slot.result is None:
+            return
+        key = document_key(url.toString())
+        if key != slot.key and key not in self.active:
+            del self.active[slot.key]
+            slot.key = key
+            self.active[key] = slot
+
+    def load_started(self, slot):
+        if slot.result is not None and slot.result['load_started_ms'] is None:
+            slot.result['load_started_ms'] = (time.perf_counter() - slot.started) * 1000
+
+    def load_finished(self, slot, ok):
+        # A load stopped by a timeout may still report in after the next one started
+        if slot.result is None or slot.result['load_started_ms'] is None:
+            return
+        result = slot.result
+        result['load_ms'] = (time.perf_counter() - slot.started) * 1000
+        result['ok'] = ok
+        if not ok:
+            result['error'] = 'load failed'
+            self.complete(slot)
+            return
+        slot.timer.stop()
+        slot.page.runJavaScript(NAVIGATION_TIMING, partial(self.timing_ready, slot, result))
+
+    def timing_ready(self, slot, result, timing):
+        if slot.result is not result:
+            return
+        if timing:
+            result['ttfb_ms'], result['dom_content_loaded_ms'] = timing
+        self.complete(slot)
+
+    def timed_out(self, slot, result):
+        if slot.result is not result:
+            return
+        result['error'] = 'timeout'
+        slot.page.triggerAction(slot.page.Stop)
+        self.complete(slot)
+
+    def complete(self, slot):
+        slot.timer.stop()
+        slot.timer.deleteLater()
+        self.results.append(slot.result)
+        self.active.pop(slot.key, None)
+        slot.result = slot.key = slot.timer = None
+        self.fill()
+        if not self.active:
+            self.finish()
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self.started
+        self.profiles.interceptor.observer = None
+        self.finished.emit()
+
+    def close(self):
+        # Pages have to go before their profile does
+        for slot in self.slots:
+            slot.page.deleteLater()
+        self.slots = []
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+def read_urls(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def print_summary(summary):
+    print(f'{"pages":22} {summary["pages"]} ({summary["failed"]} failed) in {summary["wall_time_s"]:.2f}s, '
+          f'{summary["pages_per_s"] or 0:.1f} pages/s')
+    print(f'{"requests":22} {summary["requests"]} ({summary["blocked"]} blocked)')
+    for key in ('load_ms', 'ttfb_ms', 'dom_content_loaded_ms'):
+        stats = summary[key]
+        if stats is None:
+            print(f'{key:22} n/a')
+        else:
+            print(f'{key:22} mean {stats["mean"]:8.1f}  p50 {stats["p50"]:8.1f}  p90 {stats["p90"]:8.1f}  '
+                  f'p99 {stats["p99"]:8.1f}  max {stats["max"]:8.1f}')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='val.py bench', description='Headless page-load benchmark')
+    parser.add_argument('urls', nargs='*')
+    parser.add_argument('--urls-file', help='one URL per line')
+    parser.add_argument('--fixture', action='store_true', help='serve and load the generated fixture site')
+    parser.add_argument('--fixture-pages', type=int, default=FIXTURE_PAGES)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--repeat', type=int, default=1, help='load the URL list this many times')
+    parser.add_argument('--timeout', type=float, default=PAGE_TIMEOUT, help='per page, in seconds')
+    parser.add_argument('--blocklist', action='append', default=[], help='filter list to load, may be repeated')
+    parser.add_argument('--private', action='store_true', help='use the off-the-record profile')
+    parser.add_argument('--json', help='write the summary and every page to this file')
+    parser.add_argument('--csv', help='write one row per page to this file')
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.urls_file:
+        urls.extend(read_urls(args.urls_file))
+    if not urls and not args.fixture:
+        parser.error('give URLs, --urls-file or --fixture')
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    if QCoreApplication.instance() is None:
+        QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+
+    from filters import FilterEngine
+    from profiles import ProfileManager
+    workdir = tempfile.TemporaryDirectory(prefix='val-pagebench-')
+    server = bench = profiles = None
+    try:
+        engine = FilterEngine.with_defaults(args.blocklist)
+        if args.fixture:
+            site = os.path.join(workdir.name, 'site')
+            server = FixtureServer(site)
+            urls.extend(server.url(path) for path in fixture_site(site, args.fixture_pages))
+            engine.add_rules(FIXTURE_RULES)
+        # A throwaway profile and cache, so every run starts cold and the real profile is untouched
+        profiles = ProfileManager(engine, os.path.join(workdir.name, 'profile'), os.path.join(workdir.name, 'cache'))
+        bench = PageLoadBench(profiles, urls * args.repeat, args.concurrency, args.timeout, args.private)
+        bench.finished.connect(app.quit)
+        QTimer.singleShot(0, bench.start)
+        app.exec_()
+
+        summary = summarize(bench.results, bench.wall_time)
+        print_summary(summary)
+        if args.json:
+            settings = {key: getattr(args, key) for key in ('concurrency', 'repeat', 'timeout', 'private', 'fixture')}
+            write_json(args.json, summary, bench.results, settings)
+        if args.csv:
+            write_csv(args.csv, bench.results)
+        return 1 if summary['failed'] else 0
+    finally:
+        if bench is not None:
+            bench.close()
+        if profiles is not None:
+            profiles.deleteLater()
+            QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        if server is not None:
+            server.close()
+        workdir.cleanup()
+
+if __name__ == '__main__':
+    sys.exit(main())
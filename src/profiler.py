@@ -0,0 +1,299 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Opt-in GUI thread profiler: per-handler latency histograms and an event-loop
+# stall watchdog. Started from Settings > Tools > Profiler, or at startup with
+# VAL_PROFILE=1 (VAL_PROFILE_DUMP=path writes the report on exit).
+
+#imports
+import sys
+import json
+import time
+import inspect
+import threading
+import traceback
+from collections import deque
+from PyQt5.QtCore import QObject, QTimer, Qt
+
+HEARTBEAT_INTERVAL_MS = 50
+STALL_THRESHOLD = 0.25  # Seconds without a heartbeat before the GUI thread counts as stalled
+MAX_STALLS = 50
+STACK_DEPTH = 30
+TOOL_NAME = 'val-profiler'
+SUSPENDABLE = inspect.CO_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+
+def code_objects(targets):
+    # Code of every plain, static and class method defined on the targets, or of the functions themselves
+    codes = set()
+    for target in targets:
+        members = vars(target).values() if inspect.isclass(target) else [target]
+        for member in members:
+            if isinstance(member, (staticmethod, classmethod)):
+                member = member.__func__
+            # Generators suspend and resume; only plain calls have a start and an end to time
+            if inspect.isfunction(member) and not member.__code__.co_flags & SUSPENDABLE:
+                codes.add(member.__code__)
+    return codes
+
+def code_name(code):
+    return getattr(code, 'co_qualname', code.co_name)
+
+class LatencyHistogram:
+    # Power-of-two microsecond buckets: bucket n holds durations below 2**n us
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * 32
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), 31)] += 1
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the requested rank, in seconds
+        if not self.count:
+            return 0.0
+        rank = max(1, int(self.count * fraction + 0.5))
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(2 ** bucket / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+class SlotProfiler:
+    # Times calls into the given code objects on the thread that starts it.
+    # On Python 3.12+ sys.monitoring instruments only those code objects, so the
+    # rest of the program runs at full speed; older Pythons fall back to
+    # sys.setprofile, which sees every call and filters here. Times are
+    # inclusive: a handler that calls another profiled handler includes it.
+    def __init__(self, codes):
+        self.codes = frozenset(codes)
+        self.histograms = {}
+        self.stack = []  # (code, started) of the profiled calls in progress
+        self.thread_id = None
+        self.backend = None
+        self.tool_id = None
+
+    def start(self):
+        if self.backend is not None:
+            return
+        self.thread_id = threading.get_ident()
+        monitoring = getattr(sys, 'monitoring', None)
+        if monitoring is not None and self.start_monitoring(monitoring):
+            self.backend = 'sys.monitoring'
+        else:
+            sys.setprofile(self.profile)
+            self.backend = 'setprofile'
+
+    def start_monitoring(self, monitoring):
+        for tool_id in (monitoring.PROFILER_ID, monitoring.OPTIMIZER_ID):
+            try:
+                monitoring.use_tool_id(tool_id, TOOL_NAME)
+            except ValueError:
+                continue  # Another tool (a real profiler or debugger) holds this id
+            self.tool_id = tool_id
+            events = monitoring.events
+            monitoring.register_callback(tool_id, events.PY_START, self.monitor_start)
+            monitoring.register_callback(tool_id, events.PY_RETURN, self.monitor_return)
+            monitoring.register_callback(tool_id, events.PY_UNWIND, self.monitor_unwind)
+            for code in self.codes:
+                monitoring.set_local_events(tool_id, code, events.PY_START | events.PY_RETURN)
+            # Unwinding is a global-only event; it is rare enough to filter here
+            monitoring.set_events(tool_id, events.PY_UNWIND)
+            return True
+        return False
+
+    def stop(self):
+        if self.backend == 'sys.monitoring':
+            monitoring = sys.monitoring
+            events = monitoring.events
+            monitoring.set_events(self.tool_id, events.NO_EVENTS)
+            for code in self.codes:
+                monitoring.set_local_events(self.tool_id, code, events.NO_EVENTS)
+            for event in (events.PY_START, events.PY_RETURN, events.PY_UNWIND):
+                monitoring.register_callback(self.tool_id, event, None)
+            monitoring.free_tool_id(self.tool_id)
+            self.tool_id = None
+        elif self.backend == 'setprofile':
+            sys.setprofile(None)
+        self.backend = None
+        self.stack.clear()
+
+    def enter(self, code):
+        if threading.get_ident() == self.thread_id:
+            self.stack.append((code, time.perf_counter()))
+
+    def leave(self, code):
+        if threading.get_ident() != self.thread_id or not self.stack or self.stack[-1][0] is not code:
+            return
+        _, started = self.stack.pop()
+        histogram = self.histograms.get(code)
+        if histogram is None:
+            histogram = self.histograms[code] = LatencyHistogram()
+        histogram.record(time.perf_counter() - started)
+
+    def monitor_start(self, code, offset):
+        self.enter(code)
+
+    def monitor_return(self, code, offset, value):
+        self.leave(code)
+
+    def monitor_unwind(self, code, offset, exception):
+        if code in self.codes:
+            self.leave(code)
+
+    def profile(self, frame, event, arg):
+        # 'return' also fires when a frame unwinds with an exception
+        if event == 'call':
+            if frame.f_code in self.codes:
+                self.enter(frame.f_code)
+        elif event == 'return':
+            if frame.f_code in self.codes:
+                self.leave(frame.f_code)
+
+    def current(self):
+        # Innermost profiled call in progress; read from the watchdog thread
+        try:
+            return code_name(self.stack[-1][0])
+        except IndexError:
+            return None
+
+    def report(self):
+        slots = {code_name(code): histogram.summary() for code, histogram in list(self.histograms.items())}
+        return dict(sorted(slots.items(), key=lambda item: item[1]['total_ms'], reverse=True))
+
+class StallWatchdog(QObject):
+    # A precise timer on the GUI thread records how late each tick fires and
+    # bumps a heartbeat. A watcher thread looks at the heartbeat; once it is
+    # older than the threshold it snapshots the GUI thread's stack while the
+    # stall is still in progress. The stall's length is filled in when the
+    # event loop comes back.
+    def __init__(self, profiler=None, interval_ms=HEARTBEAT_INTERVAL_MS, threshold=STALL_THRESHOLD, parent=None):
+        super().__init__(parent)
+        self.profiler = profiler
+        self.interval = interval_ms / 1000
+        self.threshold = threshold
+        self.lateness = LatencyHistogram()
+        self.stalls = deque(maxlen=MAX_STALLS)
+        self.pending = None  # Stall seen by the watcher that the GUI thread has not come back from
+        self.heartbeat = time.monotonic()
+        self.thread_id = None
+        self.stopped = threading.Event()
+        self.watcher = None
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+    def start(self):
+        if self.timer.isActive():
+            return
+        self.thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.stopped.clear()
+        self.timer.start(int(self.interval * 1000))
+        self.watcher = threading.Thread(target=self.watch, name='val-stall-watchdog', daemon=True)
+        self.watcher.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.stopped.set()
+        if self.watcher is not None:
+            self.watcher.join()
+            self.watcher = None
+
+    def tick(self):
+        now = time.monotonic()
+        late = max(0.0, now - self.heartbeat - self.interval)
+        self.lateness.record(late)
+        self.heartbeat = now
+        stall = self.pending
+        if stall is not None:
+            self.pending = None
+            stall['duration_ms'] = late * 1000 + self.interval * 1000
+            self.stalls.append(stall)
+
+    def watch(self):
+        while not self.stopped.wait(self.interval / 2):
+            silent = time.monotonic() - self.heartbeat
+            if silent < self.threshold or self.pending is not None:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            self.pending = {
+                'at': time.time() - silent,
+                'duration_ms': None,
+                'slot': self.profiler.current() if self.profiler is not None else None,
+                'stack': traceback.format_stack(frame, STACK_DEPTH) if frame is not None else [],
+            }
+
+    def report(self):
+        stalls = list(self.stalls)
+        if self.pending is not None:
+            stalls.append(self.pending)
+        return {'timer_lateness': self.lateness.summary(), 'stalls': stalls}
+
+class Profiler(QObject):
+    # The slot profiler and the stall watchdog, started and reported together
+    def __init__(self, targets, parent=None):
+        super().__init__(parent)
+        self.slots = SlotProfiler(code_objects(targets))
+        self.watchdog = StallWatchdog(self.slots, parent=self)
+        self.started = None
+
+    @property
+    def running(self):
+        return self.slots.backend is not None
+
+    def start(self):
+        if not self.running:
+            self.slots.start()
+            self.watchdog.start()
+            self.started = time.time()
+
+    def stop(self):
+        if self.running:
+            self.watchdog.stop()
+            self.slots.stop()
+
+    def report(self):
+        report = {'backend': self.slots.backend, 'started': self.started, 'python': sys.version.split()[0],
+                  'slots': self.slots.report()}
+        report.update(self.watchdog.report())
+        return report
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+def format_report(report, limit=40):
+    # Plain text for the profiler dialog
+    lines = [f'Backend: {report["backend"] or "stopped"}', '',
+             f'{"Handler":48} {"calls":>7} {"mean ms":>9} {"p50 ms":>9} {"p99 ms":>9} {"max ms":>9}']
+    for name, stats in list(report['slots'].items())[:limit]:
+        lines.append(f'{name[:48]:48} {stats["count"]:7d} {stats["mean_ms"]:9.2f} {stats["p50_ms"]:9.2f} '
+                     f'{stats["p99_ms"]:9.2f} {stats["max_ms"]:9.2f}')
+    lateness = report['timer_lateness']
+    lines += ['', f'Timer lateness: p50 {lateness["p50_ms"]:.1f} ms, p99 {lateness["p99_ms"]:.1f} ms, '
+                  f'max {lateness["max_ms"]:.1f} ms over {lateness["count"]} ticks',
+              f'Stalls: {len(report["stalls"])}']
+    for stall in reversed(report['stalls']):
+        duration = f'{stall["duration_ms"]:.0f} ms' if stall['duration_ms'] is not None else 'in progress'
+        lines += ['', f'{time.strftime("%H:%M:%S", time.localtime(stall["at"]))}  {duration}  in {stall["slot"] or "unknown"}']
+        lines += [line.rstrip() for line in stall['stack'][-8:]]
+    return '\n'.join(lines)
@@ -0,0 +1,116 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+from PyQt5.QtWebEngineWidgets import QWebEngineProfile, QWebEnginePage
+from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+from PyQt5.QtCore import QObject, QDateTime
+from PyQt5.QtNetwork import QNetworkCookie
+from filters import FilterEngine
+
+DEFAULT_CACHE_SIZE_MB = 256
+
+CACHE_MODES = {
+    'disk': QWebEngineProfile.DiskHttpCache,
+    'memory': QWebEngineProfile.MemoryHttpCache,
+    'none': QWebEngineProfile.NoCache,
+}
+
+RESOURCE_TYPE_NAMES = {
+    QWebEngineUrlRequestInfo.ResourceTypeMainFrame: 'document',
+    QWebEngineUrlRequestInfo.ResourceTypeSubFrame: 'subdocument',
+    QWebEngineUrlRequestInfo.ResourceTypeStylesheet: 'stylesheet',
+    QWebEngineUrlRequestInfo.ResourceTypeScript: 'script',
+    QWebEngineUrlRequestInfo.ResourceTypeImage: 'image',
+    QWebEngineUrlRequestInfo.ResourceTypeFontResource: 'font',
+    QWebEngineUrlRequestInfo.ResourceTypeObject: 'object',
+    QWebEngineUrlRequestInfo.ResourceTypeMedia: 'media',
+    QWebEngineUrlRequestInfo.ResourceTypeXhr: 'xmlhttprequest',
+    QWebEngineUrlRequestInfo.ResourceTypePing: 'ping',
+    QWebEngineUrlRequestInfo.ResourceTypePluginResource: 'object',
+}
+
+class CookieMirror(QObject):
+    # Chromium's cookie store cannot be read, only watched; this keeps a copy of it,
+    # so downloads made outside QtWebEngine can send the profile's cookies.
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.cookies = {}
+        store.cookieAdded.connect(self.added)
+        store.cookieRemoved.connect(self.removed)
+
+    @staticmethod
+    def key(cookie):
+        return bytes(cookie.name()), cookie.domain(), cookie.path()
+
+    def added(self, cookie):
+        self.cookies[self.key(cookie)] = QNetworkCookie(cookie)
+
+    def removed(self, cookie):
+        self.cookies.pop(self.key(cookie), None)
+
+    def export(self):
+        # Unexpired cookies as plain dicts, see downloads.cookie_jar()
+        now = QDateTime.currentDateTimeUtc()
+        return [{'name': bytes(cookie.name()).decode('latin-1'), 'value': bytes(cookie.value()).decode('latin-1'),
+                 'domain': cookie.domain(), 'path': cookie.path() or '/', 'secure': cookie.isSecure()}
+                for cookie in self.cookies.values()
+                if cookie.isSessionCookie() or cookie.expirationDate() > now]
+
+class ProfileManager(QObject):
+    # One persistent profile with a disk cache and one off-the-record profile for
+    # private tabs. Both share a single interceptor.
+    def __init__(self, engine, storage_path, cache_path, cache_size_mb=DEFAULT_CACHE_SIZE_MB, cache_mode='disk', parent=None):
+        super().__init__(parent)
+        self.interceptor = RequestInterceptor(engine, self)
+
+        self.profile = QWebEngineProfile('val', self)
+        self.profile.setPersistentStoragePath(storage_path)
+        self.profile.setPersistentCookiesPolicy(QWebEngineProfile.AllowPersistentCookies)
+        self.profile.setUrlRequestInterceptor(self.interceptor)
+
+        self.private_profile = QWebEngineProfile(self)  # No storage name means off-the-record
+        self.private_profile.setHttpCacheType(QWebEngineProfile.MemoryHttpCache)
+        self.private_profile.setPersistentCookiesPolicy(QWebEngineProfile.NoPersistentCookies)
+        self.private_profile.setUrlRequestInterceptor(self.interceptor)
+        self.cookie_mirrors = {profile: CookieMirror(profile.cookieStore(), self) for profile in (self.profile, self.private_profile)}
+
+        self.cache_path = cache_path
+        self.cache_size_mb = cache_size_mb
+        self.cache_mode = cache_mode
+        self.configure_cache()
+
+    def configure_cache(self, cache_path=None, cache_size_mb=None, cache_mode=None):
+        if cache_path is not None:
+            self.cache_path = cache_path
+        if cache_size_mb is not None:
+            self.cache_size_mb = cache_size_mb
+        if cache_mode is not None:
+            self.cache_mode = cache_mode
+        self.profile.setCachePath(self.cache_path)
+        self.profile.setHttpCacheMaximumSize(self.cache_size_mb * 1024 * 1024)
+        self.profile.setHttpCacheType(CACHE_MODES[self.cache_mode])
+
+    def profile_for(self, is_private):
+        return self.private_profile if is_private else self.profile
+
+    def cookies(self, profile):
+        return self.cookie_mirrors[profile].export()
+
+    def new_page(self, is_private, parent):
+        return QWebEnginePage(self.profile_for(is_private), parent)
+
+class RequestInterceptor(QWebEngineUrlRequestInterceptor):
+    def __init__(self, engine=None, parent=None):
+        super().__init__(parent)
+        self.engine = engine if engine is not None else FilterEngine.with_defaults()
+        self.observer = None  # Called as observer(url, resource_type, first_party, blocked), see pagebench.py
+
+    def interceptRequest(self, info):
+        url = info.requestUrl().toString()
+        resource_type = RESOURCE_TYPE_NAMES.get(info.resourceType(), 'other')
+        first_party = info.firstPartyUrl().toString()
+        blocked = self.engine.should_block(url, resource_type, first_party)
+        info.block(blocked)
+        if self.observer is not None:
+            self.observer(url, resource_type, first_party, blocked)
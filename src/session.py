@@ -0,0 +1,209 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import os
+import json
+import time
+import threading
+
+FLUSH_DELAY = 1.0      # Seconds of quiet before buffered events are fsynced
+MAX_FLUSH_DELAY = 5.0  # ...but never longer than this while events keep arriving
+COMPACT_AFTER = 2000   # Events appended before the journal is rewritten as one snapshot
+
+class SessionState:
+    # What the journal describes: tabs by id, their order and the selected one.
+    # Every event is applied in O(1) apart from reorders, which are O(tabs).
+    def __init__(self):
+        self.tabs = {}
+        self.order = []
+        self.current = None
+
+    def apply(self, event):
+        op = event.get('op')
+        tab_id = event.get('tab')
+        if op == 'snapshot':
+            self.tabs = {tab['tab']: tab for tab in event['tabs']}
+            self.order = [tab['tab'] for tab in event['tabs']]
+            self.current = event.get('current')
+        elif op == 'open':
+            self.tabs[tab_id] = {'tab': tab_id, 'url': event['url'], 'title': event.get('title'), 'history': None, 'scroll': None}
+            self.place(tab_id, event.get('before'))
+        elif tab_id not in self.tabs:
+            return  # Events for tabs the journal never saw opened are dropped
+        elif op == 'close':
+            del self.tabs[tab_id]
+            self.order.remove(tab_id)
+            if self.current == tab_id:
+                self.current = None
+        elif op == 'move':
+            self.order.remove(tab_id)
+            self.place(tab_id, event.get('before'))
+        elif op == 'select':
+            self.current = tab_id
+        elif op == 'navigate':
+            tab = self.tabs[tab_id]
+            tab['url'] = event['url']
+            tab['title'] = event.get('title')
+            # URL changes are journaled before the load that brings the back/forward list;
+            # an older list would restore the page before this one, so it goes until then
+            tab['history'] = event.get('history')
+            tab['scroll'] = None
+        elif op == 'scroll':
+            self.tabs[tab_id]['scroll'] = event['scroll']
+
+    def place(self, tab_id, before):
+        if before in self.tabs and before != tab_id:
+            self.order.insert(self.order.index(before), tab_id)
+        else:
+            self.order.append(tab_id)
+
+    def snapshot(self):
+        return {'op': 'snapshot', 'tabs': [self.tabs[tab_id] for tab_id in self.order], 'current': self.current}
+
+    def ordered_tabs(self):
+        return [self.tabs[tab_id] for tab_id in self.order]
+
+def read_journal(path):
+    # A crash can leave a torn last line; everything before it still replays
+    state = SessionState()
+    events = 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                state.apply(event)
+                events += 1
+    except OSError:
+        pass
+    return state, events
+
+class SessionJournal:
+    # Append-only log of tab events. record() only formats a line into the
+    # file buffer; a background thread fsyncs once events stop arriving for
+    # `delay` seconds and compacts the log into a single snapshot, replaced
+    # atomically, once it grows past `compact_after` events.
+    def __init__(self, path, delay=FLUSH_DELAY, compact_after=COMPACT_AFTER, max_delay=MAX_FLUSH_DELAY):
+        self.path = path
+        self.delay = delay
+        self.max_delay = max(delay, max_delay)
+        self.compact_after = compact_after
+        self.state, self.events = read_journal(path)
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.pending_scroll = {}
+        self.dirty = False
+        self.closed = False
+        self.tail = None  # Lines recorded while a compaction is writing the snapshot
+        self.file = open(path, 'a', encoding='utf-8')
+        self.thread = threading.Thread(target=self.run, name='session-journal', daemon=True)
+        self.thread.start()
+
+    def record(self, op, tab_id=None, **fields):
+        event = {'op': op, 'tab': tab_id, **fields}
+        with self.lock:
+            if self.closed:
+                return
+            if op in ('navigate', 'close'):
+                self.pending_scroll.pop(tab_id, None)
+            self.write_event(event)
+            self.wake.notify()
+
+    def set_scroll(self, tab_id, scroll):
+        # Scrolling fires constantly, so only the last position per tab is written, at flush time
+        with self.lock:
+            if self.closed or tab_id not in self.state.tabs:
+                return
+            self.pending_scroll[tab_id] = scroll
+            self.dirty = True
+            self.wake.notify()
+
+    def write_event(self, event):
+        self.state.apply(event)
+        line = json.dumps(event, separators=(',', ':')) + '\n'
+        self.file.write(line)
+        if self.tail is not None:
+            self.tail.append(line)
+        self.events += 1
+        self.dirty = True
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.dirty and not self.closed:
+                    self.wake.wait()
+                if self.closed:
+                    return
+                # Debounce: keep waiting while events are still coming in
+                deadline = time.monotonic() + self.max_delay
+                while not self.closed:
+                    remaining = min(self.delay, deadline - time.monotonic())
+                    if remaining <= 0 or not self.wake.wait(remaining):
+                        break
+                if self.closed:
+                    return
+            self.flush()
+            if self.events >= self.compact_after:
+                self.compact()
+
+    def flush(self):
+        with self.lock:
+            for tab_id, scroll in self.pending_scroll.items():
+                self.write_event({'op': 'scroll', 'tab': tab_id, 'scroll': scroll})
+            self.pending_scroll.clear()
+            self.dirty = False
+            self.file.flush()
+            fd = os.dup(self.file.fileno())
+        # fsync outside the lock so the GUI thread never waits on the disk
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def compact(self):
+        tmp_path = self.path + '.tmp'
+        with self.lock:
+            snapshot = json.dumps(self.state.snapshot(), separators=(',', ':')) + '\n'
+            self.tail = []
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        with self.lock:
+            replacement = open(tmp_path, 'a', encoding='utf-8')
+            replacement.writelines(self.tail)
+            replacement.flush()
+            os.replace(tmp_path, self.path)
+            self.file.close()
+            self.file = replacement
+            self.events = 1 + len(self.tail)
+            self.tail = None
+        sync_directory(self.path)
+
+    def close(self):
+        # Clean shutdown leaves a compacted journal, so the next start replays one line
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.wake.notify()
+        self.thread.join()
+        self.flush()
+        self.compact()
+        self.file.close()
+
+def sync_directory(path):
+    # Make the rename itself durable. Not possible on Windows, where it is not needed.
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,138 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt5.QtWidgets import QTreeView
+
+PAGE_SIZE = 256
+
+class SidebarSection:
+    # One top-level group. Older entries are paged in from the store through
+    # fetch_page(cursor, limit) -> [(key, url, title)], newest first, with the
+    # key of the last row as the next cursor. Entries added while the sidebar
+    # is open go to `added` (oldest first), so both ends grow in O(1).
+    def __init__(self, title, fetch_page):
+        self.title = title
+        self.fetch_page = fetch_page
+        self.loaded = []
+        self.added = []
+        self.cursor = None
+        self.exhausted = False
+
+    def __len__(self):
+        return len(self.added) + len(self.loaded)
+
+    def entry(self, row):
+        if row < len(self.added):
+            return self.added[len(self.added) - 1 - row]
+        return self.loaded[row - len(self.added)]
+
+class SidebarModel(QAbstractItemModel):
+    # Two-level tree: sections, then their entries. Entries never move, rows are
+    # only ever inserted (short of a reset_section()), and the view asks for
+    # more through fetchMore().
+    def __init__(self, sections, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.sections = sections
+        self.page_size = page_size
+
+    def section_at(self, index):
+        # Section rows carry id 0, entry rows carry their section number + 1
+        if index.isValid() and index.internalId() == 0:
+            return self.sections[index.row()]
+        return None
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.sections)
+        section = self.section_at(parent)
+        return len(section) if section is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return True
+        section = self.section_at(parent)
+        return section is not None and (len(section) > 0 or not section.exhausted)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        section = self.section_at(index)
+        if section is not None:
+            return section.title if role == Qt.DisplayRole else None
+        key, url, title = self.sections[index.internalId() - 1].entry(index.row())
+        if role == Qt.DisplayRole:
+            return title or url
+        if role in (Qt.ToolTipRole, Qt.UserRole):
+            return url
+        return None
+
+    def canFetchMore(self, parent):
+        section = self.section_at(parent)
+        return section is not None and not section.exhausted
+
+    def fetchMore(self, parent):
+        section = self.section_at(parent)
+        if section is None or section.exhausted:
+            return
+        rows = section.fetch_page(section.cursor, self.page_size)
+        if len(rows) < self.page_size:
+            section.exhausted = True
+        if not rows:
+            return
+        first = len(section)
+        self.beginInsertRows(parent, first, first + len(rows) - 1)
+        section.loaded.extend(rows)
+        section.cursor = rows[-1][0]
+        self.endInsertRows()
+
+    def add(self, section_row, url, title=None):
+        # New entries go on top of their section
+        section = self.sections[section_row]
+        self.beginInsertRows(self.index(section_row, 0), 0, 0)
+        section.added.append((None, url, title))
+        self.endInsertRows()
+
+    def reset_section(self, section_row, fetch_page):
+        # For bulk changes (imports): drop what is loaded and page in from the top again
+        section = self.sections[section_row]
+        if len(section):
+            self.beginRemoveRows(self.index(section_row, 0), 0, len(section) - 1)
+            section.loaded, section.added = [], []
+            self.endRemoveRows()
+        section.fetch_page = fetch_page
+        section.cursor = None
+        section.exhausted = False
+        self.fetchMore(self.index(section_row, 0))
+
+    def update_title(self, section_row, url, title):
+        # Titles land just after the visit, so only the newest entry is checked
+        section = self.sections[section_row]
+        if section.added and section.added[-1][1] == url:
+            section.added[-1] = (None, url, title)
+            index = self.index(0, 0, self.index(section_row, 0))
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+class SidebarView(QTreeView):
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setHeaderHidden(True)
+        self.setUniformRowHeights(True)  # Lets the view lay out a million rows without measuring them
+        self.setExpandsOnDoubleClick(True)
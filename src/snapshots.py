@@ -0,0 +1,309 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Offline copies of pages. Once a page has settled it is saved as MHTML by
+# QWebEnginePage.save(); when a later load of the same URL is slow or fails,
+# the saved copy is laid over the tab until the live page arrives.
+
+#imports
+import os
+import time
+import queue
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from PyQt5.QtCore import QObject, QEvent, QUrl
+from bookmarks import normalize_url
+from history import connect
+
+SNAPSHOT_BUDGET_MB = 512
+MAX_SNAPSHOT_BYTES = 32 * 1024 * 1024  # Larger pages are not kept
+REFRESH_AFTER = 600.0  # Seconds before a page is saved again
+SAVED_SCHEMES = ('http', 'https')
+POLICIES = ('visited', 'bookmarked', 'off')
+PARTIAL_SUFFIX = '.partial.mhtml'
+SUFFIX = '.mhtml'
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    saved_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+"""
+
+def snapshot_key(url):
+    return normalize_url(url)
+
+def file_name(key):
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+class SnapshotCache:
+    # Saved copies on disk, one MHTML file per normalized URL, with an SQLite
+    # index. The index is also held in memory in least recently used order, so
+    # finding a copy never touches the disk; use times are written back lazily.
+    # Once the copies take more than budget_bytes, the least recently used go.
+    # After load(), every file and index write is done by one writer thread;
+    # the GUI thread only reads and updates the in-memory index, under a lock.
+    def __init__(self, directory, budget_bytes=SNAPSHOT_BUDGET_MB * 1024 * 1024, policy='visited', on_committed=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self.policy = policy
+        self.on_committed = on_committed  # Called on the writer thread with (url, entry), entry None if nothing was kept
+        self.entries = OrderedDict()  # key -> entry dict, least recently used first
+        self.pending = {}  # key -> partial path of a save in progress
+        self.dirty = set()  # Keys whose use time is newer than the index on disk
+        self.total_bytes = 0
+        self.evicted = 0
+        self.lock = threading.Lock()
+        # Opened here for load(), used only by the writer afterwards, and by close() once it has stopped
+        self.connection = connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.load()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name='snapshot-writer', daemon=True)
+        self.thread.start()
+
+    def load(self):
+        # Copies whose file is gone are forgotten, files nobody indexed (or
+        # half-written by a run that did not exit cleanly) are deleted
+        missing = []
+        for key, url, title, name, size, saved_at, used_at in self.connection.execute(
+                "SELECT key, url, title, name, size, saved_at, used_at FROM snapshots ORDER BY used_at"):
+            path = os.path.join(self.directory, name + SUFFIX)
+            if not os.path.exists(path):
+                missing.append((key,))
+                continue
+            self.entries[key] = {'url': url, 'title': title, 'path': path, 'size': size, 'saved_at': saved_at, 'used_at': used_at}
+            self.total_bytes += size
+        if missing:
+            with self.connection:
+                self.connection.executemany("DELETE FROM snapshots WHERE key = ?", missing)
+        known = {os.path.basename(entry['path']) for entry in self.entries.values()}
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX) and name not in known:
+                self.unlink(os.path.join(self.directory, name))
+        self.evict()
+
+    def unlink(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def find(self, url):
+        with self.lock:
+            return self.entries.get(snapshot_key(url))
+
+    def __contains__(self, url):
+        with self.lock:
+            return snapshot_key(url) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def due(self, url, bookmarked=False, now=None):
+        # Whether a settled page should be saved (again) under the current policy
+        if self.policy == 'off' or (self.policy == 'bookmarked' and not bookmarked):
+            return False
+        if urlsplit(url).scheme not in SAVED_SCHEMES:
+            return False
+        key = snapshot_key(url)
+        with self.lock:
+            if key in self.pending:
+                return False
+            entry = self.entries.get(key)
+        now = time.time() if now is None else now
+        return entry is None or now - entry['saved_at'] >= REFRESH_AFTER
+
+    def touch(self, url, now=None):
+        key = snapshot_key(url)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry['used_at'] = time.time() if now is None else now
+                self.entries.move_to_end(key)
+                self.dirty.add(key)
+        return entry
+
+    def reserve(self, url):
+        # Path to save a new copy to; it replaces the old one once committed
+        key = snapshot_key(url)
+        path = os.path.join(self.directory, file_name(key) + PARTIAL_SUFFIX)
+        with self.lock:
+            self.pending[key] = path
+        return path
+
+    def discard(self, url):
+        with self.lock:
+            path = self.pending.pop(snapshot_key(url), None)
+        if path is not None:
+            self.queue.put(('unlink', path))
+
+    def commit(self, url, title=None, saved_at=None):
+        # Hands a finished save to the writer, which takes it into the cache and
+        # calls on_committed. The URL is not due for another save meanwhile.
+        self.queue.put(('commit', url, title, saved_at))
+
+    def remove(self, url):
+        key = snapshot_key(url)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return
+            self.total_bytes -= entry['size']
+            self.dirty.discard(key)
+        self.queue.put(('forget', [(key, entry)]))
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.queue.put(('evict',))
+
+    def flush(self):
+        # Blocks until everything queued so far is on disk
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        for key in list(self.pending):
+            self.unlink(self.pending.pop(key))
+        with self.connection:
+            self.write_use_times()
+        self.connection.close()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if item[0] == 'commit':
+                    entry = self.store(*item[1:])
+                    if self.on_committed is not None:
+                        self.on_committed(item[1], entry)
+                elif item[0] == 'unlink':
+                    self.unlink(item[1])
+                elif item[0] == 'forget':
+                    self.forget(item[1])
+                elif item[0] == 'evict':
+                    self.evict()
+            except Exception:
+                # The writer lives on, so later saves and close() still work
+                log.exception('could not %s an offline copy', item[0])
+            finally:
+                self.queue.task_done()
+
+    def store(self, url, title=None, saved_at=None):
+        # Writer side of commit(); None if there was nothing worth keeping
+        key = snapshot_key(url)
+        with self.lock:
+            partial = self.pending.get(key)
+        if partial is None:
+            return None
+        try:
+            size = os.path.getsize(partial)
+        except OSError:
+            size = 0
+        if not size or size > min(MAX_SNAPSHOT_BYTES, self.budget_bytes):
+            with self.lock:
+                self.pending.pop(key, None)
+            self.unlink(partial)
+            return None
+        path = partial[:-len(PARTIAL_SUFFIX)] + SUFFIX
+        os.replace(partial, path)
+        saved_at = time.time() if saved_at is None else saved_at
+        entry = {'url': url, 'title': title, 'path': path, 'size': size, 'saved_at': saved_at, 'used_at': saved_at}
+        with self.lock:
+            self.pending.pop(key, None)
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old['size']
+            self.entries[key] = entry
+            self.total_bytes += size
+            self.dirty.discard(key)
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO snapshots (key, url, title, name, size, saved_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    (key, url, title, file_name(key), size, saved_at, saved_at))
+            self.write_use_times()
+        self.evict()
+        return entry
+
+    def evict(self):
+        with self.lock:
+            dropped = []
+            while self.entries and self.total_bytes > self.budget_bytes:
+                key, entry = self.entries.popitem(last=False)
+                self.total_bytes -= entry['size']
+                self.dirty.discard(key)
+                dropped.append((key, entry))
+            self.evicted += len(dropped)
+        self.forget(dropped)
+
+    def forget(self, dropped):
+        # Index rows and files of entries already taken out of memory
+        if not dropped:
+            return
+        with self.connection:
+            self.connection.executemany("DELETE FROM snapshots WHERE key = ?", [(key,) for key, entry in dropped])
+        for key, entry in dropped:
+            self.unlink(entry['path'])
+
+    def write_use_times(self):
+        with self.lock:
+            rows = [(self.entries[key]['used_at'], key) for key in self.dirty if key in self.entries]
+            self.dirty.clear()
+        if rows:
+            self.connection.executemany("UPDATE snapshots SET used_at = ? WHERE key = ?", rows)
+
+
+class SnapshotPreview(QObject):
+    # A saved copy laid over a tab's view while the live load carries on
+    # underneath. Following a link out of the copy navigates the tab itself.
+    def __init__(self, view, new_page):
+        super().__init__(view)
+        from PyQt5.QtWebEngineWidgets import QWebEngineView
+        self.view = view
+        self.entry = None
+        self.overlay = QWebEngineView(view)
+        self.overlay.setPage(new_page(self.overlay))
+        self.overlay.urlChanged.connect(self.follow)
+        self.overlay.hide()
+        view.installEventFilter(self)
+
+    @property
+    def showing(self):
+        return self.entry is not None
+
+    def show(self, entry):
+        if self.entry is not entry:
+            self.overlay.setUrl(QUrl.fromLocalFile(entry['path']))
+        self.entry = entry
+        self.overlay.setGeometry(self.view.rect())
+        self.overlay.show()
+        self.overlay.raise_()
+
+    def hide(self):
+        if self.entry is not None:
+            self.entry = None
+            self.overlay.hide()
+            self.overlay.setUrl(QUrl('about:blank'))  # Lets the copy's renderer go
+
+    def follow(self, url):
+        if self.entry is not None and not url.isLocalFile() and url.scheme() != 'about':
+            self.hide()
+            self.view.setUrl(url)
+
+    def eventFilter(self, watched, event):
+        if watched is self.view and event.type() == QEvent.Resize:
+            self.overlay.setGeometry(self.view.rect())
+        return False
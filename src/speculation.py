@@ -0,0 +1,203 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Speculative loading. While the user types, and for the most frecent sites at
+# startup, connections to the likely next origins are opened ahead of time, so
+# a navigation skips DNS, TCP and TLS setup. Qt has no preconnect call; a hidden
+# page holding <link rel="preconnect"> hints makes Chromium open them in the
+# profile's own socket pool, where the tab's navigation finds them.
+# Optionally the top suggestion is also prerendered in a hidden page, which
+# replaces the tab's page when Enter is pressed on it.
+
+#imports
+import math
+import time
+from html import escape
+from urllib.parse import urlsplit
+from PyQt5.QtCore import QObject, QTimer, QUrl
+from bookmarks import normalize_url
+from omnibox import frecency
+
+PRECONNECT_TTL = 10.0  # Chromium closes an unused preconnected socket after about this long
+PRECONNECT_BUDGET = (6, 10.0)  # At most this many origins per this many seconds
+PRERENDER_TTL = 30.0  # An unused prerender is thrown away after this long
+PRERENDER_BUDGET = (4, 60.0)  # Each one is a renderer running someone else's scripts
+PRERENDER_MIN_CHARS = 3  # Typed characters before the top suggestion is worth prerendering
+PRECONNECT_SUGGESTIONS = 2  # Suggestions whose origins are warmed while typing
+TOP_SITES = 5
+SPECULATED_SCHEMES = ('http', 'https')
+
+def origin_of(url):
+    parts = urlsplit(normalize_url(url))
+    if parts.scheme not in SPECULATED_SCHEMES or not parts.hostname:
+        return None
+    return f'{parts.scheme}://{parts.netloc.rpartition("@")[2]}'
+
+def hint_html(origins):
+    links = ''.join(f'<link rel="dns-prefetch" href="{escape(origin)}"><link rel="preconnect" href="{escape(origin)}">'
+                    for origin in origins)
+    return f'<!DOCTYPE html><html><head>{links}</head><body></body></html>'
+
+def top_origins(rows, limit=TOP_SITES):
+    # Origins by the summed frecency of their URLs, best first, from (url, visit_count, last_visit)
+    # rows. Only the first row for a URL counts, so newest-first visit rows can be passed as they are.
+    scores = {}
+    seen = set()
+    for url, visit_count, last_visit in rows:
+        origin = origin_of(url)
+        if origin is None or url in seen:
+            continue
+        seen.add(url)
+        score = frecency(visit_count, last_visit)
+        best = scores.get(origin)
+        scores[origin] = score if best is None else max(best, score) + math.log1p(math.exp(-abs(best - score)))
+    return sorted(scores, key=scores.__getitem__, reverse=True)[:limit]
+
+class Budget:
+    # Token bucket: `capacity` takes, refilled evenly over `period` seconds
+    def __init__(self, capacity, period, clock=time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def take(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class Speculator(QObject):
+    # Speculation never competes with the active tab: while `busy()` is true,
+    # preconnects wait for idle() and prerenders are not started at all.
+    # Hits and misses say whether it pays off: a navigation to a warm origin is
+    # a preconnect hit, one to a cold origin a miss; a prerender is a hit when
+    # it is taken and a miss when it is thrown away.
+    def __init__(self, new_page, busy=lambda: False, prerender_enabled=False, clock=time.monotonic, parent=None):
+        super().__init__(parent)
+        self.new_page = new_page  # new_page(parent) -> QWebEnginePage in the profile tabs use
+        self.busy = busy
+        self.prerender_enabled = prerender_enabled
+        self.clock = clock
+        self.preconnect_budget = Budget(*PRECONNECT_BUDGET, clock=clock)
+        self.prerender_budget = Budget(*PRERENDER_BUDGET, clock=clock)
+        self.warmer = None  # Hidden page holding the preconnect hints
+        self.warm = {}  # origin -> when it was preconnected
+        self.deferred = []  # Origins asked for while busy, newest last
+        self.prerendered = None  # {'key', 'url', 'page', 'finished'}
+        self.expiry = QTimer(self)
+        self.expiry.setSingleShot(True)
+        self.expiry.timeout.connect(self.discard_prerender)
+        self.counters = dict.fromkeys(('preconnects', 'preconnect_hits', 'preconnect_misses', 'preconnect_unused',
+                                       'prerenders', 'prerender_hits', 'prerender_misses'), 0)
+
+    def forget_cold(self):
+        now = self.clock()
+        for origin, warmed_at in list(self.warm.items()):
+            if now - warmed_at > PRECONNECT_TTL:
+                del self.warm[origin]
+                self.counters['preconnect_unused'] += 1
+
+    def preconnect(self, urls):
+        self.forget_cold()
+        origins = []
+        for url in urls:
+            origin = origin_of(url)
+            if origin is not None and origin not in self.warm and origin not in origins:
+                origins.append(origin)
+        if not origins:
+            return []
+        if self.busy():
+            self.deferred = [origin for origin in self.deferred if origin not in origins] + origins
+            return []
+        warmed = []
+        for origin in origins:
+            if not self.preconnect_budget.take():
+                break
+            self.warm[origin] = self.clock()
+            warmed.append(origin)
+        if warmed:
+            if self.warmer is None:
+                self.warmer = self.new_page(self)
+            # A new document replaces the old hints; connections already opening are kept by the socket pool
+            self.warmer.setHtml(hint_html(warmed))
+            self.counters['preconnects'] += len(warmed)
+        return warmed
+
+    def idle(self):
+        # The active tab has finished loading; run what was put off
+        deferred, self.deferred = self.deferred, []
+        if deferred:
+            self.preconnect(deferred[-PRECONNECT_BUDGET[0]:])
+
+    def prerender(self, url):
+        if not self.prerender_enabled or origin_of(url) is None:
+            return False
+        key = normalize_url(url)
+        if self.prerendered is not None and self.prerendered['key'] == key:
+            return True
+        if self.busy() or not self.prerender_budget.take():
+            return False
+        self.discard_prerender()
+        page = self.new_page(self)
+        page.setAudioMuted(True)
+        prerendered = self.prerendered = {'key': key, 'url': url, 'page': page, 'finished': None}
+        page.loadFinished.connect(lambda ok: prerendered.update(finished=ok))
+        page.setUrl(QUrl(url))
+        self.expiry.start(int(PRERENDER_TTL * 1000))
+        self.counters['prerenders'] += 1
+        return True
+
+    def take_prerender(self, url):
+        # (page, finished) for url, or None if it was not prerendered. finished is the
+        # page's loadFinished result, None while it is still loading. The caller owns the page from here on.
+        prerendered = self.prerendered
+        if prerendered is None:
+            return None
+        if prerendered['key'] != normalize_url(url):
+            self.discard_prerender()
+            return None
+        self.prerendered = None
+        self.expiry.stop()
+        self.counters['prerender_hits'] += 1
+        page = prerendered['page']
+        page.setAudioMuted(False)
+        return page, prerendered['finished']
+
+    def discard_prerender(self):
+        if self.prerendered is not None:
+            self.prerendered['page'].deleteLater()
+            self.prerendered = None
+            self.expiry.stop()
+            self.counters['prerender_misses'] += 1
+
+    def navigated(self, url):
+        # Counts a navigation the user started, and that no prerender served, as a preconnect hit or miss
+        origin = origin_of(url)
+        if origin is None:
+            return
+        warmed_at = self.warm.pop(origin, None)
+        if warmed_at is not None and self.clock() - warmed_at <= PRECONNECT_TTL:
+            self.counters['preconnect_hits'] += 1
+        else:
+            self.counters['preconnect_misses'] += 1
+            if warmed_at is not None:
+                self.counters['preconnect_unused'] += 1
+
+    def report(self):
+        report = dict(self.counters)
+        for kind in ('preconnect', 'prerender'):
+            tried = report[f'{kind}_hits'] + report[f'{kind}_misses']
+            report[f'{kind}_hit_rate'] = report[f'{kind}_hits'] / tried if tried else 0.0
+        return report
+
+    def close(self):
+        self.discard_prerender()
+        self.deferred = []
+        if self.warmer is not None:
+            self.warmer.deleteLater()
+            self.warmer = None
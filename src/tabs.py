@@ -0,0 +1,259 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import time
+import base64
+import itertools
+from collections import deque
+from functools import partial
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import QObject, QTimer, QUrl, QByteArray, QDataStream, QIODevice
+
+DEFAULT_MEMORY_BUDGET_MB = 2048
+HIBERNATION_INTERVAL_MS = 10000
+WARM_POOL_SIZE = 2
+REFILL_DELAY_MS = 1000   # Leaves the tab that just took a warm view to load undisturbed
+RECENTLY_CLOSED = 20
+LEAK_GRACE = 10.0        # Seconds a disposed view may take to be destroyed before it counts as leaked
+LATENCY_SAMPLES = 64
+WARM_URL = 'about:blank'  # Loaded into pooled views so their renderer is already running
+
+class TabPlaceholder(QWidget):
+    # Stands in for a QWebEngineView until the tab is activated. Has no renderer.
+    def __init__(self, url, title=None, parent=None, is_private=False, history=None, scroll=None):
+        super().__init__(parent)
+        self._url = url
+        self._title = title or url
+        self.is_private = is_private
+        self.last_active = 0.0
+        self.history = history  # Back/forward list from save_history(), restored on activation
+        self.scroll = scroll
+
+    def url(self):
+        return QUrl(self._url)
+
+    def title(self):
+        return self._title
+
+def is_placeholder(widget):
+    return isinstance(widget, TabPlaceholder)
+
+def save_history(view):
+    # QtWebEngine's own serialization of the back/forward list, as ASCII for the session journal
+    data = QByteArray()
+    stream = QDataStream(data, QIODevice.WriteOnly)
+    stream << view.history()
+    return base64.b64encode(bytes(data)).decode('ascii')
+
+def restore_history(view, encoded):
+    # Loads the current entry of the restored list. False if there was nothing usable.
+    try:
+        data = QByteArray(base64.b64decode(encoded))
+    except ValueError:
+        return False
+    stream = QDataStream(data, QIODevice.ReadOnly)
+    stream >> view.history()
+    return stream.status() == QDataStream.Ok and view.history().count() > 0
+
+def scroll_position(view):
+    position = view.page().scrollPosition()
+    return [int(position.x()), int(position.y())]
+
+def renderer_memory():
+    # Resident memory of every QtWebEngine child process, keyed by pid. That includes the GPU,
+    # zygote and utility processes and renderers no tab owns; callers pick the pids they need.
+    import psutil  # Only needed once the first check runs, keeps startup lean
+    usage = {}
+    try:
+        children = psutil.Process().children(recursive=True)
+    except psutil.Error:
+        return usage
+    for child in children:
+        try:
+            if 'QtWebEngineProcess' in child.name():
+                usage[child.pid] = child.memory_info().rss
+        except psutil.Error:
+            continue
+    return usage
+
+def pick_tabs_to_discard(candidates, excess):
+    # candidates: (last_active, estimated_bytes, tab) tuples. Oldest go first
+    # until the estimated savings cover the excess; always frees at least one.
+    victims = []
+    freed = 0
+    for last_active, estimated, tab in sorted(candidates, key=lambda c: c[0]):
+        if victims and freed >= excess:
+            break
+        victims.append(tab)
+        freed += estimated
+    return victims
+
+class HibernationManager(QObject):
+    # Only renderers behind tab views count against the budget: discarding tabs cannot
+    # free the GPU or utility processes, nor the warm pool's and prerender's renderers.
+    def __init__(self, window, budget_mb=DEFAULT_MEMORY_BUDGET_MB, interval=HIBERNATION_INTERVAL_MS, memory=renderer_memory):
+        super().__init__(window)
+        self.window = window
+        self.budget_mb = budget_mb
+        self.memory = memory
+        self.discarded = 0
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check_memory)
+        self.timer.start(interval)
+
+    def set_budget(self, budget_mb):
+        self.budget_mb = budget_mb
+        self.check_memory()
+
+    def touch(self, widget):
+        if widget is not None:
+            widget.last_active = time.monotonic()
+
+    def check_memory(self):
+        tab_widget = self.window.tab_widget
+        views = []
+        for i in range(tab_widget.count()):
+            widget = tab_widget.widget(i)
+            if is_placeholder(widget):
+                continue
+            pid = widget.page().renderProcessPid() if hasattr(widget.page(), 'renderProcessPid') else 0
+            views.append((i, widget, pid))
+        if not views:
+            return
+
+        usage = self.memory()
+        # Renderers can be shared between tabs, so each counts once and its RSS is split evenly.
+        sharing = {}
+        for _, _, pid in views:
+            if pid in usage:
+                sharing[pid] = sharing.get(pid, 0) + 1
+        total = sum(usage[pid] for pid in sharing)
+        budget = self.budget_mb * 1024 * 1024
+        if total <= budget:
+            return
+
+        current = tab_widget.currentIndex()
+        fallback = total // len(views)
+        candidates = []
+        for i, widget, pid in views:
+            if i == current or tab_widget.tabText(i) == "Pinned":
+                continue
+            estimated = usage[pid] // sharing[pid] if pid in sharing else fallback
+            candidates.append((getattr(widget, 'last_active', 0.0), estimated, widget))
+
+        for widget in pick_tabs_to_discard(candidates, total - budget):
+            self.window.hibernate_tab(tab_widget.indexOf(widget))
+            self.discarded += 1
+
+class TabLifecycle(QObject):
+    # Owns views from creation to destruction. Keeps a few views built ahead of
+    # time so a new tab skips view and page construction, disposes of closed
+    # ones with deleteLater() (which takes the page and its renderer along),
+    # and remembers recently closed tabs for undo. Views that are alive but in
+    # neither a tab nor the pool are counted as leaked by audit().
+    def __init__(self, window, build_view, pool_size=WARM_POOL_SIZE, closed_size=RECENTLY_CLOSED):
+        super().__init__(window)
+        self.window = window
+        self.build_view = build_view  # build_view(is_private) -> a view that has not loaded anything
+        self.pool_size = pool_size
+        self.warm = {False: [], True: []}
+        self.closed = deque(maxlen=closed_size)
+        self.live = {}
+        self.disposed_at = {}
+        self.serials = itertools.count(1)
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.warm_hits = 0
+        self.warm_misses = 0
+        self.leaked = 0
+        self.refill_timer = QTimer(self)
+        self.refill_timer.setSingleShot(True)
+        self.refill_timer.timeout.connect(self.refill)
+
+    def track(self, view):
+        serial = next(self.serials)
+        view.lifecycle_serial = serial
+        self.live[serial] = view
+        view.destroyed.connect(partial(self.forget, serial))
+        return view
+
+    def forget(self, serial, obj=None):
+        self.live.pop(serial, None)
+        self.disposed_at.pop(serial, None)
+
+    def new_view(self, is_private):
+        # A warm view if one is ready, a fresh one otherwise
+        pool = self.warm[is_private]
+        if pool:
+            self.warm_hits += 1
+            view = pool.pop()
+        else:
+            self.warm_misses += 1
+            view = self.track(self.build_view(is_private))
+        self.schedule_refill()
+        return view
+
+    def schedule_refill(self, delay=REFILL_DELAY_MS):
+        if self.pool_size and not self.refill_timer.isActive():
+            self.refill_timer.start(delay)
+
+    def refill(self):
+        # One view per pass, so a refill never holds the event loop for long
+        is_private = self.window.is_private_browsing
+        pool = self.warm[is_private]
+        if len(pool) < self.pool_size:
+            view = self.track(self.build_view(is_private))
+            view.setUrl(QUrl(WARM_URL))
+            pool.append(view)
+        if len(pool) < self.pool_size:
+            self.schedule_refill(0)
+
+    def record_open(self, seconds):
+        self.latencies.append(seconds)
+
+    def open_latency_ms(self):
+        # Median of the recent new-tab latencies
+        if not self.latencies:
+            return 0.0
+        return sorted(self.latencies)[len(self.latencies) // 2] * 1000
+
+    def remember(self, widget, index):
+        # Private tabs are not kept around after they are closed
+        if widget.is_private:
+            return
+        if is_placeholder(widget):
+            history, scroll = widget.history, widget.scroll
+        else:
+            history, scroll = save_history(widget), scroll_position(widget)
+        self.closed.append({'url': widget.url().toString(), 'title': widget.title(), 'history': history,
+                            'scroll': scroll, 'index': index})
+
+    def pop_closed(self):
+        return self.closed.pop() if self.closed else None
+
+    def dispose(self, widget):
+        serial = getattr(widget, 'lifecycle_serial', None)
+        if serial is not None:
+            self.disposed_at[serial] = time.monotonic()
+        widget.deleteLater()
+
+    def audit(self):
+        # Runs on the GUI thread; the sampler only reads the result
+        in_use = set()
+        tab_widget = self.window.tab_widget
+        for i in range(tab_widget.count()):
+            in_use.add(getattr(tab_widget.widget(i), 'lifecycle_serial', None))
+        for pool in self.warm.values():
+            in_use.update(view.lifecycle_serial for view in pool)
+        now = time.monotonic()
+        # Disposed views get a grace period; one that was never disposed is leaked as soon as it is out of use
+        self.leaked = sum(1 for serial in self.live
+                          if serial not in in_use and now - self.disposed_at.get(serial, float('-inf')) > LEAK_GRACE)
+        return self.leaked
+
+    def close(self):
+        self.refill_timer.stop()
+        for pool in self.warm.values():
+            for view in pool:
+                self.dispose(view)
+            pool.clear()
@@ -0,0 +1,124 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import json
+from datetime import datetime, timedelta, time
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+DARK_STARTS = time(18, 0)
+DARK_ENDS = time(6, 0)
+MAX_TIMER_MS = 60 * 60 * 1000  # Re-check at least hourly in case the clock jumps (sleep, DST)
+
+STYLESHEETS = {
+    'dark': """
+        QMainWindow { background-color: #2c2c2c; color: white; }
+        QLineEdit { background-color: #4d4d4d; color: white; border: 1px solid #666; }
+        QPushButton { background-color: #5c5c5c; color: white; border-radius: 5px; }
+        QTabWidget { background-color: #3c3c3c; }
+    """,
+    'light': """
+        QMainWindow { background-color: white; color: black; }
+        QLineEdit { background-color: #f0f0f0; color: black; border: 1px solid #ccc; }
+        QPushButton { background-color: #e0e0e0; color: black; border-radius: 5px; }
+        QTabWidget { background-color: #f7f7f7; }
+    """,
+}
+
+PAGE_CSS = {
+    'dark': 'html { background-color: #2c2c2c; color: white; } body.ntp { background-color: #2c2c2c; color: white; }',
+    'light': '',
+}
+
+SCRIPT_NAME = 'val-theme'
+
+# A constructed stylesheet needs no DOM, so it can be adopted the moment the
+# document exists, before anything paints. Running it again swaps the rules.
+THEME_SCRIPT = """
+(function (css) {
+    if (window.__valTheme) {
+        window.__valTheme.replaceSync(css);
+    } else if (css && document.adoptedStyleSheets !== undefined) {
+        window.__valTheme = new CSSStyleSheet();
+        window.__valTheme.replaceSync(css);
+        document.adoptedStyleSheets = document.adoptedStyleSheets.concat([window.__valTheme]);
+    }
+})(%s);
+"""
+
+def scheduled_theme(now):
+    current = now.time()
+    return 'dark' if current >= DARK_STARTS or current < DARK_ENDS else 'light'
+
+def next_transition(now):
+    # The next 06:00 or 18:00 strictly after now
+    candidates = []
+    for day in (now.date(), now.date() + timedelta(days=1)):
+        for moment in (DARK_ENDS, DARK_STARTS):
+            candidates.append(datetime.combine(day, moment))
+    return min(candidate for candidate in candidates if candidate > now)
+
+def theme_script_source(theme):
+    return THEME_SCRIPT % json.dumps(PAGE_CSS[theme])
+
+class ThemeEngine(QObject):
+    # Restyles the window and pages only when the theme actually changes. Pages
+    # get their CSS from a document-creation script on every profile, so new
+    # documents are themed before first paint; open pages are updated once.
+    changed = pyqtSignal(str)
+
+    def __init__(self, window, pages=lambda: []):
+        super().__init__(window)
+        self.window = window
+        self.pages = pages
+        self.theme = None
+        self.profiles = []
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.follow_schedule)
+
+    def apply(self, theme):
+        if theme == self.theme:
+            return False
+        self.theme = theme
+        self.window.setStyleSheet(STYLESHEETS[theme])
+        for profile in self.profiles:
+            self.install_script(profile)
+        source = theme_script_source(theme)
+        for page in self.pages():
+            page.runJavaScript(source, self.world())
+        self.changed.emit(theme)
+        return True
+
+    def add_profile(self, profile):
+        self.profiles.append(profile)
+        self.install_script(profile)
+
+    def install_script(self, profile):
+        from PyQt5.QtWebEngineWidgets import QWebEngineScript
+        scripts = profile.scripts()
+        for script in scripts.findScripts(SCRIPT_NAME):
+            scripts.remove(script)
+        if not PAGE_CSS[self.theme]:
+            return
+        script = QWebEngineScript()
+        script.setName(SCRIPT_NAME)
+        script.setSourceCode(theme_script_source(self.theme))
+        script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+        script.setWorldId(self.world())
+        script.setRunsOnSubFrames(True)
+        scripts.insert(script)
+
+    def world(self):
+        # Out of reach of page scripts, but styles still apply to the shared document
+        from PyQt5.QtWebEngineWidgets import QWebEngineScript
+        return QWebEngineScript.ApplicationWorld
+
+    def start_schedule(self):
+        self.follow_schedule()
+
+    def follow_schedule(self, now=None):
+        now = now or datetime.now()
+        self.apply(scheduled_theme(now))
+        wait_ms = int((next_transition(now) - now).total_seconds() * 1000) + 1
+        self.timer.start(min(wait_ms, MAX_TIMER_MS))
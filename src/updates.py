@@ -0,0 +1,83 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+#imports
+import os
+import json
+import time
+
+CURRENT_VERSION = '14.0.1528.15'
+RELEASES_URL = 'https://api.github.com/repos/owgydz/val/releases/latest?channel={channel}'
+CACHE_TTL = 6 * 60 * 60  # Seconds a cached answer is trusted without asking GitHub
+TIMEOUT = 5
+
+def parse_version(tag):
+    # Release tags look like 14.0.1528.15, sometimes with a leading v
+    parts = tag.strip().lstrip('vV').split('.')
+    try:
+        return tuple(int(part) for part in parts)
+    except ValueError:
+        raise ValueError(f'Not a version tag: {tag!r}') from None
+
+def is_newer(latest, current=CURRENT_VERSION):
+    latest, current = parse_version(latest), parse_version(current)
+    # Pad so 14.0 and 14.0.0.0 compare equal
+    width = max(len(latest), len(current))
+    return latest + (0,) * (width - len(latest)) > current + (0,) * (width - len(current))
+
+class UpdateChecker:
+    def __init__(self, cache_path, url=RELEASES_URL, ttl=CACHE_TTL, timeout=TIMEOUT):
+        self.cache_path = cache_path
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        import requests  # Deferred: the version helpers are needed at startup, requests is not
+        self.session = requests.Session()
+        self.session.headers['Accept'] = 'application/vnd.github+json'
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, cache):
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def check(self, channel, current=CURRENT_VERSION, force=False):
+        cache = self.load_cache()
+        entry = cache.get(channel, {})
+        now = time.time()
+
+        if not force and entry.get('tag_name') and now - entry.get('fetched_at', 0) < self.ttl:
+            return self.result(entry, current, cached=True)
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        response = self.session.get(self.url.format(channel=channel), headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and entry.get('tag_name'):
+            cached = True
+        else:
+            response.raise_for_status()
+            entry = {
+                'tag_name': response.json()['tag_name'],
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+            cached = False
+        entry['fetched_at'] = now
+        cache[channel] = entry
+        self.save_cache(cache)
+        return self.result(entry, current, cached)
+
+    def result(self, entry, current, cached):
+        latest = entry['tag_name']
+        return {'latest': latest, 'current': current, 'available': is_newer(latest, current), 'cached': cached}
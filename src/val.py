@@ -3,27 +3,69 @@
 
 #imports
 import sys
-import requests
+if __name__ == '__main__' and sys.argv[1:2] != ['bench']:
+    # Hand the URLs to a running browser before paying for the GUI imports below
+    from instance import forward_command_line
+    if forward_command_line(sys.argv[1:]):
+        sys.exit(0)
 import os
-import json
-import psutil
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QLineEdit, QHBoxLayout, QTabWidget, QAction, QMessageBox, QMenuBar, QInputDialog, QRadioButton, QDialog, QProgressBar, QStatusBar, QDockWidget, QListWidget, QLabel, QTextEdit
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineProfile, QWebEnginePage, QWebEngineDownloadItem
-from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor
-from PyQt5.QtCore import QUrl, Qt, QTimer, QEventLoop, QThread
-from PyQt5.QtGui import QIcon
-from datetime import datetime, time
+import time
+import threading
+from time import perf_counter
+from functools import partial
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QLineEdit, QHBoxLayout, QTabWidget, QAction, QMessageBox, QMenuBar, QInputDialog, QRadioButton, QDialog, QProgressBar, QStatusBar, QDockWidget, QListWidget, QListWidgetItem, QLabel, QTextEdit, QFileDialog, QSpinBox, QCompleter
+from PyQt5.QtCore import QUrl, Qt, QTimer, QEventLoop, QThread, QObject, QStandardPaths, QPointF, QCoreApplication, QStringListModel, pyqtSignal
+from PyQt5.QtGui import QIcon, QPainter, QPolygonF, QColor
+from datetime import datetime
+from tabs import TabPlaceholder, HibernationManager, TabLifecycle, is_placeholder, save_history, restore_history, scroll_position
+from filters import FilterEngine
+from session import SessionJournal
+from history import HistoryStore, should_record
+from bookmarks import BookmarkStore
+from fulltext import FullTextIndex, PAGE_TEXT_SCRIPT
+from snapshots import SnapshotCache, SnapshotPreview, snapshot_key
+from speculation import Speculator, top_origins, PRECONNECT_SUGGESTIONS, PRERENDER_MIN_CHARS
+from sidebar import SidebarSection, SidebarModel, SidebarView
+from omnibox import OmniboxIndex, Omnibox, url_key
+from theme import ThemeEngine, scheduled_theme
+from updates import CURRENT_VERSION, CACHE_TTL
+
+# QtWebEngine (profiles.py), requests (downloads.py, updates.py) and psutil
+# (monitor.py) are imported on first use, so importing val and painting the
+# first window stay cheap. QtWebEngine may only be imported after the
+# QApplication exists when contexts are shared, so ask for that up front.
+if QCoreApplication.instance() is None:
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+
+UPDATE_CHECK_DELAY_MS = 15000  # Scheduled check runs after startup has settled
+PAGE_SETTLE_DELAY_MS = 2000  # Page text is read and an offline copy saved once a page has settled, off the load's critical path
+SLOW_LOAD_MS = 2500  # A load running longer than this shows the saved copy, if there is one
+SPECULATION_DELAY_MS = 3000  # The most frecent sites are preconnected once startup has settled
+TOP_SITE_VISITS = 500  # Recent visits the top sites are picked from
+SIDEBAR_BOOKMARKS, SIDEBAR_HISTORY = 0, 1  # Section rows in the sidebar model
+
+def app_data_path(*parts):
+    base = QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation) or os.path.expanduser('~')
+    path = os.path.join(base, 'val', *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def __getattr__(name):
+    # The interceptor and profiles moved to profiles.py, which pulls in QtWebEngine
+    if name in ('RequestInterceptor', 'ProfileManager', 'RESOURCE_TYPE_NAMES', 'CACHE_MODES'):
+        import profiles
+        return getattr(profiles, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Val(QMainWindow):
-    def __init__(self):
+    snapshot_committed = pyqtSignal(str, object)  # url, entry or None; emitted by the snapshot writer thread
+
+    def __init__(self, urls=()):
         super().__init__()
         self.setWindowTitle('Orange Valium')
         self.setGeometry(100, 100, 1200, 800)
-        self.browser = QWebEngineView(self)
-        self.theme = 'light'
-        self.set_style(self.theme)
-        self.channel = 'stable'
-        self.set_channel(self.channel)
+        self.browser = None  # Active tab's view, set by add_new_tab/activate_tab
+        self.channel = 'stable'  # set_channel() confirms with a dialog, so it is only for user choices
         self.main_widget = QWidget()
         self.setCentralWidget(self.main_widget)
         self.layout = QVBoxLayout(self.main_widget)
@@ -37,6 +79,15 @@ class Val(QMainWindow):
         self.url_bar.returnPressed.connect(self.navigate_to_url)
         self.nav_layout.addWidget(self.url_bar)
 
+        # Suggestions are computed off the GUI thread by the omnibox, see finish_startup()
+        self.suggestion_model = QStringListModel(self)
+        self.completer = QCompleter(self.suggestion_model, self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setMaxVisibleItems(8)
+        self.url_bar.setCompleter(self.completer)
+        self.omnibox = None
+        self.speculator = None  # Preconnects and prerenders ahead of navigations, see finish_startup()
+
         # Icons
         icon_dir = os.path.join(os.path.dirname(__file__), 'icons')
         back_icon = QIcon(os.path.join(icon_dir, 'back.png'))
@@ -66,34 +117,162 @@ class Val(QMainWindow):
         self.tab_widget.setMovable(True)
         self.tab_widget.tabCloseRequested.connect(self.close_tab)
         self.tab_widget.tabBarDoubleClicked.connect(self.pin_tab)
-        self.tab_widget.currentChanged.connect(self.update_url_bar)
+        self.tab_widget.currentChanged.connect(self.activate_tab)
+        self.tab_widget.tabBar().tabMoved.connect(self.tab_moved)
         self.layout.addWidget(self.tab_widget)
 
+        # Start in the scheduled theme; the engine restyles only at 06:00/18:00 or on request
+        self.themes = ThemeEngine(self, self.open_pages)
+        self.set_style(scheduled_theme(datetime.now()))
+
         # Default home URL
         self.home_url = 'https://www.google.com'
 
-        # Connect button signals AFTER initializing self.browser
+        # Buttons act on whichever tab is active when clicked
         self.back_button.clicked.connect(lambda: self.browser.back())
         self.forward_button.clicked.connect(lambda: self.browser.forward())
         self.refresh_button.clicked.connect(lambda: self.browser.reload())
         self.home_button.clicked.connect(self.go_home)
 
         # Bookmarks, history, private browsing
-        self.bookmarks = []
-        self.history = []
+        self.bookmarks = None  # BookmarkStore, opened by finish_startup()
+        self.bookmark_thread = None
+        self.history = None  # HistoryStore, opened by finish_startup()
+        self.fulltext = None  # FullTextIndex of visited page text, opened by finish_startup()
+        self.snapshots = None  # SnapshotCache of offline copies, opened by finish_startup()
+        self.snapshot_saves = {}  # Partial file path -> (url, title) of copies being saved
         self.is_private_browsing = False
 
-        # First tab
-        self.add_new_tab(self.home_url)
+        # Ad/tracker blocklists and the profiles every tab shares
+        self.filter_lists = []
+        self.filter_engine = FilterEngine.with_defaults()
+        self.profiles = None  # Created with the first tab, see ensure_profiles()
+
+        # Downloads are handed from QtWebEngine to the segmented download engine
+        self.downloads = []
+        self.download_engine = None
+        self.native_downloads = {}  # URL -> download the engine handed back to QtWebEngine
+        self.download_manager_dialog = None
+        self.download_bridge = DownloadBridge(self)
+        self.download_bridge.progress.connect(self.update_download)
+        self.download_bridge.finished.connect(self.finish_download)
+
+        # Background tabs get discarded once renderers go over the memory budget
+        self.hibernation = HibernationManager(self)
+        # Views are built, pooled and disposed of here; closed tabs can be reopened
+        self.tab_lifecycle = TabLifecycle(self, self.build_view)
+        self.next_tab_id = 1
+        self.open_tabs = 0
+
+        # Status Bar
+        self.status_bar = QStatusBar(self)
+        self.setStatusBar(self.status_bar)
 
-        # Set up menu
+        # Top-level menus paint with the window; their actions are added after the first paint
         self.menu_bar = self.menuBar()
         self.file_menu = self.menu_bar.addMenu('File')
+        self.view_menu = self.menu_bar.addMenu('View')
         self.bookmarks_menu = self.menu_bar.addMenu('Bookmarks')
         self.history_menu = self.menu_bar.addMenu('History')
         self.settings_menu = self.menu_bar.addMenu('Settings')
         self.help_menu = self.menu_bar.addMenu('Help')
 
+        # Subsystems built by finish_startup() once the window has painted
+        self.sidebar = None
+        self.session = None  # Journal of tab events, see load_session()
+        self.sampler = None
+        self.metrics_server = None  # Only with VAL_METRICS_PORT set
+        self.profiler = None  # Opt-in, see start_profiler()
+        self.update_checker = None
+        self.update_thread = None
+        self.startup_finished = False
+        self.first_paint_time = None
+
+        # First tab: the home page, unless the command line named pages to open
+        self.startup_urls = list(urls)
+        self.add_new_tab(self.startup_urls[0] if self.startup_urls else self.home_url)
+        for url in self.startup_urls[1:]:
+            self.add_new_tab(url, background=True)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint_time is None:
+            self.first_paint_time = perf_counter()
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        # Everything the first paint does not need. Safe to call early (tests, benchmarks).
+        if self.startup_finished:
+            return
+        self.startup_finished = True
+        self.build_menus()
+
+        # Dark Mode Scheduling: one single-shot timer armed for the next transition
+        self.themes.start_schedule()
+
+        # Performance monitoring for workloads.
+        # The sampler walks renderer processes on its own thread; this timer only
+        # hands it the tab list and refreshes the status bar from its last sample.
+        from monitor import ResourceSampler, exporter_from_environment
+        self.sampler = ResourceSampler()
+        self.sampler.add_gauge('val_tabs_open', 'Open tabs, loaded or not.', lambda: self.open_tabs)
+        self.sampler.add_gauge('val_tabs_hibernated_total', 'Tabs discarded by the memory budget.', lambda: self.hibernation.discarded)
+        self.sampler.add_gauge('val_new_tab_latency_ms', 'Median time to open a foreground tab, recent tabs.', self.tab_lifecycle.open_latency_ms)
+        self.sampler.add_gauge('val_tab_views_warm', 'Views built ahead of time for new tabs.', lambda: sum(map(len, self.tab_lifecycle.warm.values())))
+        self.sampler.add_gauge('val_tab_views_leaked', 'Views alive but in no tab and not in the warm pool.', lambda: self.tab_lifecycle.leaked)
+        self.sampler.add_gauge('val_snapshot_bytes', 'Disk used by offline copies of pages.', lambda: self.snapshots.total_bytes if self.snapshots else 0)
+        self.sampler.add_gauge('val_snapshots_evicted_total', 'Offline copies dropped to stay within the budget.', lambda: self.snapshots.evicted if self.snapshots else 0)
+        self.sampler.add_gauge('val_preconnect_hits_total', 'Navigations to an origin preconnected in time.', lambda: self.speculator.counters['preconnect_hits'] if self.speculator else 0)
+        self.sampler.add_gauge('val_preconnect_misses_total', 'Navigations to an origin that was not preconnected.', lambda: self.speculator.counters['preconnect_misses'] if self.speculator else 0)
+        self.sampler.add_gauge('val_prerender_hits_total', 'Prerendered pages swapped into a tab.', lambda: self.speculator.counters['prerender_hits'] if self.speculator else 0)
+        self.sampler.add_gauge('val_prerender_misses_total', 'Prerendered pages thrown away unused.', lambda: self.speculator.counters['prerender_misses'] if self.speculator else 0)
+        self.sampler.publish_gauges()
+        self.metrics_server = exporter_from_environment(self.sampler)
+        self.sampler.start()
+        if os.environ.get('VAL_PROFILE'):
+            self.start_profiler()
+        self.performance_timer = QTimer(self)
+        self.performance_timer.timeout.connect(self.update_performance)
+        self.performance_timer.start(5000) # Forces to 5 seconds.   
+
+        self.cpu_label = QLabel("CPU Usage: 0%", self)
+        self.mem_label = QLabel("Memory Usage: 0%", self)
+        self.status_bar.addPermanentWidget(self.cpu_label)
+        self.status_bar.addPermanentWidget(self.mem_label)
+
+        # Update checks run on a worker thread; the scheduled ones stay quiet unless there is news
+        self.update_timer = QTimer(self)
+        self.update_timer.timeout.connect(lambda: self.check_for_updates(silent=True))
+        self.update_timer.start(CACHE_TTL * 1000)
+        QTimer.singleShot(UPDATE_CHECK_DELAY_MS, lambda: self.check_for_updates(silent=True))
+
+        # Every committed navigation outside private tabs goes to the on-disk history
+        self.history = HistoryStore(app_data_path('history.sqlite'))
+        self.bookmarks = BookmarkStore(app_data_path('bookmarks.sqlite'))
+        self.fulltext = FullTextIndex(app_data_path('pages.sqlite'))
+        self.snapshots = SnapshotCache(app_data_path('snapshots'), on_committed=self.snapshot_committed.emit)
+        self.snapshot_committed.connect(self.snapshot_stored)
+        self.ensure_sidebar()
+
+        # The autocomplete index fills from history and bookmarks in the background;
+        # it answers from whatever it holds so far while it is being built
+        self.omnibox_index = OmniboxIndex()
+        self.omnibox_build = threading.Thread(target=self.omnibox_index.build, args=(self.history, self.bookmarks), name='omnibox-build', daemon=True)
+        self.omnibox_build.start()
+        self.omnibox = Omnibox(self.omnibox_index, self)
+        self.omnibox.suggestions.connect(self.show_suggestions)
+        self.url_bar.textEdited.connect(self.omnibox.request)
+
+        # Connections to the likely next sites are opened ahead of time, never while the active tab loads
+        self.speculator = Speculator(lambda parent: self.ensure_profiles().new_page(False, parent),
+                                     busy=lambda: getattr(self.browser, 'loading', False), parent=self)
+        QTimer.singleShot(SPECULATION_DELAY_MS, self.preconnect_top_sites)
+
+        # Restore the previous session behind the first tab
+        self.load_session()
+        self.tab_lifecycle.schedule_refill()
+
+    def build_menus(self):
         # Actions for menu items
         self.add_bookmark_action = QAction('Add Bookmark', self)
         self.add_bookmark_action.triggered.connect(self.add_bookmark)
@@ -103,18 +282,51 @@ class Val(QMainWindow):
         self.view_bookmarks_action.triggered.connect(self.view_bookmarks)
         self.bookmarks_menu.addAction(self.view_bookmarks_action)
 
+        self.import_bookmarks_action = QAction('Import Bookmarks...', self)
+        self.import_bookmarks_action.triggered.connect(self.import_bookmarks)
+        self.bookmarks_menu.addAction(self.import_bookmarks_action)
+
+        self.export_bookmarks_action = QAction('Export Bookmarks...', self)
+        self.export_bookmarks_action.triggered.connect(self.export_bookmarks)
+        self.bookmarks_menu.addAction(self.export_bookmarks_action)
+
         self.view_history_action = QAction('View History', self)
         self.view_history_action.triggered.connect(self.view_history)
         self.history_menu.addAction(self.view_history_action)
 
+        self.search_pages_action = QAction('Search Page Text...', self)
+        self.search_pages_action.triggered.connect(self.search_page_text)
+        self.history_menu.addAction(self.search_pages_action)
+
         self.set_homepage_action = QAction('Set Homepage', self)
         self.set_homepage_action.triggered.connect(self.set_homepage)
         self.settings_menu.addAction(self.set_homepage_action)
 
+        self.set_memory_budget_action = QAction('Set Memory Budget', self)
+        self.set_memory_budget_action.triggered.connect(self.set_memory_budget)
+        self.settings_menu.addAction(self.set_memory_budget_action)
+
         self.toggle_private_browsing_action = QAction('Toggle Private Browsing', self)
         self.toggle_private_browsing_action.triggered.connect(self.toggle_private_browsing)
         self.settings_menu.addAction(self.toggle_private_browsing_action)
 
+        self.load_blocklist_action = QAction('Load Blocklist', self)
+        self.load_blocklist_action.triggered.connect(self.load_blocklist)
+        self.settings_menu.addAction(self.load_blocklist_action)
+
+        self.prerender_action = QAction('Prerender URL Bar Suggestions', self)
+        self.prerender_action.setCheckable(True)
+        self.prerender_action.toggled.connect(self.set_prerender)
+        self.settings_menu.addAction(self.prerender_action)
+
+        self.cache_settings_action = QAction('Cache Settings', self)
+        self.cache_settings_action.triggered.connect(self.change_cache_settings)
+        self.settings_menu.addAction(self.cache_settings_action)
+
+        self.snapshot_settings_action = QAction('Offline Copies', self)
+        self.snapshot_settings_action.triggered.connect(self.change_snapshot_settings)
+        self.settings_menu.addAction(self.snapshot_settings_action)
+
         # Add Theme Customization action
         self.theme_customization_action = QAction('Change Theme', self)
         self.theme_customization_action.triggered.connect(self.change_theme)
@@ -130,6 +342,11 @@ class Val(QMainWindow):
         self.check_for_updates_action.triggered.connect(self.check_for_updates)
         self.help_menu.addAction(self.check_for_updates_action)
 
+        self.reopen_closed_tab_action = QAction('Reopen Closed Tab', self)
+        self.reopen_closed_tab_action.setShortcut('Ctrl+Shift+T')
+        self.reopen_closed_tab_action.triggered.connect(self.reopen_closed_tab)
+        self.file_menu.addAction(self.reopen_closed_tab_action)
+
         # Download manager action
         self.download_manager_action = QAction('Download Manager', self)
         self.download_manager_action.triggered.connect(self.open_download_manager)
@@ -140,18 +357,6 @@ class Val(QMainWindow):
         self.channel_selection_action.triggered.connect(self.select_channel)
         self.settings_menu.addAction(self.channel_selection_action)
 
-        # Dark Mode Scheduling
-        self.dark_mode_timer = QTimer(self)
-        self.dark_mode_timer.timeout.connect(self.check_dark_mode_schedule)
-        self.dark_mode_timer.start(60000)  # Check every minute
-
-        # Status Bar
-        self.status_bar = QStatusBar(self)
-        self.setStatusBar(self.status_bar)
-        self.browser.urlChanged.connect(self.update_status_bar)
-        self.browser.loadStarted.connect(self.show_loading_status)
-        self.browser.loadFinished.connect(self.show_ready_status)
-
         # Tools submenu
         self.tools_menu = self.settings_menu.addMenu('Tools')
 
@@ -160,51 +365,424 @@ class Val(QMainWindow):
         self.usage_action.triggered.connect(self.show_usage)
         self.tools_menu.addAction(self.usage_action)
 
-        # Sidebar for Bookmarks and History
+        self.profiler_action = QAction('Profiler', self)
+        self.profiler_action.triggered.connect(self.show_profiler)
+        self.tools_menu.addAction(self.profiler_action)
+
+    def ensure_sidebar(self):
+        # Sidebar for Bookmarks and History, docked at startup with both sections collapsed.
+        # Entries from before it opened are paged in once a section is expanded and scrolled;
+        # later ones are added live. View > Bookmarks & History brings it back once closed.
+        if self.sidebar is not None:
+            return
+        # Visits the writer has not committed yet are shown from memory rather than waited
+        # for; history pages stop at the first of them, so none is listed twice
+        unwritten = self.history.unwritten_visits() if self.history is not None else []
+        paged_until = unwritten[0][2] if unwritten else time.time()
+        self.sidebar_model = SidebarModel([
+            SidebarSection('Bookmarks', partial(self.bookmark_page, self.bookmarks.last_id() if self.bookmarks is not None else 0)),
+            SidebarSection('History', partial(self.history_page, paged_until)),
+        ], parent=self)
+        for url, title, visited_at in unwritten:
+            self.sidebar_model.add(SIDEBAR_HISTORY, url, title)
         self.sidebar = QDockWidget("Bookmarks & History", self)
         self.sidebar.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
-        self.sidebar_widget = QListWidget()
+        self.sidebar_widget = SidebarView(self.sidebar_model)
+        self.sidebar_widget.activated.connect(self.open_sidebar_entry)
         self.sidebar.setWidget(self.sidebar_widget)
         self.addDockWidget(Qt.LeftDockWidgetArea, self.sidebar)
-        self.update_sidebar()
-        
-        # Performance monitoring for workloads.
-        self.performance_timer = QTimer(self)
-        self.performance_timer.timeout.connect(self.check_performance)
-        self.performance_timer.start(5000) # Forces to 5 seconds.   
-
-        self.cpu_label = QLabel("CPU Usage: 0%", self)
-        self.mem_label = QLabel("Memory Usage: 0%", self)
-        self.status_bar.addPermanentWidget(self.cpu_label)
-        self.status_bar.addPermanentWidget(self.mem_label)
-
-        # Load session if available
-        self.load_session()
-
-    def add_new_tab(self, url):
-        new_browser = QWebEngineView(self)
-        new_browser.setUrl(QUrl(url))
-        interceptor = RequestInterceptor()
-        new_browser.page().profile().setRequestInterceptor(interceptor)
-
+        self.view_menu.addAction(self.sidebar.toggleViewAction())
+
+    def bookmark_page(self, last_id, cursor, limit):
+        # Bookmarks that existed when the sidebar opened, newest first
+        if self.bookmarks is None:
+            return []
+        return self.bookmarks.page(cursor, last_id, limit)
+
+    def history_page(self, until, cursor, limit):
+        if self.history is None:
+            return []
+        return [(visit_id, url, title) for visit_id, url, title, visited_at in self.history.page(cursor, until, limit)]
+
+    def open_sidebar_entry(self, index):
+        url = index.data(Qt.UserRole)
+        if url:
+            self.load_url(self.browser, url)
+
+    def add_new_tab(self, url, title=None, background=False, history=None, scroll=None):
+        if background:
+            # Restored and hibernated tabs only get a renderer once activated
+            placeholder = TabPlaceholder(url, title, self, self.is_private_browsing, history, scroll)
+            self.assign_tab_id(placeholder)
+            new_tab_index = self.tab_widget.addTab(placeholder, 'New Tab')
+            self.tab_widget.setTabToolTip(new_tab_index, placeholder.title())
+            self.record_tab_opened(placeholder)
+            return
+
+        started = perf_counter()
+        new_browser = self.create_browser(url, history=history, scroll=scroll)
+        self.assign_tab_id(new_browser)
         new_tab_index = self.tab_widget.addTab(new_browser, 'New Tab')
+        self.record_tab_opened(new_browser)
         self.tab_widget.setCurrentIndex(new_tab_index)
         self.browser = new_browser  # Update active browser
+        self.tab_lifecycle.record_open(perf_counter() - started)
+
+    def ensure_profiles(self):
+        if self.profiles is None:
+            from profiles import ProfileManager
+            self.profiles = ProfileManager(self.filter_engine, app_data_path('profile'), app_data_path('cache'), parent=self)
+            self.profiles.profile.downloadRequested.connect(self.handle_download_request)
+            self.profiles.private_profile.downloadRequested.connect(self.handle_download_request)
+            self.themes.add_profile(self.profiles.profile)
+            self.themes.add_profile(self.profiles.private_profile)
+        return self.profiles
+
+    def build_view(self, is_private):
+        from PyQt5.QtWebEngineWidgets import QWebEngineView
+        view = QWebEngineView(self)
+        view.setPage(self.ensure_profiles().new_page(is_private, view))
+        view.is_private = is_private
+        view.pending_scroll = None
+        view.loading = False
+        view.expected_url = None  # Set while a navigation started by load_url() is in flight
+        view.visited = None  # Last URL recorded as a visit, without its fragment
+        view.preview = None  # SnapshotPreview, created the first time a saved copy is shown
+        self.watch_browser(view)
+        return view
+
+    def view_timer(self, view, name, slot):
+        # Single-shot timers belong to the view, so a tab closed in the meantime is never touched
+        timer = getattr(view, name, None)
+        if timer is None:
+            timer = QTimer(view)
+            timer.setSingleShot(True)
+            timer.timeout.connect(partial(slot, view))
+            setattr(view, name, timer)
+        return timer
+
+    def load_url(self, view, url):
+        # Navigations Val starts itself; if they are slow or fail, a saved copy stands in
+        self.hide_snapshot(view)
+        view.expected_url = url
+        if self.snapshots is not None and not view.is_private and url in self.snapshots:
+            self.view_timer(view, 'slow_timer', self.load_is_slow).start(SLOW_LOAD_MS)
+        view.setUrl(QUrl(url))
+
+    def create_browser(self, url, is_private=None, history=None, scroll=None):
+        if is_private is None:
+            is_private = self.is_private_browsing
+        new_browser = self.tab_lifecycle.new_view(is_private)
+        new_browser.pending_scroll = scroll  # Applied once the restored page has loaded
+        if not (history and restore_history(new_browser, history)):
+            self.load_url(new_browser, url)
+        return new_browser
+
+    def watch_browser(self, view):
+        view.urlChanged.connect(partial(self.browser_url_changed, view))
+        view.loadStarted.connect(partial(self.browser_load_started, view))
+        view.loadFinished.connect(partial(self.browser_load_finished, view))
+        view.titleChanged.connect(partial(self.browser_title_changed, view))
+        view.page().scrollPositionChanged.connect(partial(self.browser_scrolled, view))
+
+    def browser_url_changed(self, view, url):
+        if view is self.browser:
+            self.update_status_bar(url)
+        if view.expected_url is not None and snapshot_key(url.toString()) != snapshot_key(view.expected_url):
+            # Redirected, or navigated elsewhere: the saved copy is no longer of this load
+            self.hide_snapshot(view)
+        if self.journals(view):
+            self.session.record('navigate', view.tab_id, url=url.toString(), title=view.title())
+
+    def record_visit(self, view):
+        # One visit per document loaded. Fragment and pushState changes within a page only
+        # change the URL, and reloads land on the same one; neither counts towards frecency.
+        url = view.url()
+        document = url.adjusted(QUrl.RemoveFragment).toString()
+        if self.history is None or view.is_private or not should_record(url.toString()) or document == view.visited:
+            return
+        view.visited = document
+        visited_at = time.time()
+        title = view.title() or None  # titleChanged usually came first, before there was a row to title
+        self.history.record(url.toString(), title, visited_at)
+        self.omnibox_index.record_visit(url.toString(), visited_at)
+        self.omnibox_index.set_title(url.toString(), title)
+        if self.sidebar is not None:
+            self.sidebar_model.add(SIDEBAR_HISTORY, url.toString(), title)
+
+    def browser_load_started(self, view):
+        view.loading = True
+        if view is self.browser:
+            self.show_loading_status()
+        if view.expected_url is None:
+            self.hide_snapshot(view)
+
+    def browser_load_finished(self, view, ok):
+        view.loading = False
+        if view is self.browser:
+            self.show_ready_status()
+            if self.speculator is not None:
+                self.speculator.idle()
+        if view.pending_scroll:
+            view.page().runJavaScript('window.scrollTo(%d, %d)' % tuple(view.pending_scroll))
+            view.pending_scroll = None
+        if self.journals(view):
+            self.session.record('navigate', view.tab_id, url=view.url().toString(), title=view.title(), history=save_history(view))
+        if ok:
+            self.record_visit(view)
+        url = view.expected_url or view.url().toString()
+        self.hide_snapshot(view)
+        if not ok:
+            self.show_snapshot(view, url, failed=True)
+        elif (self.fulltext is not None or self.snapshots is not None) and not view.is_private and should_record(view.url().toString()):
+            self.view_timer(view, 'settle_timer', self.page_settled).start(PAGE_SETTLE_DELAY_MS)
+
+    def page_settled(self, view):
+        url = view.url().toString()
+        if view.is_private or not should_record(url):
+            return
+        if self.fulltext is not None:
+            self.read_page_text(view)
+        if self.snapshots is not None:
+            self.save_snapshot(view)
+
+    def read_page_text(self, view):
+        from PyQt5.QtWebEngineWidgets import QWebEngineScript
+        view.page().runJavaScript(PAGE_TEXT_SCRIPT, QWebEngineScript.ApplicationWorld,
+                                  partial(self.page_text_ready, view.url().toString(), view.title()))
+
+    def page_text_ready(self, url, title, text):
+        # Indexing happens on the full-text writer thread
+        if isinstance(text, str):
+            self.fulltext.add(url, title, text)
+
+    def save_snapshot(self, view):
+        # Chromium writes the MHTML on its own threads; the download it reports is picked up by handle_download_request()
+        from PyQt5.QtWebEngineWidgets import QWebEngineDownloadItem
+        url = view.url().toString()
+        bookmarked = self.snapshots.policy == 'bookmarked' and self.bookmarks is not None and url in self.bookmarks
+        if not self.snapshots.due(url, bookmarked):
+            self.snapshots.touch(url)
+            return
+        path = self.snapshots.reserve(url)
+        self.snapshot_saves[os.path.abspath(path)] = (url, view.title() or None)
+        view.page().save(path, QWebEngineDownloadItem.MimeHtmlSaveFormat)
+
+    def snapshot_saved(self, item, url, title):
+        if self.snapshot_saves.pop(os.path.abspath(item.path()), None) is None:
+            return  # Closing down, the cache has already let go of its partial files
+        if item.state() == item.DownloadCompleted:
+            self.snapshots.commit(url, title)  # Moved into place on the snapshot writer, which reports back to snapshot_stored()
+        else:
+            self.snapshots.discard(url)
+
+    def snapshot_stored(self, url, entry):
+        # A copy committed while the same page is loading elsewhere still stands in if that load is slow
+        if entry is None:
+            return
+        key = snapshot_key(url)
+        for i in range(self.tab_widget.count()):
+            view = self.tab_widget.widget(i)
+            if is_placeholder(view) or view.is_private or view.expected_url is None or snapshot_key(view.expected_url) != key:
+                continue
+            slow_timer = self.view_timer(view, 'slow_timer', self.load_is_slow)
+            if not slow_timer.isActive() and not (view.preview is not None and view.preview.showing):
+                slow_timer.start(SLOW_LOAD_MS)
+
+    def load_is_slow(self, view):
+        if view.expected_url is not None:
+            self.show_snapshot(view, view.expected_url, failed=False)
+
+    def show_snapshot(self, view, url, failed):
+        entry = self.snapshots.find(url) if self.snapshots is not None and not view.is_private else None
+        if entry is None:
+            return
+        if view.preview is None:
+            view.preview = SnapshotPreview(view, partial(self.ensure_profiles().new_page, True))
+        view.preview.show(entry)
+        self.snapshots.touch(url)
+        if view is self.browser:
+            saved = datetime.fromtimestamp(entry['saved_at']).strftime('%Y-%m-%d %H:%M')
+            if failed:
+                self.status_bar.showMessage(f'The page could not be loaded. Showing the copy saved {saved}.')
+            else:
+                self.status_bar.showMessage(f'Showing the copy saved {saved} while the page loads...')
+
+    def hide_snapshot(self, view):
+        slow_timer = getattr(view, 'slow_timer', None)
+        if slow_timer is not None:
+            slow_timer.stop()
+        view.expected_url = None
+        if view.preview is not None:
+            view.preview.hide()
+
+    def browser_title_changed(self, view, title):
+        if self.history is not None and not view.is_private:
+            self.history.set_title(view.url().toString(), title)
+            self.omnibox_index.set_title(view.url().toString(), title)
+            if self.sidebar is not None:
+                self.sidebar_model.update_title(SIDEBAR_HISTORY, view.url().toString(), title)
+
+    def browser_scrolled(self, view, position):
+        if self.journals(view):
+            self.session.set_scroll(view.tab_id, [int(position.x()), int(position.y())])
+
+    def journals(self, widget):
+        # Private tabs never reach the disk; neither do tabs seen before the journal was opened
+        return self.session is not None and widget is not None and hasattr(widget, 'tab_id') and not widget.is_private
+
+    def next_journaled_tab(self, widget):
+        # The journal orders tabs by neighbour, so private tabs in between do not matter
+        for i in range(self.tab_widget.indexOf(widget) + 1, self.tab_widget.count()):
+            other = self.tab_widget.widget(i)
+            if not other.is_private:
+                return other.tab_id
+        return None
+
+    def record_tab_opened(self, widget):
+        if self.journals(widget):
+            self.session.record('open', widget.tab_id, url=widget.url().toString(), title=widget.title(), before=self.next_journaled_tab(widget))
+
+    def tab_moved(self, from_index, to_index):
+        widget = self.tab_widget.widget(to_index)
+        if self.journals(widget):
+            self.session.record('move', widget.tab_id, before=self.next_journaled_tab(widget))
+
+    def assign_tab_id(self, widget):
+        # Stable across hibernation, unlike the tab index
+        widget.tab_id = self.next_tab_id
+        self.next_tab_id += 1
+
+    def replace_tab_widget(self, index, widget):
+        # Swap the widget behind a tab without losing its position, text or selection
+        old = self.tab_widget.widget(index)
+        widget.tab_id = old.tab_id
+        text = self.tab_widget.tabText(index)
+        was_current = self.tab_widget.currentIndex() == index
+        self._swapping_tab = True
+        try:
+            self.tab_widget.removeTab(index)
+            self.tab_widget.insertTab(index, widget, text)
+            self.tab_widget.setTabToolTip(index, widget.title())
+            if was_current:
+                self.tab_widget.setCurrentIndex(index)
+        finally:
+            self._swapping_tab = False
+        self.tab_lifecycle.dispose(old)
+
+    def activate_tab(self, index):
+        if getattr(self, '_swapping_tab', False):
+            return
+        widget = self.tab_widget.widget(index)
+        if widget is None:
+            return
+        if is_placeholder(widget):
+            view = self.create_browser(widget.url().toString(), widget.is_private, widget.history, widget.scroll)
+            self.replace_tab_widget(index, view)
+            widget = view
+        self.browser = widget
+        self.hibernation.touch(widget)
+        self.update_url_bar(index)
+        if self.journals(widget):
+            self.session.record('select', widget.tab_id)
+
+    def hibernate_tab(self, index):
+        widget = self.tab_widget.widget(index)
+        if widget is None or is_placeholder(widget) or index == self.tab_widget.currentIndex():
+            return
+        placeholder = TabPlaceholder(widget.url().toString(), widget.title(), self, widget.is_private,
+                                     save_history(widget), scroll_position(widget))
+        placeholder.last_active = getattr(widget, 'last_active', 0.0)
+        self.replace_tab_widget(index, placeholder)
 
     def navigate_to_url(self):
         url = self.url_bar.text()
         if not url.startswith('http://') and not url.startswith('https://'):
             url = 'https://' + url
-        self.browser.setUrl(QUrl(url))
-        if not self.is_private_browsing:
-            self.history.append(url)
-        self.update_sidebar()
+        if self.speculator is not None and not self.browser.is_private:
+            prerendered = self.speculator.take_prerender(url)
+            if prerendered is not None:
+                self.swap_in_page(self.browser, *prerendered)
+                return
+            self.speculator.navigated(url)
+        self.load_url(self.browser, url)
+
+    def swap_in_page(self, view, page, finished):
+        # A prerendered page takes over the tab. Its back history starts with
+        # itself: the tab's earlier pages are not carried over, which is why
+        # prerendering is opt-in.
+        self.hide_snapshot(view)
+        page.setParent(view)
+        view.setPage(page)  # The old page belonged to the view and goes with it
+        page.scrollPositionChanged.connect(partial(self.browser_scrolled, view))
+        view.loading = finished is None
+        if finished is not None:
+            self.browser_load_finished(view, finished)
+
+    def show_suggestions(self, generation, text, results):
+        # Answers for anything but what is in the URL bar right now are stale
+        if not self.omnibox.is_current(generation) or self.url_bar.text() != text:
+            return
+        self.suggestion_model.setStringList([url for url, title in results])
+        if results:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+        self.speculate(text, results)
+
+    def speculate(self, text, results):
+        # Nothing typed in private browsing reaches the network before Enter
+        if self.speculator is None or self.is_private_browsing or self.browser.is_private:
+            return
+        self.speculator.preconnect([url for url, title in results[:PRECONNECT_SUGGESTIONS]])
+        if results and len(text.strip()) >= PRERENDER_MIN_CHARS and url_key(results[0][0]).startswith(url_key(text)):
+            self.speculator.prerender(results[0][0])
+
+    def preconnect_top_sites(self):
+        if self.speculator is None or self.is_private_browsing:
+            return
+        rows = [(url, visit_count, visited_at) for url, title, visited_at, visit_count in self.history.recent(TOP_SITE_VISITS)]
+        self.speculator.preconnect(top_origins(rows))
+
+    def set_prerender(self, enabled):
+        if self.speculator is not None:
+            self.speculator.prerender_enabled = enabled
+            if not enabled:
+                self.speculator.discard_prerender()
 
     def go_home(self):
-        self.browser.setUrl(QUrl(self.home_url))
+        if self.speculator is not None and not self.browser.is_private:
+            self.speculator.navigated(self.home_url)
+        self.load_url(self.browser, self.home_url)
 
     def close_tab(self, index):
+        widget = self.tab_widget.widget(index)
+        if widget is None:
+            return
+        if self.journals(widget):
+            self.session.record('close', widget.tab_id)
+        self.tab_lifecycle.remember(widget, index)
         self.tab_widget.removeTab(index)
+        if self.tab_widget.count() == 0:
+            # The window always keeps a tab to show
+            self.add_new_tab(self.home_url)
+        self.tab_lifecycle.dispose(widget)
+
+    def reopen_closed_tab(self):
+        tab = self.tab_lifecycle.pop_closed()
+        if tab is None:
+            return
+        self.add_new_tab(tab['url'], tab['title'], history=tab['history'], scroll=tab['scroll'])
+        self.tab_widget.tabBar().moveTab(self.tab_widget.currentIndex(), min(tab['index'], self.tab_widget.count() - 1))
+
+    def open_urls(self, urls):
+        # URLs handed over by another invocation (see instance.py): the first in front, the rest behind it
+        for i, url in enumerate(urls):
+            self.add_new_tab(url, background=i > 0)
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
 
     def pin_tab(self, index):
         if self.tab_widget.tabText(index) != "Pinned":
@@ -228,18 +806,60 @@ class Val(QMainWindow):
 
     def add_bookmark(self):
         url = self.browser.url().toString()
-        if url not in self.bookmarks:
-            self.bookmarks.append(url)
+        if self.bookmarks.add(url, self.browser.title() or None) is not None:
+            if self.omnibox is not None:
+                self.omnibox_index.set_bookmarked(url, self.browser.title())
+            if self.sidebar is not None:
+                self.sidebar_model.add(SIDEBAR_BOOKMARKS, url, self.browser.title() or None)
+            if self.snapshots is not None and not self.browser.is_private and should_record(url):
+                self.save_snapshot(self.browser)  # Bookmarked pages are kept offline right away
             QMessageBox.information(self, 'Bookmark Added', f'{url} has been added to your bookmarks.')
-        self.update_sidebar()
 
     def view_bookmarks(self):
-        bookmarks_str = "\n".join(self.bookmarks) if self.bookmarks else "No bookmarks available."
-        QMessageBox.information(self, 'Bookmarks', bookmarks_str)
+        # The sidebar pages bookmarks in as they scroll into view, however many there are
+        self.ensure_sidebar()
+        self.sidebar.show()
+        self.sidebar_widget.expand(self.sidebar_model.index(SIDEBAR_BOOKMARKS, 0))
+
+    def import_bookmarks(self):
+        path, _ = QFileDialog.getOpenFileName(self, 'Import Bookmarks', '', 'Bookmarks (*.html *.htm *.json);;All Files (*)')
+        if path:
+            self.transfer_bookmarks('import', path)
+
+    def export_bookmarks(self):
+        path, _ = QFileDialog.getSaveFileName(self, 'Export Bookmarks', 'bookmarks.html', 'Bookmarks HTML (*.html);;JSON (*.json)')
+        if path:
+            self.transfer_bookmarks('export', path)
+
+    def transfer_bookmarks(self, direction, path):
+        if self.bookmark_thread is not None and self.bookmark_thread.isRunning():
+            QMessageBox.information(self, 'Bookmarks', 'A bookmark import or export is already running.')
+            return
+        self.bookmark_thread = BookmarkTransferThread(self.bookmarks, direction, path, self)
+        self.bookmark_thread.progress.connect(lambda seen, done: self.status_bar.showMessage(f'Bookmarks: {seen} processed'))
+        self.bookmark_thread.done.connect(self.bookmark_transfer_done)
+        self.bookmark_thread.failed.connect(lambda error: QMessageBox.warning(self, 'Bookmarks', f'Could not {direction} bookmarks: {error}'))
+        self.bookmark_thread.start()
+
+    def bookmark_transfer_done(self, direction, count):
+        if direction == 'export':
+            self.status_bar.showMessage(f'Exported {count} bookmarks')
+            return
+        self.status_bar.showMessage(f'Imported {count} new bookmarks')
+        if self.sidebar is not None:
+            self.sidebar_model.reset_section(SIDEBAR_BOOKMARKS, partial(self.bookmark_page, self.bookmarks.last_id()))
+        if self.omnibox is not None:
+            threading.Thread(target=self.omnibox_index.build, args=(None, self.bookmarks), name='omnibox-bookmarks', daemon=True).start()
 
     def view_history(self):
-        history_str = "\n".join(self.history) if self.history else "No browsing history."
-        QMessageBox.information(self, 'History', history_str)
+        # Same sidebar as the bookmarks; visits are paged in from the store as they scroll into view
+        self.ensure_sidebar()
+        self.sidebar.show()
+        self.sidebar_widget.expand(self.sidebar_model.index(SIDEBAR_HISTORY, 0))
+
+    def search_page_text(self):
+        search_dialog = PageSearchDialog(self)
+        search_dialog.exec_()
 
     def set_homepage(self):
         homepage, ok = QInputDialog.getText(self, 'Set Homepage', 'Enter your homepage URL:')
@@ -247,84 +867,200 @@ class Val(QMainWindow):
             self.home_url = homepage
             QMessageBox.information(self, 'Homepage Set', f'Your homepage has been set to {homepage}.')
 
+    def set_memory_budget(self):
+        budget, ok = QInputDialog.getInt(self, 'Set Memory Budget', 'Renderer memory budget (MB):', self.hibernation.budget_mb, 256, 65536, 256)
+        if ok:
+            self.hibernation.set_budget(budget)
+
     def toggle_private_browsing(self):
         self.is_private_browsing = not self.is_private_browsing
         if self.is_private_browsing:
+            # New tabs use the off-the-record profile until private browsing is turned off
+            self.add_new_tab(self.home_url)
             QMessageBox.information(self, 'Private Browsing', 'Private browsing mode is now ON. History and cookies will not be saved.')
         else:
             QMessageBox.information(self, 'Private Browsing', 'Private browsing mode is now OFF.')
 
-    def check_for_updates(self):
+    def load_blocklist(self):
+        path, _ = QFileDialog.getOpenFileName(self, 'Load Blocklist', '', 'Filter lists (*.txt *.hosts);;All files (*)')
+        if not path:
+            return
         try:
-            response = requests.get(f'https://api.github.com/repos/owgydz/val/releases/latest?channel={self.channel}')
-            latest_version = response.json()['tag_name']
-            current_version = '14.0.1528.15'
-
-            if latest_version != current_version:
-                QMessageBox.information(self, 'Update Available', f'A new version ({latest_version}) is available.')
+            # Compile into a fresh engine and swap it in, so requests in flight never see a half-built index
+            engine = FilterEngine.with_defaults(self.filter_lists + [path])
+        except OSError as e:
+            QMessageBox.warning(self, 'Error', f'Unable to load blocklist: {e}')
+            return
+        self.filter_lists.append(path)
+        self.filter_engine = engine
+        if self.profiles is not None:
+            self.profiles.interceptor.engine = engine
+        QMessageBox.information(self, 'Blocklist Loaded', f'{len(engine)} filter rules are now active.')
+
+    def check_for_updates(self, silent=False):
+        if self.update_thread is not None and self.update_thread.isRunning():
+            if not silent:
+                self.update_thread.silent = False  # Let the running check answer the user
+            return
+        if self.update_thread is not None:
+            self.update_checker = self.update_thread.checker  # Built by the first check, reused for its session
+        self.update_thread = UpdateCheckThread(self.update_checker, app_data_path('updates.json'), self.channel, silent,
+                                               force=not silent, parent=self)
+        self.update_thread.checked.connect(self.show_update_result)
+        self.update_thread.failed.connect(self.show_update_error)
+        self.update_thread.start()
+
+    def show_update_result(self, result, silent):
+        latest_version = result['latest']
+        if result['available']:
+            if silent:
+                self.status_bar.showMessage(f'A new version ({latest_version}) is available.')
             else:
-                QMessageBox.information(self, 'Up-to-date', 'You are using the latest version.')
-        except requests.exceptions.RequestException:
+                QMessageBox.information(self, 'Update Available', f'A new version ({latest_version}) is available.')
+        elif not silent:
+            QMessageBox.information(self, 'Up-to-date', 'You are using the latest version.')
+
+    def show_update_error(self, error, silent):
+        if not silent:
             QMessageBox.warning(self, 'Error', 'Unable to check for updates at the moment.')
 
     def show_version_info(self):
-        QMessageBox.information(self, 'Version', f'Val Browser version: v14.0.1528.15, {self.channel} channel.\nCopyright (c) 2025 the Val Browser authors, under Orange, Inc.')
+        QMessageBox.information(self, 'Version', f'Val Browser version: v{CURRENT_VERSION}, {self.channel} channel.\nCopyright (c) 2025 the Val Browser authors, under Orange, Inc.')
 
     def open_download_manager(self):
-        self.download_manager_dialog = DownloadManager(self.downloads)
-        self.download_manager_dialog.exec_()
-  
-    def set_style(self, theme):
-        if theme == 'dark':
-            self.setStyleSheet("""
-                QMainWindow { background-color: #2c2c2c; color: white; }
-                QLineEdit { background-color: #4d4d4d; color: white; border: 1px solid #666; }
-                QPushButton { background-color: #5c5c5c; color: white; border-radius: 5px; }
-                QTabWidget { background-color: #3c3c3c; }
-            """)
-            if hasattr(self, 'browser') and self.browser:
-                self.browser.page().runJavaScript("""
-                    document.documentElement.style.backgroundColor = '#2c2c2c';
-                    document.documentElement.style.color = 'white';
-                    if (document.querySelector('body.ntp')) {
-                        document.querySelector('body.ntp').style.backgroundColor = '#2c2c2c';
-                        document.querySelector('body.ntp').style.color = 'white';
-                    }
-                """)
+        # Modeless so progress keeps updating while the user browses
+        if self.download_manager_dialog is None:
+            self.download_manager_dialog = DownloadManager(self.downloads, self)
+        self.download_manager_dialog.show()
+        self.download_manager_dialog.raise_()
+
+    def handle_download_request(self, item):
+        if item.savePageFormat() != item.UnknownSaveFormat:
+            # Offline copies from save_snapshot(); they are written where they were asked to go
+            saving = self.snapshot_saves.get(os.path.abspath(item.path()))
+            if saving is not None:
+                item.finished.connect(partial(self.snapshot_saved, item, *saving))
+            item.accept()
+            return
+        url = item.url()
+        handed_back = self.native_downloads.pop(url.toString(), None)
+        if handed_back is not None:
+            self.accept_native_download(item, handed_back)
+            return
+        if url.scheme() not in ('http', 'https'):
+            item.accept()  # data: and blob: URLs only exist inside the renderer
+            return
+        directory = QStandardPaths.writableLocation(QStandardPaths.DownloadLocation) or os.path.expanduser('~')
+        path = os.path.join(directory, os.path.basename(item.path()) or 'download')
+        page = item.page()
+        profile = page.profile() if page is not None else self.ensure_profiles().profile
+        # The engine sends the profile's cookies and the Referer. What still needs the browser,
+        # HTTP auth or a server without ranges, it hands back before writing anything.
+        request = {'cookies': self.ensure_profiles().cookies(profile), 'handoff': True, 'mime_type': item.mimeType()}
+        if page is not None and page.url().scheme() in ('http', 'https'):
+            request['headers'] = {'Referer': page.url().toString()}
+        item.cancel()
+        self.start_download(url.toString(), path, page, **request)
+
+    def start_download(self, url, path, page=None, **request):
+        if self.download_engine is None:
+            from downloads import DownloadEngine
+            self.download_engine = DownloadEngine()
+        # Engine callbacks arrive on worker threads, the bridge queues them onto the GUI thread
+        job = self.download_engine.download(url, path, self.download_bridge.progress.emit, self.download_bridge.finished.emit, **request)
+        download = {'url': url, 'path': job.path, 'progress': 0, 'job': job, 'page': page}
+        self.downloads.append(download)
+        if self.download_manager_dialog is not None:
+            self.download_manager_dialog.add_download(download)
+        self.status_bar.showMessage(f'Downloading {os.path.basename(job.path)}...')
+        return download
+
+    def find_download(self, job):
+        for download in self.downloads:
+            if download.get('job') is job:
+                return download
+        return None
+
+    def update_download(self, job):
+        download = self.find_download(job)
+        if download is not None:
+            download['progress'] = job.progress
+            if self.download_manager_dialog is not None:
+                self.download_manager_dialog.update_progress(download)
+
+    def finish_download(self, job, ok):
+        download = self.find_download(job)
+        if download is None:
+            return
+        from downloads import NotSegmentable
+        if isinstance(job.error, NotSegmentable):
+            self.hand_back_download(download)
+            return
+        self.update_download(job)
+        if ok:
+            self.status_bar.showMessage(f'Downloaded {os.path.basename(job.path)}')
+        elif job.error is not None:
+            self.status_bar.showMessage(f'Download of {os.path.basename(job.path)} failed: {job.error}')
+
+    def hand_back_download(self, download):
+        # QtWebEngine downloads it after all, with the tab's cookies, auth cache and Referer.
+        # Both the asked-for and the redirected URL are remembered, so it is not taken over again.
+        from PyQt5 import sip
+        page = download['page']
+        if page is None or sip.isdeleted(page):
+            self.status_bar.showMessage(f'Download of {os.path.basename(download["path"])} failed: its tab was closed')
+            return
+        for url in {download['url'], download['job'].url}:
+            self.native_downloads[url] = download
+        download['job'] = None
+        page.download(QUrl(download['url']), download['path'])
+
+    def accept_native_download(self, item, download):
+        for url, pending in list(self.native_downloads.items()):
+            if pending is download:
+                del self.native_downloads[url]
+        item.setPath(download['path'])
+        item.downloadProgress.connect(partial(self.native_download_progress, download))
+        item.finished.connect(partial(self.native_download_finished, item, download))
+        item.accept()
+
+    def native_download_progress(self, download, received, total):
+        if total > 0:
+            download['progress'] = int(received * 100 / total)
+            if self.download_manager_dialog is not None:
+                self.download_manager_dialog.update_progress(download)
+
+    def native_download_finished(self, item, download):
+        name = os.path.basename(item.path())
+        if item.state() == item.DownloadCompleted:
+            self.native_download_progress(download, 1, 1)
+            self.status_bar.showMessage(f'Downloaded {name}')
         else:
-            self.setStyleSheet("""
-                QMainWindow { background-color: white; color: black; }
-                QLineEdit { background-color: #f0f0f0; color: black; border: 1px solid #ccc; }
-                QPushButton { background-color: #e0e0e0; color: black; border-radius: 5px; }
-                QTabWidget { background-color: #f7f7f7; }
-            """)
-            if hasattr(self, 'browser') and self.browser:
-                self.browser.page().runJavaScript("""
-                    document.documentElement.style.backgroundColor = '';
-                    document.documentElement.style.color = '';
-                    if (document.querySelector('body.ntp')) {
-                        document.querySelector('body.ntp').style.backgroundColor = '';
-                        document.querySelector('body.ntp').style.color = '';
-                    }
-                """)
+            self.status_bar.showMessage(f'Download of {name} failed: {item.interruptReasonString()}')
+
+    def set_style(self, theme):
+        self.themes.apply(theme)
+
+    def open_pages(self):
+        # Placeholders have no page; they pick the theme up from the profile script when loaded
+        pages = []
+        for i in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(i)
+            if not is_placeholder(widget):
+                pages.append(widget.page())
+        return pages
 
     def change_theme(self):
         dialog = ThemeDialog(self)
         dialog.exec_()
 
-    def check_dark_mode_schedule(self):
-        current_time = datetime.now().time()
-        if current_time >= time(18, 0) or current_time < time(6, 0):  # Between 6 PM and 6 AM
-            self.set_style('dark')
-        else:
-            self.set_style('light')
+    def change_cache_settings(self):
+        dialog = CacheSettingsDialog(self)
+        dialog.exec_()
 
-    def update_sidebar(self):
-        self.sidebar_widget.clear()
-        self.sidebar_widget.addItem("Bookmarks:")
-        self.sidebar_widget.addItems(self.bookmarks)
-        self.sidebar_widget.addItem("History:")
-        self.sidebar_widget.addItems(self.history)
+    def change_snapshot_settings(self):
+        dialog = SnapshotSettingsDialog(self)
+        dialog.exec_()
 
     def set_channel(self, channel):
         self.channel = channel
@@ -334,48 +1070,114 @@ class Val(QMainWindow):
         dialog = ChannelDialog(self)
         dialog.exec_()
 
-    def save_session(self):
-        session = {
-            'tabs': [self.tab_widget.widget(i).url().toString() for i in range(self.tab_widget.count())],
-            'current_tab': self.tab_widget.currentIndex()
-        }
-        with open('session.json', 'w') as f:
-            json.dump(session, f)
+    def session_snapshot(self):
+        tabs = []
+        for i in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(i)
+            if widget.is_private:
+                continue
+            if is_placeholder(widget):
+                history, scroll = widget.history, widget.scroll
+            else:
+                history, scroll = save_history(widget), scroll_position(widget)
+            tabs.append({'tab': widget.tab_id, 'url': widget.url().toString(), 'title': widget.title(), 'history': history, 'scroll': scroll})
+        current = self.tab_widget.currentWidget()
+        return {'tabs': tabs, 'current': current.tab_id if current is not None and not current.is_private else None}
 
     def load_session(self):
-        if os.path.exists('session.json'):
-            with open('session.json', 'r') as f:
-                session = json.load(f)
-                for url in session['tabs']:
-                    self.add_new_tab(url)
-                self.tab_widget.setCurrentIndex(session['current_tab'])
+        # Replays the journal of the previous run, whether it exited cleanly or not
+        journal = SessionJournal(app_data_path('session.journal'))
+        restored = journal.state.ordered_tabs()
+        offset = self.tab_widget.count()
+        current = offset
+        for tab in restored:
+            if tab['tab'] == journal.state.current:
+                current = self.tab_widget.count()
+            self.add_new_tab(tab['url'], tab['title'], background=True, history=tab['history'], scroll=tab['scroll'])
+        if restored and not self.startup_urls:
+            # Only the selected tab loads now, the rest wait until activated
+            self.tab_widget.setCurrentIndex(current)
+            if offset == 1:
+                # The restored tabs take the place of the home tab opened at startup
+                startup_tab = self.tab_widget.widget(0)
+                self.tab_widget.removeTab(0)
+                self.tab_lifecycle.dispose(startup_tab)
+        # From here on every change is journaled; the snapshot renumbers the restored tabs
+        self.session = journal
+        self.session.record('snapshot', **self.session_snapshot())
 
     def closeEvent(self, event):
-        reply = QMessageBox.question(self, 'Save Session', 'Do you want to save your session?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-        if reply == QMessageBox.Yes:
-            self.save_session()
+        # Nothing to ask: the journal is already on disk, closing just compacts it
+        if self.session is not None:
+            self.session.close()
+        self.tab_lifecycle.close()
+        if self.omnibox is not None:
+            self.omnibox.close()
+            self.omnibox_index.stop()
+            self.omnibox_build.join()  # Before the history store it reads from is closed
+        if self.speculator is not None:
+            self.speculator.close()
+        if self.history is not None:
+            self.history.close()
+        if self.fulltext is not None:
+            self.fulltext.close()
+        if self.snapshots is not None:
+            self.snapshot_saves.clear()
+            self.snapshots.close()
+        if self.download_engine is not None:
+            self.download_engine.shutdown()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+        if self.sampler is not None:
+            self.sampler.stop()
+        if self.profiler is not None:
+            self.profiler.stop()
+            if os.environ.get('VAL_PROFILE_DUMP'):
+                self.profiler.dump(os.environ['VAL_PROFILE_DUMP'])
         event.accept()
     
-    def update_performance():
-        cpu_usage = psutil.cpu_percent()
-        mem_info = psutil.virtual_memory()
-        mem_usage = mem_usage.percent
-        
-        self.cpu_label.setText(f"CPU Usage: {cpu_usage}%")
-        self.mem_label.setText(f"Memory Usage: {mem_usage}%")
+    def sampler_targets(self):
+        targets = {}
+        for i in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(i)
+            if is_placeholder(widget):
+                continue
+            page = widget.page()
+            # renderProcessPid() arrived in Qt 5.15
+            pid = page.renderProcessPid() if hasattr(page, 'renderProcessPid') else 0
+            targets[widget.tab_id] = (widget.title() or widget.url().toString(), pid)
+        return targets
+
+    def update_performance(self):
+        self.open_tabs = self.tab_widget.count()
+        self.tab_lifecycle.audit()
+        self.sampler.set_targets(self.sampler_targets())
+        self.sampler.publish_gauges()  # Gauges read GUI state, so they are read here and handed over as numbers
+        system = self.sampler.system
+        self.cpu_label.setText(f"CPU Usage: {system['cpu']}%")
+        self.mem_label.setText(f"Memory Usage: {system['memory']}%")
 
     def show_usage(self):
-        usage_dialog = QDialog(self)
-        usage_dialog.setWindowTitle('Performance Usage')
-        usage_dialog.setGeometry(400, 200, 300, 150)
+        usage_dialog = UsageDialog(self.sampler, self)
+        usage_dialog.exec_()
 
-        layout = QVBoxLayout(usage_dialog)
-        cpu_label = QLabel(f"CPU Usage: {psutil.cpu_percent()}%", usage_dialog)
-        mem_label = QLabel(f"Memory Usage: {psutil.virtual_memory().percent}%", usage_dialog)
-        layout.addWidget(cpu_label)
-        layout.addWidget(mem_label)
+    def start_profiler(self):
+        # Times every handler defined on these classes when called on the GUI thread
+        if self.profiler is None:
+            from profiler import Profiler
+            targets = [Val, ThemeDialog, UsageDialog, ChannelDialog, CacheSettingsDialog, SnapshotSettingsDialog, DownloadManager, ProfilerDialog,
+                       HibernationManager, TabLifecycle, ThemeEngine, SidebarModel, Speculator]
+            self.profiler = Profiler(targets, self)
+        self.profiler.start()
 
-        usage_dialog.exec_()
+    def stop_profiler(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def show_profiler(self):
+        profiler_dialog = ProfilerDialog(self)
+        profiler_dialog.exec_()
 
 class ThemeDialog(QDialog):
     def __init__(self, parent=None):
@@ -384,8 +1186,11 @@ class ThemeDialog(QDialog):
         self.setGeometry(400, 200, 300, 150)
 
         self.light_radio = QRadioButton('Light Theme', self)
-        self.light_radio.setChecked(True)
         self.dark_radio = QRadioButton('Dark Theme', self)
+        if parent is not None and parent.themes.theme == 'dark':
+            self.dark_radio.setChecked(True)
+        else:
+            self.light_radio.setChecked(True)
 
         layout = QVBoxLayout(self)
         layout.addWidget(self.light_radio)
@@ -402,6 +1207,180 @@ class ThemeDialog(QDialog):
             self.parent().set_style('dark')
         self.accept()
 
+class Sparkline(QWidget):
+    def __init__(self, color, parent=None):
+        super().__init__(parent)
+        self.color = QColor(color)
+        self.values = []
+        self.setMinimumSize(120, 32)
+
+    def set_values(self, values):
+        self.values = values
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self.values) < 2:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(self.color)
+        top = max(self.values) or 1.0
+        width, height = self.width() - 1, self.height() - 1
+        step = width / (len(self.values) - 1)
+        points = [QPointF(i * step, height - value / top * height) for i, value in enumerate(self.values)]
+        painter.drawPolyline(QPolygonF(points))
+
+class UsageDialog(QDialog):
+    # Live per-tab CPU, memory and IO charts from the sampler's ring buffers
+    def __init__(self, sampler, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Performance Usage')
+        self.setGeometry(400, 200, 640, 400)
+        self.sampler = sampler
+        self.rows = {}
+
+        self.layout = QVBoxLayout(self)
+        self.cpu_label = QLabel(self)
+        self.mem_label = QLabel(self)
+        self.layout.addWidget(self.cpu_label)
+        self.layout.addWidget(self.mem_label)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(int(sampler.interval * 1000))
+        self.refresh()
+
+    def add_row(self, tab_id):
+        row = QWidget(self)
+        row_layout = QHBoxLayout(row)
+        title = QLabel(row)
+        title.setMinimumWidth(180)
+        summary = QLabel(row)
+        charts = {'cpu': Sparkline('#d9534f', row), 'rss': Sparkline('#0275d8', row), 'read': Sparkline('#5cb85c', row)}
+        row_layout.addWidget(title)
+        for chart in charts.values():
+            row_layout.addWidget(chart)
+        row_layout.addWidget(summary)
+        self.layout.addWidget(row)
+        self.rows[tab_id] = (row, title, summary, charts)
+
+    def refresh(self):
+        system = self.sampler.system
+        self.cpu_label.setText(f"CPU Usage: {system['cpu']}%")
+        self.mem_label.setText(f"Memory Usage: {system['memory']}%")
+
+        snapshot = self.sampler.snapshot()
+        for tab_id in list(self.rows):
+            if tab_id not in snapshot:
+                self.rows.pop(tab_id)[0].deleteLater()
+        for tab_id, (tab_title, series) in snapshot.items():
+            if tab_id not in self.rows:
+                self.add_row(tab_id)
+            _, title, summary, charts = self.rows[tab_id]
+            title.setText(tab_title[:40])
+            for name, chart in charts.items():
+                chart.set_values(series[name])
+            cpu = series['cpu'][-1] if series['cpu'] else 0.0
+            rss = series['rss'][-1] / (1024 * 1024) if series['rss'] else 0.0
+            io = (series['read'][-1] + series['write'][-1]) / 1024 if series['read'] else 0.0
+            summary.setText(f'{cpu:.1f}% CPU  {rss:.0f} MB  {io:.0f} KB/s')
+
+class ProfilerDialog(QDialog):
+    # Handler latencies and event-loop stalls from the opt-in profiler
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Profiler')
+        self.setGeometry(400, 200, 820, 520)
+
+        layout = QVBoxLayout(self)
+        self.report = QTextEdit(self)
+        self.report.setReadOnly(True)
+        self.report.setLineWrapMode(QTextEdit.NoWrap)
+        self.report.setFontFamily('monospace')
+        layout.addWidget(self.report)
+
+        buttons = QHBoxLayout()
+        self.toggle_button = QPushButton(self)
+        self.toggle_button.clicked.connect(self.toggle)
+        buttons.addWidget(self.toggle_button)
+        save_button = QPushButton('Save Report...', self)
+        save_button.clicked.connect(self.save)
+        buttons.addWidget(save_button)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def running(self):
+        profiler = self.parent().profiler
+        return profiler is not None and profiler.running
+
+    def toggle(self):
+        if self.running():
+            self.parent().stop_profiler()
+        else:
+            self.parent().start_profiler()
+        self.refresh()
+
+    def refresh(self):
+        from profiler import format_report
+        self.toggle_button.setText('Stop Profiling' if self.running() else 'Start Profiling')
+        profiler = self.parent().profiler
+        if profiler is None:
+            self.report.setPlainText('Not started. Handler timings and event-loop stalls are recorded while profiling runs.')
+        else:
+            self.report.setPlainText(format_report(profiler.report()))
+
+    def save(self):
+        profiler = self.parent().profiler
+        if profiler is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, 'Save Profile', 'val-profile.json', 'JSON (*.json)')
+        if path:
+            try:
+                profiler.dump(path)
+            except OSError as e:
+                QMessageBox.warning(self, 'Error', f'Unable to save the profile: {e}')
+
+class PageSearchDialog(QDialog):
+    # Finds visited pages by their text; activating a result opens it in a new tab
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Search Page Text')
+        self.setGeometry(400, 200, 640, 420)
+
+        layout = QVBoxLayout(self)
+        self.query = QLineEdit(self)
+        self.query.setPlaceholderText('Words from a page you visited')
+        self.query.textEdited.connect(lambda: self.timer.start())
+        layout.addWidget(self.query)
+        self.results = QListWidget(self)
+        self.results.setWordWrap(True)
+        self.results.itemActivated.connect(self.open_result)
+        layout.addWidget(self.results)
+
+        # Search once typing pauses rather than on every keystroke
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(150)
+        self.timer.timeout.connect(self.search)
+
+    def search(self):
+        self.results.clear()
+        fulltext = self.parent().fulltext
+        if fulltext is None:
+            return
+        for url, title, snippet, visited_at in fulltext.search(self.query.text()):
+            when = datetime.fromtimestamp(visited_at).strftime('%Y-%m-%d')
+            item = QListWidgetItem(f'{title or url}  ({when})\n{snippet}', self.results)
+            item.setToolTip(url)
+            item.setData(Qt.UserRole, url)
+
+    def open_result(self, item):
+        self.parent().add_new_tab(item.data(Qt.UserRole))
+
 class ChannelDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -431,13 +1410,134 @@ class ChannelDialog(QDialog):
             self.parent().set_channel('stable')
         self.accept()
 
-class RequestInterceptor(QWebEngineUrlRequestInterceptor):
-    def interceptRequest(self, info):
-        url = info.requestUrl().toString().lower()
-        if "popup" in url or url.startswith("about:blank"):
-            info.block(True)  # Block 
+class CacheSettingsDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Cache Settings')
+        self.setGeometry(400, 200, 300, 150)
+        profiles = parent.ensure_profiles()
+
+        self.disk_radio = QRadioButton('Disk Cache', self)
+        self.memory_radio = QRadioButton('Memory Cache', self)
+        self.none_radio = QRadioButton('No Cache', self)
+        {'disk': self.disk_radio, 'memory': self.memory_radio, 'none': self.none_radio}[profiles.cache_mode].setChecked(True)
+
+        self.size_box = QSpinBox(self)
+        self.size_box.setRange(16, 16384)
+        self.size_box.setSuffix(' MB')
+        self.size_box.setValue(profiles.cache_size_mb)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.disk_radio)
+        layout.addWidget(self.memory_radio)
+        layout.addWidget(self.none_radio)
+        layout.addWidget(QLabel('Maximum cache size:', self))
+        layout.addWidget(self.size_box)
+
+        button = QPushButton('Apply', self)
+        button.clicked.connect(self.apply_cache_settings)
+        layout.addWidget(button)
+
+    def apply_cache_settings(self):
+        if self.disk_radio.isChecked():
+            mode = 'disk'
+        elif self.memory_radio.isChecked():
+            mode = 'memory'
+        else:
+            mode = 'none'
+        self.parent().ensure_profiles().configure_cache(cache_size_mb=self.size_box.value(), cache_mode=mode)
+        self.accept()
+
+class SnapshotSettingsDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Offline Copies')
+        self.setGeometry(400, 200, 300, 180)
+        snapshots = parent.snapshots
+
+        self.visited_radio = QRadioButton('Save every visited page', self)
+        self.bookmarked_radio = QRadioButton('Save bookmarked pages only', self)
+        self.off_radio = QRadioButton('Do not save pages', self)
+        {'visited': self.visited_radio, 'bookmarked': self.bookmarked_radio, 'off': self.off_radio}[snapshots.policy].setChecked(True)
+
+        self.size_box = QSpinBox(self)
+        self.size_box.setRange(16, 65536)
+        self.size_box.setSuffix(' MB')
+        self.size_box.setValue(snapshots.budget_bytes // (1024 * 1024))
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.visited_radio)
+        layout.addWidget(self.bookmarked_radio)
+        layout.addWidget(self.off_radio)
+        layout.addWidget(QLabel('Disk space for saved pages:', self))
+        layout.addWidget(self.size_box)
+
+        button = QPushButton('Apply', self)
+        button.clicked.connect(self.apply_snapshot_settings)
+        layout.addWidget(button)
+
+    def apply_snapshot_settings(self):
+        snapshots = self.parent().snapshots
+        if self.visited_radio.isChecked():
+            snapshots.policy = 'visited'
+        elif self.bookmarked_radio.isChecked():
+            snapshots.policy = 'bookmarked'
+        else:
+            snapshots.policy = 'off'
+        snapshots.set_budget(self.size_box.value() * 1024 * 1024)
+        self.accept()
+
+class UpdateCheckThread(QThread):
+    checked = pyqtSignal(object, bool)
+    failed = pyqtSignal(str, bool)
+
+    def __init__(self, checker, cache_path, channel, silent, force=False, parent=None):
+        # checker is None for the first check and is built in run(), since UpdateChecker imports requests
+        super().__init__(parent)
+        self.checker = checker
+        self.cache_path = cache_path
+        self.channel = channel
+        self.silent = silent
+        self.force = force
+
+    def run(self):
+        try:
+            if self.checker is None:
+                from updates import UpdateChecker
+                self.checker = UpdateChecker(self.cache_path)
+            result = self.checker.check(self.channel, force=self.force)
+        except Exception as e:  # Network errors, bad JSON, unexpected tags
+            self.failed.emit(str(e), self.silent)
         else:
-            info.block(False)  # Allow 
+            self.checked.emit(result, self.silent)
+
+class BookmarkTransferThread(QThread):
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(str, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, store, direction, path, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.direction = direction
+        self.path = path
+
+    def run(self):
+        try:
+            if self.direction == 'import':
+                count = self.store.import_file(self.path, self.progress.emit)
+            else:
+                count = self.store.export_file(self.path, self.progress.emit)
+        except Exception as e:  # Unreadable files, malformed JSON, full disks
+            self.failed.emit(str(e))
+        else:
+            self.done.emit(self.direction, count)
+        finally:
+            self.store.close()  # This thread's connection only
+
+class DownloadBridge(QObject):
+    progress = pyqtSignal(object)
+    finished = pyqtSignal(object, bool)
 
 class DownloadManager(QDialog):
     def __init__(self, downloads, parent=None):
@@ -450,23 +1550,33 @@ class DownloadManager(QDialog):
         self.progress_bars = {}
 
         for download in self.downloads:
-            progress_bar = QProgressBar(self)
-            progress_bar.setRange(0, 100)
-            progress_bar.setValue(0)
-            self.layout.addWidget(progress_bar)
-            self.progress_bars[download['url']] = progress_bar
+            self.add_download(download)
 
     def update_progress(self, download):
-        progress_bar = self.progress_bars.get(download['url'])
+        progress_bar = self.progress_bars.get(download['path'])
         if progress_bar:
             progress_bar.setValue(download['progress'])
 
-    def add_download(self, url):
-        self.downloads.append({'url': url, 'progress': 0})
-        self.update_progress(self.downloads[-1])
+    def add_download(self, download):
+        self.layout.addWidget(QLabel(os.path.basename(download['path']), self))
+        progress_bar = QProgressBar(self)
+        progress_bar.setRange(0, 100)
+        self.layout.addWidget(progress_bar)
+        self.progress_bars[download['path']] = progress_bar
+        self.update_progress(download)
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['bench']:
+        # Headless page-load benchmark, see pagebench.py
+        from pagebench import main
+        sys.exit(main(sys.argv[2:]))
     app = QApplication(sys.argv)
-    browser = Val()
+    from instance import InstanceServer, command_line_urls, STANDALONE_FLAG
+    browser = Val(command_line_urls(sys.argv[1:]))
+    if STANDALONE_FLAG not in sys.argv:
+        # Later invocations forward their URLs here instead of starting another browser
+        instance_server = InstanceServer(parent=browser)
+        instance_server.urls_received.connect(browser.open_urls)
+        instance_server.listen()
     browser.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+from bookmarks import BookmarkStore, normalize_url, read_json
+
+NETSCAPE = '''<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3 ADD_DATE="1600000000">Toolbar</H3>
+    <DL><p>
+        <DT><A HREF="https://news.example/" ADD_DATE="1600000001" TAGS="news,daily">News &amp; more</A>
+        <DT><H3>Dev</H3>
+        <DL><p>
+            <DT><A HREF="https://github.com/owgydz/val">val</A>
+        </DL><p>
+    </DL><p>
+    <DT><A HREF="https://example.com">Example</A>
+    <DT><A HREF="javascript:alert(1)">Bookmarklet</A>
+</DL><p>
+'''
+
+class TestNormalize(unittest.TestCase):
+    def test_equivalent_urls_share_a_key(self):
+        self.assertEqual(normalize_url('HTTPS://Example.COM:443/#top'), 'https://example.com/')
+        self.assertEqual(normalize_url('http://example.com:8080/a?b=1'), 'http://example.com:8080/a?b=1')
+        self.assertEqual(normalize_url('about:blank'), 'about:blank')
+
+class TestBookmarkStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = BookmarkStore(os.path.join(self.dir, 'bookmarks.sqlite'))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def test_add_is_deduplicated_by_normalized_url(self):
+        self.assertIsNotNone(self.store.add('https://example.com', 'Example', 'Toolbar/Dev', ['Work']))
+        self.assertIsNone(self.store.add('https://EXAMPLE.com/#again'))
+        self.assertIn('https://example.com/', self.store)
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.tags('https://example.com'), ['work'])
+        self.assertEqual(self.store.tagged('work'), ['https://example.com'])
+        self.assertEqual(self.store.in_folder('Toolbar/Dev'), ['https://example.com'])
+        self.assertEqual(self.store.in_folder('Missing'), [])
+        self.assertTrue(self.store.remove('https://example.com'))
+        self.assertEqual(len(self.store), 0)
+
+    def test_netscape_round_trip(self):
+        with open(self.path('in.html'), 'w') as f:
+            f.write(NETSCAPE)
+        self.assertEqual(self.store.import_file(self.path('in.html')), 3)
+        self.assertEqual(self.store.in_folder('Toolbar/Dev'), ['https://github.com/owgydz/val'])
+        self.assertEqual(self.store.tags('https://news.example/'), ['daily', 'news'])
+        self.store.export_file(self.path('out.html'))
+        other = BookmarkStore(self.path('other.sqlite'))
+        self.assertEqual(other.import_file(self.path('out.html')), 3)
+        # HTML keeps whole seconds only
+        self.assertEqual([entry[:4] for entry in other.entries()], [entry[:4] for entry in self.store.entries()])
+        other.close()
+
+    def test_json_round_trip_and_chrome_format(self):
+        self.store.add('https://a.example/', 'A', 'Folder', ['x'], added_at=1.0)
+        self.store.export_file(self.path('out.json'))
+        other = BookmarkStore(self.path('other.sqlite'))
+        self.assertEqual(other.import_file(self.path('out.json')), 1)
+        self.assertEqual(list(other.entries()), [('https://a.example/', 'A', 'Folder', ['x'], 1.0)])
+        chrome = {'roots': {'bookmark_bar': {'type': 'folder', 'name': 'Bookmarks bar', 'children': [
+            {'type': 'url', 'name': 'B', 'url': 'https://b.example/', 'date_added': '13300000000000000'}]}}}
+        with open(self.path('Bookmarks'), 'w') as f:
+            json.dump(chrome, f)
+        self.assertEqual(other.import_file(self.path('Bookmarks')), 1)
+        self.assertEqual(other.in_folder('Bookmarks bar'), ['https://b.example/'])
+        other.close()
+
+    def test_json_stream_across_chunks(self):
+        items = ',\n'.join(json.dumps({'url': f'https://e.example/{i}', 'title': 'x' * 50}) for i in range(3000))
+        chunks = [f'[\n{items}\n]'[i:i + 1000] for i in range(0, len(items) + 4, 1000)]
+        self.assertEqual(len(list(read_json(chunks))), 3000)
+
+    def test_large_import_is_fast_with_flat_memory(self):
+        count = 20000
+        with open(self.path('big.html'), 'w') as f:
+            f.write('<DL><p>\n')
+            for i in range(count):
+                if i % 1000 == 0:
+                    f.write(f'<DT><H3>Folder {i // 1000}</H3>\n<DL><p>\n')
+                f.write(f'<DT><A HREF="https://site{i % 500}.example/page/{i}" ADD_DATE="1600000000">Page {i}</A>\n')
+                if i % 1000 == 999:
+                    f.write('</DL><p>\n')
+            f.write('</DL><p>\n')
+        tracemalloc.start()
+        start = time.perf_counter()
+        added = self.store.import_file(self.path('big.html'))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual(added, count)
+        self.assertLess(elapsed, 10.0)
+        self.assertLess(peak, 8 * 1024 * 1024)
+        self.assertEqual([row[1] for row in self.store.page(limit=1)], [f'https://site{(count - 1) % 500}.example/page/{count - 1}'])
+
+if __name__ == '__main__':
+    unittest.main()
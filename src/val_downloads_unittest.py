@@ -0,0 +1,190 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import downloads
+from downloads import DownloadEngine, NotSegmentable, split_segments
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 12345)
+
+class RangeHandler(BaseHTTPRequestHandler):
+    # Stand-in for a file server; /plain ignores Range like many dynamic endpoints,
+    # /private wants a login cookie and /latest redirects to /file.bin
+    ranges_served = []
+    referers = []
+
+    def log_message(self, *args):
+        pass
+
+    def send_payload(self, body_only):
+        RangeHandler.referers.append(self.headers.get('Referer'))
+        if self.path == '/latest':
+            self.send_response(302)
+            self.send_header('Location', '/file.bin')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/private' and 'session=ok' not in (self.headers.get('Cookie') or ''):
+            self.send_response(403)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        ranged = self.path != '/plain'
+        start, end = 0, len(PAYLOAD) - 1
+        header = self.headers.get('Range')
+        if ranged and header:
+            first, last = header.split('=')[1].split('-')
+            start, end = int(first), int(last or end)
+            RangeHandler.ranges_served.append((start, end))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(PAYLOAD)}')
+        else:
+            self.send_response(200)
+        if ranged:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if not body_only:
+            self.wfile.write(PAYLOAD[start:end + 1])
+
+    def do_HEAD(self):
+        self.send_payload(True)
+
+    def do_GET(self):
+        self.send_payload(False)
+
+class TestDownloadEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        RangeHandler.ranges_served = []
+        RangeHandler.referers = []
+        self.dir = tempfile.mkdtemp()
+        self.engine = DownloadEngine(segments=4, workers=4)
+
+    def tearDown(self):
+        self.engine.shutdown()
+        shutil.rmtree(self.dir)
+
+    def test_split_segments_covers_file(self):
+        segments = split_segments(10 * 1024 * 1024 + 7, 4)
+        self.assertEqual(len(segments), 4)
+        self.assertEqual(segments[0][0], 0)
+        self.assertEqual(segments[-1][1], 10 * 1024 * 1024 + 6)
+        for previous, following in zip(segments, segments[1:]):
+            self.assertEqual(previous[1] + 1, following[0])
+        self.assertEqual(len(split_segments(1000, 4)), 1)
+
+    def test_parallel_segments(self):
+        path = os.path.join(self.dir, 'file.bin')
+        finished = []
+        download = self.engine.download(self.base + '/file.bin', path, on_finished=lambda d, ok: finished.append(ok))
+        self.assertTrue(download.wait(30))
+        self.assertEqual(finished, [True])
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        self.assertEqual(len(RangeHandler.ranges_served), 3)
+        self.assertFalse(os.path.exists(path + '.valdl'))
+        self.assertEqual(download.progress, 100)
+
+    def interrupted(self, url, path):
+        # Resume state as a cancelled download of url leaves it; returns the segments
+        segments = split_segments(len(PAYLOAD), 4)
+        # First segment fully on disk, second half done, the rest untouched
+        half = (segments[1][1] - segments[1][0] + 1) // 2
+        segments[0][2] = segments[0][1] - segments[0][0] + 1
+        segments[1][2] = half
+        with open(path + '.part', 'wb') as f:
+            f.truncate(len(PAYLOAD))
+            f.write(PAYLOAD[:segments[1][0] + half])
+        with open(path + '.valdl', 'w') as f:
+            json.dump({'url': url, 'size': len(PAYLOAD), 'validator': '"v1"', 'segments': segments}, f)
+        return segments
+
+    def assertResumed(self, download, path, segments):
+        self.assertEqual(download.path, path)
+        self.assertTrue(download.wait(30))
+        self.assertIsNone(download.error)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        starts = sorted(start for start, _ in RangeHandler.ranges_served)
+        done = segments[1][0] + segments[1][2]
+        self.assertEqual(starts, [done, segments[2][0]])
+
+    def test_resume_from_state(self):
+        path = os.path.join(self.dir, 'file.bin')
+        segments = self.interrupted(self.base + '/file.bin', path)
+        self.assertResumed(self.engine.download(self.base + '/file.bin', path), path, segments)
+
+    def test_resume_after_a_redirect(self):
+        path = os.path.join(self.dir, 'latest.bin')
+        segments = self.interrupted(self.base + '/latest', path)
+        download = self.engine.download(self.base + '/latest', path)
+        self.assertResumed(download, path, segments)
+        self.assertEqual(download.url, self.base + '/file.bin')
+
+    def test_server_without_ranges(self):
+        path = os.path.join(self.dir, 'plain.bin')
+        download = self.engine.download(self.base + '/plain', path)
+        self.assertTrue(download.wait(30))
+        self.assertIsNone(download.error)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        self.assertEqual(RangeHandler.ranges_served, [])
+
+    def test_existing_files_are_not_overwritten(self):
+        path = os.path.join(self.dir, 'file.bin')
+        with open(path, 'wb') as f:
+            f.write(b'keep me')
+        first = self.engine.download(self.base + '/file.bin', path)
+        second = self.engine.download(self.base + '/plain', path)
+        self.assertEqual((first.path, second.path), (os.path.join(self.dir, 'file (1).bin'), os.path.join(self.dir, 'file (2).bin')))
+        self.assertTrue(first.wait(30) and second.wait(30))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'keep me')
+        with open(first.path, 'rb') as f:
+            self.assertEqual(f.read(), PAYLOAD)
+
+    def test_cookies_and_referer_are_sent(self):
+        path = os.path.join(self.dir, 'private.bin')
+        cookies = [{'name': 'session', 'value': 'ok', 'domain': '127.0.0.1', 'path': '/', 'secure': False}]
+        download = self.engine.download(self.base + '/private', path, cookies=cookies, headers={'Referer': 'https://site.example/'})
+        self.assertTrue(download.wait(30))
+        self.assertIsNone(download.error)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        self.assertEqual(set(RangeHandler.referers), {'https://site.example/'})
+        self.assertFalse(list(self.engine.session.cookies))  # Nothing is kept for the next download
+
+    def test_handoff_when_the_browser_would_do_better(self):
+        for name, expected in (('private', None), ('plain', None), ('file.bin', 'text/html')):
+            path = os.path.join(self.dir, name)
+            download = self.engine.download(f'{self.base}/{name}', path, handoff=True, mime_type=expected)
+            self.assertTrue(download.wait(30))
+            self.assertIsInstance(download.error, NotSegmentable)
+            self.assertFalse(os.path.exists(path) or os.path.exists(path + '.part'))
+
+    def test_progress_is_throttled(self):
+        path = os.path.join(self.dir, 'file.bin')
+        updates = []
+        download = self.engine.download(self.base + '/file.bin', path, on_progress=lambda d: updates.append(d.progress))
+        self.assertTrue(download.wait(30))
+        chunks = len(PAYLOAD) // downloads.CHUNK_SIZE
+        self.assertLess(len(updates), chunks)
+        self.assertEqual(updates[-1], 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Replays a recorded URL corpus through RequestInterceptor and reports per-decision latency.
+#
+#   python val_filters_bench.py --rules easylist.txt --rules hosts.txt --corpus urls.txt
+#
+# Corpus lines are "<url> [resource type] [first party url]", e.g. a dump of the
+# interceptor's traffic. Without --rules/--corpus a synthetic 100k rule list and
+# corpus are generated so runs are comparable between machines.
+
+#imports
+import argparse
+import random
+import time
+from filters import FilterEngine
+
+class RecordedRequest:
+    # Quacks like QWebEngineUrlRequestInfo for the parts the interceptor reads
+    def __init__(self, url, resource_type, first_party):
+        self.url = url
+        self.resource_type = resource_type
+        self.first_party = first_party
+        self.blocked = None
+
+    def requestUrl(self):
+        return self
+
+    def firstPartyUrl(self):
+        return _Url(self.first_party)
+
+    def toString(self):
+        return self.url
+
+    def resourceType(self):
+        return self.resource_type
+
+    def block(self, blocked):
+        self.blocked = blocked
+
+class _Url:
+    def __init__(self, url):
+        self.url = url
+
+    def toString(self):
+        return self.url
+
+def synthetic_rules(count, rng):
+    rules = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            rules.append(f'0.0.0.0 ads{i}.tracker{i % 977}.com')
+        elif kind == 1:
+            rules.append(f'||cdn{i}.adnet{i % 311}.net^$script,third-party')
+        elif kind == 2:
+            rules.append(f'/banner{i}/*/ad_')
+        else:
+            rules.append(f'&adslot{i}=')
+    return rules
+
+def synthetic_corpus(count, rng):
+    hosts = ['www.example.com', 'static.example.com', 'ads5.tracker5.com', 'cdn9.adnet9.net', 'news.site.org', 'img.cdn.io']
+    paths = ['/', '/index.html', '/js/app.js', '/banner42/300x250/ad_1.png', '/api?page=2&adslot7=1', '/img/photo.jpg']
+    types = ['script', 'image', 'stylesheet', 'xmlhttprequest', 'subdocument']
+    corpus = []
+    for _ in range(count):
+        url = f'https://{rng.choice(hosts)}{rng.choice(paths)}?v={rng.randrange(1000)}'
+        corpus.append((url, rng.choice(types), 'https://www.example.com/'))
+    return corpus
+
+def load_corpus(path):
+    corpus = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            resource_type = fields[1] if len(fields) > 1 else 'other'
+            first_party = fields[2] if len(fields) > 2 else ''
+            corpus.append((fields[0], resource_type, first_party))
+    return corpus
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description='RequestInterceptor throughput benchmark')
+    parser.add_argument('--rules', action='append', default=[], help='EasyList or hosts file (repeatable)')
+    parser.add_argument('--corpus', help='recorded URL corpus, one request per line')
+    parser.add_argument('--synthetic-rules', type=int, default=100000)
+    parser.add_argument('--synthetic-urls', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    rng = random.Random(1528)
+
+    start = time.perf_counter()
+    engine = FilterEngine.with_defaults(args.rules)
+    if not args.rules:
+        engine.add_rules(synthetic_rules(args.synthetic_rules, rng))
+    compile_time = time.perf_counter() - start
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.synthetic_urls, rng)
+
+    # The interceptor needs QtWebEngine; replay it when present
+    try:
+        from profiles import RequestInterceptor, RESOURCE_TYPE_NAMES
+    except ImportError as e:
+        print(f'QtWebEngine unavailable ({e}); replaying through FilterEngine directly')
+        decide = None
+        replay = corpus
+    else:
+        interceptor = RequestInterceptor(engine)
+        enums = {name: enum for enum, name in RESOURCE_TYPE_NAMES.items()}
+        decide = interceptor.interceptRequest
+        replay = [RecordedRequest(url, enums.get(t, -1), fp) for url, t, fp in corpus]
+
+    timings = []
+    blocked = 0
+    for _ in range(args.repeat):
+        engine.cache.clear()
+        for request in replay:
+            t0 = time.perf_counter()
+            if decide is None:
+                result = engine.should_block(*request)
+            else:
+                decide(request)
+                result = request.blocked
+            timings.append(time.perf_counter() - t0)
+            blocked += result
+    total = sum(timings)
+    timings.sort()
+
+    print(f'rules:        {len(engine)} compiled in {compile_time:.2f}s ({engine.skipped} skipped)')
+    print(f'decisions:    {len(timings)} ({blocked} blocked)')
+    print(f'throughput:   {len(timings) / total:,.0f} decisions/s')
+    print(f'latency:      mean {total / len(timings) * 1e6:.2f}us  p50 {percentile(timings, 0.5) * 1e6:.2f}us  '
+          f'p99 {percentile(timings, 0.99) * 1e6:.2f}us  max {timings[-1] * 1e6:.2f}us')
+
+if __name__ == '__main__':
+    main()
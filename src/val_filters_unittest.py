@@ -0,0 +1,69 @@
+import unittest
+from filters import FilterEngine, url_host, pick_keyword
+
+class TestFilterEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = FilterEngine.with_defaults()
+
+    def test_default_rules_match_legacy_interceptor(self):
+        self.assertTrue(self.engine.should_block('https://www.example.com/PopUp.js'))
+        self.assertTrue(self.engine.should_block('about:blank'))
+        self.assertFalse(self.engine.should_block('https://www.example.com/'))
+
+    def test_hosts_format(self):
+        self.engine.add_rules(['# comment', '0.0.0.0 ads.example.com', '127.0.0.1 localhost', '0.0.0.0 tracker.net # inline'])
+        self.assertTrue(self.engine.should_block('https://ads.example.com/x.js', 'script'))
+        self.assertTrue(self.engine.should_block('https://cdn.tracker.net/pixel.gif', 'image'))
+        self.assertFalse(self.engine.should_block('https://example.com/', 'document'))
+        self.assertFalse(self.engine.should_block('http://localhost/'))
+
+    def test_domain_anchor_and_exception(self):
+        self.engine.add_rules(['||doubleclick.net^', '@@||good.doubleclick.net^'])
+        self.assertTrue(self.engine.should_block('https://ad.doubleclick.net/banner', 'image'))
+        self.assertFalse(self.engine.should_block('https://good.doubleclick.net/banner', 'image'))
+        self.assertFalse(self.engine.should_block('https://notdoubleclick.net/', 'image'))
+
+    def test_path_exception_overrides_host_block(self):
+        self.engine.add_rules(['||ads.example.com^', '@@||ads.example.com/allowed/'])
+        self.assertTrue(self.engine.should_block('https://ads.example.com/banner.js', 'script'))
+        self.assertFalse(self.engine.should_block('https://ads.example.com/allowed/lib.js', 'script'))
+
+    def test_type_and_third_party_options(self):
+        self.engine.add_rules(['||cdn.example.org^$script,third-party'])
+        first_party = 'https://news.site.com/'
+        self.assertTrue(self.engine.should_block('https://cdn.example.org/a.js', 'script', first_party))
+        self.assertFalse(self.engine.should_block('https://cdn.example.org/a.png', 'image', first_party))
+        self.assertFalse(self.engine.should_block('https://cdn.example.org/a.js', 'script', 'https://www.example.org/'))
+
+    def test_wildcards_separators_and_domain_option(self):
+        self.engine.add_rules(['/banner/*/ad_', '&adtype=^', '/track.gif$domain=shop.com|~safe.shop.com'])
+        self.assertTrue(self.engine.should_block('https://x.com/banner/300x250/ad_1.png', 'image'))
+        self.assertTrue(self.engine.should_block('https://x.com/q?a=1&adtype=&b', 'xmlhttprequest'))
+        self.assertFalse(self.engine.should_block('https://x.com/q?a=1&adtypes=1'))
+        self.assertTrue(self.engine.should_block('https://t.io/track.gif', 'image', 'https://www.shop.com/'))
+        self.assertFalse(self.engine.should_block('https://t.io/track.gif', 'image', 'https://safe.shop.com/'))
+        self.assertFalse(self.engine.should_block('https://t.io/track.gif', 'image', 'https://other.com/'))
+
+    def test_unsupported_rules_are_skipped(self):
+        self.engine.add_rules(['example.com##.ad', '||x.com^$redirect=noop.js', '/ads[0-9]+/'])
+        self.assertEqual(self.engine.skipped, 3)
+        self.assertFalse(self.engine.should_block('https://x.com/ads1/'))
+
+    def test_host_decisions_are_cached(self):
+        self.engine.add_rules(['||ads.example.com^'])
+        self.engine.should_block('https://ads.example.com/1', 'script')
+        self.engine.should_block('https://ads.example.com/2', 'script')
+        self.assertEqual(len([k for k in self.engine.cache if k[0] == 'ads.example.com']), 1)
+
+    def test_url_host(self):
+        self.assertEqual(url_host('https://user:pw@Sub.Example.com:8080/path?q#f'), 'Sub.Example.com')
+        self.assertEqual(url_host('http://[::1]:80/'), '::1')
+        self.assertEqual(url_host('about:blank'), '')
+
+    def test_pick_keyword_requires_token_boundaries(self):
+        self.assertEqual(pick_keyword('/banner/*/ad_', {}), 'banner')
+        self.assertEqual(pick_keyword('popup', {}), '')
+        self.assertEqual(pick_keyword('||ads.com^', {'ads': 5}), 'com')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import time
+import random
+import shutil
+import tempfile
+import unittest
+from fulltext import FullTextIndex, match_query, snippet
+
+DAY = 24 * 60 * 60
+
+class TestQueries(unittest.TestCase):
+    def test_match_query_quotes_words(self):
+        self.assertEqual(match_query('sqlite "fts5" OR'), '"sqlite" "fts5" "OR"*')
+        self.assertIsNone(match_query('  -- '))
+
+    def test_snippet_centres_on_a_hit(self):
+        text = 'intro ' * 100 + 'the quick brown fox ' + 'outro ' * 100
+        excerpt = snippet(text, 'fox', width=60)
+        self.assertIn('fox', excerpt)
+        self.assertTrue(excerpt.startswith('…') and excerpt.endswith('…'))
+
+class TestFullTextIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.index = FullTextIndex(os.path.join(self.dir, 'pages.sqlite'), flush_interval=0.05)
+        self.now = time.time()
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.dir)
+
+    def urls(self, text):
+        return [url for url, title, excerpt, visited_at in self.index.search(text, now=self.now)]
+
+    def test_finds_pages_by_their_text(self):
+        self.index.add('https://a.example/', 'Sourdough', 'Feed the starter twice a day before baking bread.', self.now)
+        self.index.add('https://b.example/', 'Trains', 'The night train to Vienna leaves at nine.', self.now)
+        self.index.add('about:blank', None, 'starter')
+        self.index.flush()
+        self.assertEqual(self.urls('starter'), ['https://a.example/'])
+        self.assertEqual(self.urls('vienna nig'), ['https://b.example/'])  # The last word may be unfinished
+        self.assertEqual(self.urls('starter vienna'), [])
+        self.assertEqual(self.index.search('baking', now=self.now)[0][2], 'Feed the starter twice a day before baking bread.')
+        self.assertEqual(len(self.index), 2)
+
+    def test_titles_and_recent_visits_rank_first(self):
+        self.index.add('https://body.example/', 'Notes', 'a page about kayaks and rivers', self.now)
+        self.index.add('https://title.example/', 'Kayaks', 'a page about rivers', self.now)
+        self.index.add('https://old.example/', 'Kayaks', 'a page about rivers', self.now - 365 * DAY)
+        self.index.flush()
+        self.assertEqual(self.urls('kayaks'), ['https://title.example/', 'https://body.example/', 'https://old.example/'])
+        self.assertEqual(len(self.index.search('kayaks', since=self.now - DAY, now=self.now)), 2)
+
+    def test_changed_page_replaces_its_old_text(self):
+        self.index.add('https://a.example/', 'A', 'first draft mentions walruses', self.now - DAY)
+        self.index.add('https://a.example/', 'A', 'first draft mentions walruses', self.now)
+        self.index.flush()
+        self.assertEqual(self.index.search('walruses', now=self.now)[0][3], self.now)
+        self.index.add('https://a.example/', 'A', 'second draft mentions penguins')
+        self.index.flush()
+        self.assertEqual(self.urls('walruses'), [])
+        self.assertEqual(self.urls('penguins'), ['https://a.example/'])
+        self.index.remove('https://a.example/')
+        self.index.flush()
+        self.assertEqual((self.urls('penguins'), len(self.index)), ([], 0))
+
+    def test_size_cap_evicts_the_oldest_pages(self):
+        self.index.close()
+        self.index = FullTextIndex(os.path.join(self.dir, 'capped.sqlite'), max_bytes=2 * 1024 * 1024, flush_interval=0.05)
+        rng = random.Random(7)
+        for i in range(600):
+            words = ' '.join(f'w{rng.randrange(50000)}' for _ in range(400))
+            self.index.add(f'https://e.example/{i}', f'Page {i}', f'marker{i} {words}', self.now - (600 - i))
+        self.index.flush()
+        self.assertGreater(self.index.evicted, 0)
+        self.assertLess(len(self.index), 600)
+        self.assertEqual(self.urls('marker0'), [])
+        self.assertEqual(self.urls('marker599'), ['https://e.example/599'])
+        connection = self.index.reader()
+        page_size, pages, free = (connection.execute(f'PRAGMA {name}').fetchone()[0] for name in ('page_size', 'page_count', 'freelist_count'))
+        self.assertLessEqual((pages - free) * page_size, 2 * 1024 * 1024)
+
+if __name__ == '__main__':
+    unittest.main()
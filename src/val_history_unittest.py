@@ -0,0 +1,117 @@
+import os
+import time
+import shutil
+import tempfile
+import sqlite3
+import unittest
+import threading
+from unittest import mock
+from history import HistoryStore
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = HistoryStore(os.path.join(self.dir, 'history.sqlite'), flush_interval=0.01)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def test_visits_are_counted_and_ordered(self):
+        self.store.record('https://a.example/', visited_at=1.0)
+        self.store.record('https://b.example/x', visited_at=2.0)
+        self.store.record('https://a.example/', visited_at=3.0)
+        self.store.set_title('https://a.example/', 'A')
+        self.store.flush()
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.visit_count('https://a.example/'), 2)
+        self.assertEqual(self.store.recent(2), [('https://a.example/', 'A', 3.0, 2), ('https://b.example/x', None, 2.0, 1)])
+
+    def test_visits_to_host(self):
+        self.store.record('https://Docs.Example.com/a', visited_at=1.0)
+        self.store.record('https://docs.example.com/b', visited_at=2.0)
+        self.store.record('https://example.com/', visited_at=3.0)
+        self.store.flush()
+        self.assertEqual([row[0] for row in self.store.visits_to_host('docs.example.com')],
+                         ['https://docs.example.com/b', 'https://Docs.Example.com/a'])
+
+    def test_internal_pages_are_skipped(self):
+        self.store.record('about:blank')
+        self.store.record('data:text/html,hi')
+        self.store.flush()
+        self.assertEqual(len(self.store), 0)
+
+    def test_page_walks_back_by_visit(self):
+        for i in range(5):
+            self.store.record(f'https://example.com/{i}', visited_at=float(i))
+        self.store.flush()
+        first = self.store.page(limit=2)
+        self.assertEqual([row[1] for row in first], ['https://example.com/4', 'https://example.com/3'])
+        rest = self.store.page(first[-1][0], until=2.0, limit=10)
+        self.assertEqual([row[1] for row in rest], ['https://example.com/1', 'https://example.com/0'])
+
+    def test_unwritten_visits_until_committed(self):
+        store = HistoryStore(os.path.join(self.dir, 'slow.sqlite'), flush_interval=60)
+        try:
+            store.record('https://a.example/', 'A', visited_at=1.0)
+            store.record('about:blank')
+            store.record('https://b.example/', visited_at=2.0)
+            self.assertEqual(store.unwritten_visits(), [('https://a.example/', 'A', 1.0), ('https://b.example/', None, 2.0)])
+            store.flush()
+            self.assertEqual(store.unwritten_visits(), [])
+            self.assertEqual(len(store), 2)
+        finally:
+            store.close()
+
+    def test_writer_survives_a_failing_batch(self):
+        write = self.store.write
+        failures = [sqlite3.OperationalError('disk I/O error')]
+        def flaky(connection, batch):
+            if failures:
+                raise failures.pop()
+            write(connection, batch)
+        with mock.patch.object(self.store, 'write', side_effect=flaky), self.assertLogs('history', 'ERROR'):
+            self.store.record('https://lost.example/', visited_at=1.0)
+            self.store.flush()
+        self.assertEqual(self.store.unwritten_visits(), [])
+        self.store.record('https://kept.example/', visited_at=2.0)
+        flushing = threading.Thread(target=self.store.flush, daemon=True)
+        flushing.start()
+        flushing.join(5)
+        self.assertFalse(flushing.is_alive(), 'flush() blocked after a failed batch')
+        self.assertEqual([row[0] for row in self.store.recent()], ['https://kept.example/'])
+
+    def test_close_closes_every_thread_reader(self):
+        store = HistoryStore(os.path.join(self.dir, 'readers.sqlite'), flush_interval=0.01)
+        readers = [store.reader()]
+        thread = threading.Thread(target=lambda: readers.append(store.reader()))
+        thread.start()
+        thread.join()
+        store.close()
+        for connection in readers:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                connection.execute('SELECT 1')
+
+    def test_queries_use_indexes(self):
+        self.store.flush()
+        connection = self.store.reader()
+        for query in ("SELECT * FROM visits ORDER BY visited_at DESC LIMIT 10",
+                      "SELECT * FROM visits WHERE host = 'a' ORDER BY visited_at DESC LIMIT 10"):
+            plan = ' '.join(row[-1] for row in connection.execute('EXPLAIN QUERY PLAN ' + query))
+            self.assertIn('USING INDEX', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_many_rows_stay_fast(self):
+        for i in range(20000):
+            self.store.record(f'https://site{i % 100}.example/page{i}', visited_at=float(i))
+        self.store.flush()
+        start = time.perf_counter()
+        recent = self.store.recent(50)
+        by_host = self.store.visits_to_host('site7.example', 50)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(recent[0][2], 19999.0)
+        self.assertEqual(len(by_host), 50)
+        self.assertLess(elapsed, 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
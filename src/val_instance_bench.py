@@ -0,0 +1,99 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Single-instance handoff latency. Starts a browser, then measures how long it
+# takes to hand it a URL: over the socket from this process, and as a whole
+# `python val.py URL` invocation from spawn to exit.
+#
+#   python val_instance_bench.py --handoffs 50 --launches 10 [--json results.json]
+
+#imports
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_URL = 'about:blank'
+
+def summarize(values):
+    values = sorted(values)
+    return {'median_ms': statistics.median(values) * 1000, 'min_ms': values[0] * 1000,
+            'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 'max_ms': values[-1] * 1000}
+
+def wait_for_instance(instance, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'browser exited with {process.returncode} before it was ready')
+        if instance.instance_alive(instance.server_name()):
+            return
+        time.sleep(0.05)
+    raise RuntimeError('browser did not start listening in time')
+
+def main():
+    parser = argparse.ArgumentParser(description='Val single-instance handoff benchmark')
+    parser.add_argument('--handoffs', type=int, default=50, help='socket round trips from this process')
+    parser.add_argument('--launches', type=int, default=10, help='full `val.py URL` invocations')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for the browser to start')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    # A private data directory gives the benchmark its own instance and profile
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    env.setdefault('XDG_DATA_HOME', tempfile.mkdtemp(prefix='val-bench-'))
+    os.environ['XDG_DATA_HOME'] = env['XDG_DATA_HOME']
+    import instance
+
+    browser = subprocess.Popen([sys.executable, os.path.join(HERE, 'val.py')], cwd=HERE, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        wait_for_instance(instance, browser, args.timeout)
+        ready = time.perf_counter() - started
+
+        handoffs = []
+        for _ in range(args.handoffs):
+            t0 = time.perf_counter()
+            if not instance.forward([BENCH_URL]):
+                raise RuntimeError('the running browser did not take the URL')
+            handoffs.append(time.perf_counter() - t0)
+
+        launches = []
+        for _ in range(args.launches):
+            t0 = time.perf_counter()
+            result = subprocess.run([sys.executable, os.path.join(HERE, 'val.py'), BENCH_URL], cwd=HERE, env=env,
+                                    capture_output=True, timeout=args.timeout)
+            launches.append(time.perf_counter() - t0)
+            if result.returncode != 0:
+                raise RuntimeError(f'forwarding launch exited with {result.returncode}')
+        if browser.poll() is not None:
+            raise RuntimeError('the browser exited during the benchmark')
+    finally:
+        browser.terminate()
+        try:
+            browser.wait(10)
+        except subprocess.TimeoutExpired:
+            browser.kill()
+
+    summary = {'first_instance_ready_ms': ready * 1000}
+    if handoffs:
+        summary['socket_handoff'] = summarize(handoffs)
+    if launches:
+        summary['forwarding_launch'] = summarize(launches)
+    print(f'{"first instance":18} ready after {ready * 1000:.0f} ms')
+    for key in ('socket_handoff', 'forwarding_launch'):
+        if key in summary:
+            stats = summary[key]
+            print(f'{key:18} median {stats["median_ms"]:8.2f} ms   p95 {stats["p95_ms"]:8.2f} ms   '
+                  f'min {stats["min_ms"]:8.2f} ms   max {stats["max_ms"]:8.2f} ms')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == '__main__':
+    main()
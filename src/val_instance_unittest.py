@@ -0,0 +1,72 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QDir, QTimer
+from PyQt5.QtNetwork import QLocalServer
+from instance import InstanceServer, command_line_urls, forward
+
+class TestCommandLine(unittest.TestCase):
+    def test_arguments_become_urls(self):
+        with tempfile.NamedTemporaryFile(suffix='.html') as page:
+            folder, name = os.path.split(page.name)
+            urls = command_line_urls(['-platform', 'offscreen', '--standalone', 'example.com', name, 'https://a.example/x'], cwd=folder)
+        self.assertEqual(urls, ['http://example.com', 'file://' + page.name, 'https://a.example/x'])
+
+class TestInstanceServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.name = f'val-test-{os.getpid()}-{self.id().rsplit(".", 1)[-1]}'
+        self.server = InstanceServer(self.name)
+        self.received = []
+        self.server.urls_received.connect(self.received.append)
+
+    def tearDown(self):
+        self.server.close()
+
+    def forward_from_thread(self, urls):
+        # forward() blocks, so it runs beside the event loop that serves it
+        result = []
+        thread = threading.Thread(target=lambda: result.append(forward(urls, self.name)))
+        thread.start()
+        timer = QTimer()
+        timer.timeout.connect(lambda: thread.is_alive() or self.app.quit())
+        timer.start(5)
+        self.app.exec_()
+        thread.join()
+        return result[0]
+
+    def test_urls_are_handed_to_the_running_instance(self):
+        self.assertTrue(self.server.listen())
+        self.assertTrue(self.forward_from_thread(['https://a.example/', 'https://b.example/']))
+        self.assertTrue(self.forward_from_thread([]))
+        self.assertEqual(self.received, [['https://a.example/', 'https://b.example/'], []])
+
+    def test_nobody_listening(self):
+        self.assertFalse(forward(['https://a.example/'], self.name))
+
+    def test_second_instance_does_not_take_over(self):
+        self.assertTrue(self.server.listen())
+        other = InstanceServer(self.name)
+        self.assertFalse(other.listen())
+        other.close()
+
+    def test_stale_socket_is_replaced(self):
+        path = os.path.join(QDir.tempPath(), self.name)
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(path)
+        stale.close()  # Bound but never listening, as after a crash
+        try:
+            self.assertTrue(self.server.listen())
+            self.assertTrue(self.forward_from_thread(['https://a.example/']))
+        finally:
+            QLocalServer.removeServer(self.name)
+
+if __name__ == '__main__':
+    unittest.main()
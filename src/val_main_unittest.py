@@ -1,14 +1,41 @@
+import os
+import shutil
+import tempfile
 import unittest
-from PyQt5.QtWidgets import QApplication
+from unittest import mock
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication, QMessageBox, QInputDialog
+from PyQt5.QtCore import QUrl, QEvent, QCoreApplication
 from val import Val
 
+def same_url(first, second):
+    # Chromium reports "https://host/" for "https://host"
+    return QUrl(first).adjusted(QUrl.StripTrailingSlash) == QUrl(second).adjusted(QUrl.StripTrailingSlash)
+
 class TestVal(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        cls.app = QApplication([])
+        cls.app = QApplication.instance() or QApplication([])
 
     def setUp(self):
+        # A data directory per test, so no test sees another's session, history or bookmarks
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        environment = mock.patch.dict(os.environ, {'XDG_DATA_HOME': self.data_dir})
+        environment.start()
+        self.addCleanup(environment.stop)
+        # Nothing may wait for a click
+        for name in ('information', 'warning', 'question'):
+            patcher = mock.patch.object(QMessageBox, name, return_value=QMessageBox.Ok)
+            patcher.start()
+            self.addCleanup(patcher.stop)
         self.browser = Val()
+        self.browser.finish_startup()
+
+    def tearDown(self):
+        self.browser.close()
+        self.browser.deleteLater()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
 
     def test_initial_home_url(self):
         self.assertEqual(self.browser.home_url, 'https://www.google.com')
@@ -21,26 +48,50 @@ class TestVal(unittest.TestCase):
     def test_navigate_to_url(self):
         self.browser.url_bar.setText('https://www.example.com')
         self.browser.navigate_to_url()
-        self.assertEqual(self.browser.browser.url().toString(), 'https://www.example.com')
+        self.assertTrue(same_url(self.browser.browser.url(), 'https://www.example.com'))
 
     def test_go_home(self):
         self.browser.go_home()
-        self.assertEqual(self.browser.browser.url().toString(), self.browser.home_url)
+        self.assertTrue(same_url(self.browser.browser.url(), self.browser.home_url))
 
     def test_add_bookmark(self):
         self.browser.browser.setUrl(QUrl('https://www.example.com'))
         self.browser.add_bookmark()
         self.assertIn('https://www.example.com', self.browser.bookmarks)
 
+    def test_tabs_share_one_profile(self):
+        self.browser.add_new_tab('https://www.example.com')
+        self.browser.add_new_tab('https://www.example.org')
+        first = self.browser.tab_widget.widget(0).page().profile()
+        last = self.browser.tab_widget.widget(self.browser.tab_widget.count() - 1).page().profile()
+        self.assertIs(first, last)
+        self.assertIs(first, self.browser.profiles.profile)
+
+    def test_private_tabs_are_off_the_record(self):
+        self.browser.is_private_browsing = True
+        self.browser.add_new_tab('https://www.example.com')
+        self.assertTrue(self.browser.browser.page().profile().isOffTheRecord())
+
     def test_toggle_private_browsing(self):
         initial_state = self.browser.is_private_browsing
         self.browser.toggle_private_browsing()
         self.assertNotEqual(self.browser.is_private_browsing, initial_state)
 
     def test_set_homepage(self):
-        self.browser.set_homepage()
+        with mock.patch.object(QInputDialog, 'getText', return_value=('https://www.example.com', True)):
+            self.browser.set_homepage()
         self.assertEqual(self.browser.home_url, 'https://www.example.com')
 
+    def test_one_history_visit_per_document(self):
+        view = self.browser.browser
+        for url in ('https://www.example.com/a', 'https://www.example.com/a#part', 'https://www.example.com/b'):
+            view.setUrl(QUrl(url))
+            self.browser.browser_url_changed(view, QUrl(url))
+            self.browser.browser_load_finished(view, True)
+        self.browser.browser_url_changed(view, QUrl('https://www.example.com/b?tab=2'))  # pushState
+        self.browser.history.flush()
+        self.assertEqual([row[0] for row in self.browser.history.recent()], ['https://www.example.com/b', 'https://www.example.com/a'])
+
     def test_update_status_bar(self):
         url = QUrl('https://www.example.com')
         self.browser.update_status_bar(url)
@@ -54,11 +105,51 @@ class TestVal(unittest.TestCase):
         self.browser.show_ready_status()
         self.assertEqual(self.browser.status_bar.currentMessage(), "Ready")
 
-    def test_update_sidebar(self):
-        self.browser.bookmarks = ['https://www.example.com']
-        self.browser.history = ['https://www.example.com']
-        self.browser.update_sidebar()
-        self.assertIn('https://www.example.com', [self.browser.sidebar_widget.item(i).text() for i in range(self.browser.sidebar_widget.count())])
+    def test_sidebar_lists_bookmarks(self):
+        self.browser.browser.setUrl(QUrl('https://www.example.com'))
+        self.browser.add_bookmark()
+        model = self.browser.sidebar_model
+        bookmarks = model.index(0, 0)
+        while model.canFetchMore(bookmarks):
+            model.fetchMore(bookmarks)
+        self.assertIn('https://www.example.com', [model.index(i, 0, bookmarks).data() for i in range(model.rowCount(bookmarks))])
+
+    def test_sidebar_is_docked_at_startup_and_can_be_reopened(self):
+        sidebar = self.browser.sidebar
+        self.assertTrue(sidebar.isVisibleTo(self.browser))
+        model = self.browser.sidebar_model
+        QCoreApplication.processEvents()
+        self.assertTrue(all(model.canFetchMore(model.index(row, 0)) for row in range(model.rowCount())))  # Nothing paged in yet
+        sidebar.close()
+        self.assertFalse(sidebar.isVisibleTo(self.browser))
+        self.assertIn(sidebar.toggleViewAction(), self.browser.view_menu.actions())
+        sidebar.toggleViewAction().trigger()
+        self.assertTrue(sidebar.isVisibleTo(self.browser))
+
+    def test_view_history_opens_the_sidebar(self):
+        self.browser.history.record('https://www.example.com/visited', 'Visited', visited_at=1.0)  # An earlier session's
+        self.browser.history.flush()
+        self.browser.view_history()
+        QMessageBox.information.assert_not_called()
+        model = self.browser.sidebar_model
+        history = model.index(1, 0)
+        while model.canFetchMore(history):
+            model.fetchMore(history)
+        self.assertTrue(self.browser.sidebar_widget.isExpanded(history))
+        self.assertIn('Visited', [model.index(i, 0, history).data() for i in range(model.rowCount(history))])
+
+    def test_committed_snapshot_backs_a_load_in_flight(self):
+        view = self.browser.browser
+        self.browser.load_url(view, 'https://www.example.com/saved')
+        self.assertFalse(getattr(view, 'slow_timer', None) and view.slow_timer.isActive())  # No copy to fall back on yet
+        snapshots = self.browser.snapshots
+        with open(snapshots.reserve('https://www.example.com/saved'), 'wb') as f:
+            f.write(b'MHTML')
+        snapshots.commit('https://www.example.com/saved', 'Saved')
+        snapshots.flush()
+        QCoreApplication.processEvents()
+        self.assertIn('https://www.example.com/saved', snapshots)
+        self.assertTrue(view.slow_timer.isActive())
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
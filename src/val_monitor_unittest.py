@@ -0,0 +1,98 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import socket
+import urllib.request
+from unittest import mock
+import psutil
+from monitor import RingBuffer, ResourceSampler, MetricsServer, prometheus_text, exporter_from_environment
+
+class TestRingBuffer(unittest.TestCase):
+    def test_keeps_newest_values_in_order(self):
+        buffer = RingBuffer(3)
+        for value in range(5):
+            buffer.append(value)
+        self.assertEqual(buffer.values(), [2.0, 3.0, 4.0])
+        self.assertEqual(buffer.latest(), 4.0)
+        self.assertEqual(len(buffer), 3)
+
+    def test_partial_buffer(self):
+        buffer = RingBuffer(4)
+        self.assertEqual(buffer.latest(), 0.0)
+        buffer.append(1.5)
+        self.assertEqual(buffer.values(), [1.5])
+
+class TestResourceSampler(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.sampler = ResourceSampler(size=10)
+        # Treat this test process as the only renderer
+        me = psutil.Process()
+        self.sampler.renderers = lambda: {me.pid: me}
+        self.sampler.set_targets({1: ('Example "tab"', me.pid), 2: ('Other', me.pid), 3: ('Unloaded', 0)})
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_samples_are_split_between_tabs_sharing_a_renderer(self):
+        self.sampler.sample()
+        snapshot = self.sampler.snapshot()
+        self.assertEqual(sorted(snapshot), [1, 2])
+        rss = psutil.Process().memory_info().rss
+        self.assertAlmostEqual(snapshot[1][1]['rss'][0], rss / 2, delta=rss * 0.1)
+
+    def test_closed_tabs_are_dropped(self):
+        self.sampler.sample()
+        self.sampler.set_targets({2: ('Other', psutil.Process().pid)})
+        self.sampler.sample()
+        self.assertEqual(list(self.sampler.snapshot()), [2])
+
+    def test_prometheus_text_and_gauges(self):
+        self.sampler.add_gauge('val_open_tabs', 'Open tabs.', lambda: 3)
+        self.sampler.add_gauge('val_broken', 'Raises.', lambda: 1 / 0)
+        with self.assertLogs('monitor', 'ERROR') as logs:
+            self.sampler.publish_gauges()
+            self.sampler.publish_gauges()
+        self.assertEqual(len(logs.records), 1)  # Once per broken gauge, not every tick
+        self.sampler.sample()
+        text = prometheus_text(self.sampler)
+        self.assertIn('# TYPE val_tab_rss_bytes gauge', text)
+        self.assertIn('val_tab_cpu_percent{tab="1",title="Example \\"tab\\""}', text)
+        self.assertIn('val_open_tabs 3.0', text)
+        self.assertNotIn('val_broken', text)
+
+    def test_jsonl_export(self):
+        self.sampler.jsonl_path = os.path.join(self.dir, 'metrics.jsonl')
+        self.sampler.sample()
+        self.sampler.sample()
+        with open(self.sampler.jsonl_path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 2)
+        self.assertIn('rss', records[-1]['tabs']['1'])
+
+    def test_metrics_server(self):
+        self.sampler.sample()
+        server = MetricsServer(self.sampler, 0)
+        server.start()
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertIn(b'val_system_cpu_percent', response.read())
+        finally:
+            server.close()
+
+    def test_unusable_metrics_port_is_not_fatal(self):
+        taken = socket.socket()
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        try:
+            for port in (str(taken.getsockname()[1]), 'http', '99999999'):
+                with mock.patch.dict(os.environ, {'VAL_METRICS_PORT': port}), self.assertLogs('monitor', 'WARNING'):
+                    self.assertIsNone(exporter_from_environment(self.sampler))
+        finally:
+            taken.close()
+
+if __name__ == '__main__':
+    unittest.main()
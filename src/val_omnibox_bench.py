@@ -0,0 +1,85 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Per-keystroke latency of the omnibox index over a synthetic history.
+#
+#   python val_omnibox_bench.py --entries 1000000
+#
+# Builds the index from a generated corpus (hosts, paths and titles from a small
+# vocabulary, Zipf-like visit counts), then types a set of queries one character
+# at a time and times every lookup.
+
+#imports
+import argparse
+import random
+import time
+from omnibox import OmniboxIndex
+
+WORDS = ('news weather mail docs drive maps video music photos search shop cart issues pull request '
+         'wiki python qt browser release notes download forum blog recipe travel flight hotel bank '
+         'account settings profile login report invoice budget sports scores market stocks').split()
+TLDS = ('com', 'org', 'net', 'io', 'dev', 'co.uk', 'de')
+
+def synthetic_history(count, rng):
+    hosts = [f'{rng.choice(WORDS)}{i}.{rng.choice(TLDS)}' for i in range(max(count // 200, 50))]
+    now = time.time()
+    for i in range(count):
+        host = hosts[min(int(rng.paretovariate(1.2)) - 1, len(hosts) - 1)]
+        path = '/'.join(rng.choice(WORDS) for _ in range(rng.randrange(1, 4)))
+        url = f'https://{host}/{path}/{i}'
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randrange(2, 6))).title()
+        visits = int(rng.paretovariate(1.5))
+        yield url, title, visits, now - rng.random() * 365 * 24 * 60 * 60
+
+def typed_queries(corpus_hosts, rng, count):
+    queries = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.5:
+            queries.append(rng.choice(corpus_hosts))
+        elif kind < 0.8:
+            queries.append(' '.join(rng.choice(WORDS) for _ in range(2)))
+        else:
+            queries.append('https://www.' + rng.choice(corpus_hosts))
+    return queries
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Omnibox autocomplete latency benchmark')
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+    rng = random.Random(1528)
+
+    corpus = list(synthetic_history(args.entries, rng))
+    hosts = sorted({url.split('/')[2] for url, title, visits, last_visit in corpus[::97]})
+
+    index = OmniboxIndex()
+    start = time.perf_counter()
+    for first in range(0, len(corpus), 512):
+        index.add_many(corpus[first:first + 512])
+    build_time = time.perf_counter() - start
+
+    timings = []
+    for query in typed_queries(hosts, rng, args.queries):
+        for end in range(1, len(query) + 1):
+            t0 = time.perf_counter()
+            index.query(query[:end])
+            timings.append(time.perf_counter() - t0)
+    total = sum(timings)
+    timings.sort()
+
+    try:
+        import psutil
+        rss = f'{psutil.Process().memory_info().rss / 1024 / 1024:.0f} MB RSS'
+    except ImportError:
+        rss = 'RSS n/a'
+    print(f'index:        {len(index)} entries built in {build_time:.1f}s ({len(index) / build_time:,.0f}/s, {rss})')
+    print(f'keystrokes:   {len(timings)}')
+    print(f'latency:      mean {total / len(timings) * 1e6:.1f}us  p50 {percentile(timings, 0.5) * 1e6:.1f}us  '
+          f'p99 {percentile(timings, 0.99) * 1e6:.1f}us  max {timings[-1] * 1e6:.1f}us')
+
+if __name__ == '__main__':
+    main()
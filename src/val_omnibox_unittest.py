@@ -0,0 +1,128 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtCore import QCoreApplication
+from omnibox import OmniboxIndex, Omnibox, url_key, frecency, add_visit, BUCKET_SIZE, BOOKMARK_BONUS
+from history import HistoryStore
+from bookmarks import BookmarkStore
+
+DAY = 24 * 60 * 60
+
+class TestRanking(unittest.TestCase):
+    def test_url_key(self):
+        self.assertEqual(url_key('https://www.Example.com/a'), 'example.com/a')
+        self.assertEqual(url_key('example.com'), 'example.com')
+
+    def test_recent_visits_outrank_old_ones(self):
+        now = time.time()
+        self.assertGreater(frecency(3, now), frecency(3, now - 90 * DAY))
+        self.assertGreater(frecency(10, now - 7 * DAY), frecency(1, now))
+        self.assertAlmostEqual(add_visit(frecency(1, now), now), frecency(2, now))
+
+class TestOmniboxIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = OmniboxIndex()
+        now = time.time()
+        self.index.add('https://github.com/owgydz/val/issues', 'Issues · owgydz/val', 20, now)
+        self.index.add('https://github.com/explore', 'Explore GitHub', 2, now - 60 * DAY)
+        self.index.add('https://www.google.com/', 'Google', 50, now)
+        self.index.add('https://docs.python.org/3/library/sqlite3.html', 'sqlite3 — Python docs', 5, now)
+
+    def test_prefix_matches_by_frecency(self):
+        self.assertEqual([url for url, title in self.index.query('gi')],
+                         ['https://github.com/owgydz/val/issues', 'https://github.com/explore'])
+        self.assertEqual(self.index.query('https://www.goo')[0][0], 'https://www.google.com/')
+
+    def test_word_matches(self):
+        self.assertEqual(self.index.query('python sqlite')[0][0], 'https://docs.python.org/3/library/sqlite3.html')
+        self.assertEqual(self.index.query('issu')[0][0], 'https://github.com/owgydz/val/issues')
+        self.assertEqual(self.index.query('nothing here'), [])
+
+    def test_visits_and_bookmarks_rerank(self):
+        for _ in range(40):
+            self.index.record_visit('https://github.com/explore', time.time())
+        self.assertEqual(self.index.query('github')[0][0], 'https://github.com/explore')
+        self.index.set_bookmarked('https://example.org/new', 'New')
+        self.assertEqual(self.index.query('exa')[0], ('https://example.org/new', 'New'))
+
+    def test_fresh_bookmark_outranks_an_old_visit(self):
+        index = OmniboxIndex()
+        index.add('https://docs.example/old', 'Old', 3, time.time() - 90 * DAY)
+        index.set_bookmarked('https://docs.example/new', 'New')
+        self.assertEqual([url for url, title in index.query('docs.example')], ['https://docs.example/new', 'https://docs.example/old'])
+
+    def test_burst_keeps_results_exact(self):
+        now = time.time()
+        for i in range(BUCKET_SIZE * 4):
+            self.index.add(f'https://site.example/page{i}', None, i % 7 + 1, now - i)
+        results = self.index.query('site.example/page1', limit=3)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(url.startswith('https://site.example/page1') for url, title in results))
+
+    def test_builds_from_history(self):
+        directory = tempfile.mkdtemp()
+        try:
+            store = HistoryStore(os.path.join(directory, 'history.sqlite'))
+            store.record('https://news.example/today', visited_at=time.time())
+            store.flush()
+            bookmarks = BookmarkStore(os.path.join(directory, 'bookmarks.sqlite'))
+            added_at = time.time() - DAY
+            bookmarks.add('https://bookmarked.example/', 'Bookmarked', added_at=added_at)
+            index = OmniboxIndex()
+            index.build(store, bookmarks)
+            self.assertTrue(index.built)
+            self.assertEqual(index.query('news')[0][0], 'https://news.example/today')
+            self.assertIn(index.ids['https://bookmarked.example/'], index.bookmarked)
+            self.assertEqual(index.scores[index.ids['https://bookmarked.example/']], frecency(1, added_at) + BOOKMARK_BONUS)
+            store.close()
+            bookmarks.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_stopped_build_reads_no_further(self):
+        directory = tempfile.mkdtemp()
+        try:
+            store = HistoryStore(os.path.join(directory, 'history.sqlite'))
+            for i in range(10):
+                store.record(f'https://site.example/{i}', visited_at=float(i))
+            store.flush()
+            index = OmniboxIndex()
+            url_rows = store.url_rows
+            def stop_after_first_chunk(after, limit):
+                index.stop()
+                return url_rows(after, limit)
+            store.url_rows = stop_after_first_chunk
+            index.build(store, chunk=4)
+            self.assertEqual(len(index), 4)
+            self.assertFalse(index.built)
+            store.close()
+        finally:
+            shutil.rmtree(directory)
+
+class TestOmnibox(unittest.TestCase):
+    def test_only_the_newest_request_is_answered(self):
+        app = QCoreApplication.instance() or QCoreApplication([])
+        index = OmniboxIndex()
+        index.add('https://example.com/', 'Example')
+        release = threading.Event()
+        query = index.query
+        index.query = lambda text: (release.wait(5), query(text))[1]
+        omnibox = Omnibox(index)
+        answers = []
+        omnibox.suggestions.connect(lambda generation, text, results: answers.append(text))
+        omnibox.request('e')
+        omnibox.request('ex')
+        omnibox.request('exa')
+        release.set()
+        deadline = time.monotonic() + 5
+        while 'exa' not in answers and time.monotonic() < deadline:
+            app.processEvents()
+        omnibox.close()
+        self.assertEqual(answers, ['exa'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+import urllib.request
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QObject, QUrl, pyqtSignal
+from pagebench import PageLoadBench, FixtureServer, fixture_site, distribution, summarize, write_csv, write_json, document_key
+
+class ScriptedPage(QObject):
+    # Stands in for QWebEnginePage: loads only happen when the test says so
+    loadStarted = pyqtSignal()
+    loadFinished = pyqtSignal(bool)
+    urlChanged = pyqtSignal(QUrl)
+    Stop = 0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.loading = None
+
+    def load(self, url):
+        self.loading = url.toString()
+
+    def runJavaScript(self, source, callback):
+        callback([5.0, 12.0])
+
+    def triggerAction(self, action):
+        pass
+
+class Interceptor:
+    observer = None
+
+class ScriptedProfiles:
+    def __init__(self):
+        self.interceptor = Interceptor()
+        self.pages = []
+
+    def new_page(self, is_private, parent):
+        self.pages.append(ScriptedPage(parent))
+        return self.pages[-1]
+
+class TestPageBench(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_distribution_percentiles(self):
+        stats = distribution([float(value) for value in range(100, 0, -1)] + [None])
+        self.assertEqual((stats['count'], stats['min'], stats['max']), (100, 1.0, 100.0))
+        self.assertEqual((stats['p50'], stats['p90'], stats['p99']), (51.0, 91.0, 100.0))
+        self.assertIsNone(distribution([]))
+
+    def test_fixture_site_is_served(self):
+        paths = fixture_site(self.dir, pages=3)
+        server = FixtureServer(self.dir)
+        try:
+            with urllib.request.urlopen(server.url(paths[1])) as response:
+                body = response.read().decode()
+        finally:
+            server.close()
+        self.assertEqual(len(paths), 3)
+        self.assertIn('/ads/banner.js', body)
+        self.assertIn('href="/page2.html"', body)
+
+    def test_requests_are_attributed_to_their_page(self):
+        profiles = ScriptedProfiles()
+        urls = ['http://a.test/', 'http://b.test/#top', 'http://a.test/']
+        bench = PageLoadBench(profiles, urls, concurrency=2)
+        finished = []
+        bench.finished.connect(lambda: finished.append(True))
+        bench.start()
+        first, second = profiles.pages
+        # The second copy of a.test waits until the first is done
+        self.assertEqual((first.loading, second.loading), ('http://a.test/', 'http://b.test/#top'))
+        for page in profiles.pages:
+            page.loadStarted.emit()
+        observe = profiles.interceptor.observer
+        observe('http://a.test/', 'document', 'http://a.test/', False)
+        observe('http://ads.test/x.js', 'script', 'http://a.test/', True)
+        observe('http://b.test/', 'document', 'http://b.test/', False)
+        first.loadFinished.emit(True)
+        self.assertEqual(first.loading, 'http://a.test/')
+        first.loadStarted.emit()
+        second.loadFinished.emit(False)
+        first.loadFinished.emit(True)
+        self.assertEqual(finished, [True])
+        self.assertIsNone(profiles.interceptor.observer)
+        by_url = [(result['url'], result['ok'], result['requests'], result['blocked']) for result in bench.results]
+        self.assertEqual(by_url, [('http://a.test/', True, 2, 1), ('http://b.test/#top', False, 1, 0), ('http://a.test/', True, 0, 0)])
+        self.assertEqual(bench.results[0]['ttfb_ms'], 5.0)
+        summary = summarize(bench.results, 2.0)
+        self.assertEqual((summary['pages'], summary['failed'], summary['blocked'], summary['load_ms']['count']), (3, 1, 1, 2))
+        bench.close()
+
+    def test_reports_round_trip(self):
+        results = [{'url': 'http://a.test/', 'ok': True, 'error': None, 'load_started_ms': 1.0, 'load_ms': 20.0,
+                    'ttfb_ms': 4.0, 'dom_content_loaded_ms': 9.0, 'requests': 7, 'blocked': 2}]
+        summary = summarize(results, 1.0)
+        write_json(os.path.join(self.dir, 'out.json'), summary, results, {'concurrency': 1})
+        write_csv(os.path.join(self.dir, 'out.csv'), results)
+        with open(os.path.join(self.dir, 'out.json')) as f:
+            self.assertEqual(json.load(f)['summary']['load_ms']['p50'], 20.0)
+        with open(os.path.join(self.dir, 'out.csv')) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual((rows[0]['url'], rows[0]['blocked']), ('http://a.test/', '2'))
+        self.assertEqual(document_key('http://a.test/x#frag'), 'http://a.test/x')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+from profiler import LatencyHistogram, SlotProfiler, StallWatchdog, Profiler, code_objects, format_report
+
+class Handlers:
+    def quick(self):
+        return 1
+
+    def slow(self):
+        time.sleep(0.01)
+        return self.quick()
+
+    def broken(self):
+        raise ValueError('handler failed')
+
+    def pages(self):
+        yield 1
+
+    @staticmethod
+    def helper():
+        return 2
+
+def block_event_loop():
+    time.sleep(0.4)
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_are_bucket_upper_bounds(self):
+        histogram = LatencyHistogram()
+        for _ in range(99):
+            histogram.record(0.0001)   # 100us, below 128us
+        histogram.record(0.05)
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['p50_ms'], 0.128)
+        self.assertAlmostEqual(summary['max_ms'], 50.0)
+        self.assertAlmostEqual(histogram.percentile(1.0), 0.05)
+        self.assertEqual(LatencyHistogram().percentile(0.5), 0.0)
+
+class TestSlotProfiler(unittest.TestCase):
+    def test_code_objects_skip_generators(self):
+        names = {code.co_name for code in code_objects([Handlers])}
+        self.assertEqual(names, {'quick', 'slow', 'broken', 'helper'})
+
+    def test_times_calls_including_exceptions(self):
+        profiler = SlotProfiler(code_objects([Handlers]))
+        handlers = Handlers()
+        profiler.start()
+        try:
+            self.assertIn(profiler.backend, ('sys.monitoring', 'setprofile'))
+            handlers.slow()
+            handlers.quick()
+            with self.assertRaises(ValueError):
+                handlers.broken()
+            list(handlers.pages())
+        finally:
+            profiler.stop()
+        handlers.quick()  # Not recorded once stopped
+        report = profiler.report()
+        self.assertEqual(list(report)[0], 'Handlers.slow')
+        self.assertGreaterEqual(report['Handlers.slow']['mean_ms'], 10.0)
+        self.assertEqual(report['Handlers.quick']['count'], 2)
+        self.assertEqual(report['Handlers.broken']['count'], 1)
+        self.assertNotIn('Handlers.pages', report)
+        self.assertEqual(profiler.stack, [])
+        self.assertIsNone(profiler.backend)
+
+class TestStallWatchdog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_stall_is_caught_with_the_blocking_stack(self):
+        profiler = Profiler([block_event_loop])
+        profiler.start()
+        QTimer.singleShot(100, block_event_loop)
+        QTimer.singleShot(700, self.app.quit)
+        self.app.exec_()
+        profiler.stop()
+        report = profiler.report()
+        self.assertEqual(len(report['stalls']), 1)
+        stall = report['stalls'][0]
+        self.assertGreaterEqual(stall['duration_ms'], 350)
+        self.assertEqual(stall['slot'], 'block_event_loop')
+        self.assertIn('block_event_loop', ''.join(stall['stack']))
+        self.assertGreater(report['timer_lateness']['count'], 5)
+        self.assertIn('block_event_loop', format_report(report))
+        path = os.path.join(self.dir, 'profile.json')
+        profiler.dump(path)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['slots']['block_event_loop']['count'], 1)
+
+    def test_idle_loop_has_no_stalls(self):
+        watchdog = StallWatchdog(threshold=0.2)
+        watchdog.start()
+        QTimer.singleShot(300, self.app.quit)
+        self.app.exec_()
+        watchdog.stop()
+        self.assertEqual(watchdog.report()['stalls'], [])
+
+if __name__ == '__main__':
+    unittest.main()
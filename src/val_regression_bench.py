@@ -0,0 +1,269 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Regression benchmark for core browser operations, run in one process under
+# the offscreen Qt platform with every modal dialog stubbed, so it needs no
+# display and no one to click:
+#
+#   construct          Val() up to the first paint's worth of widgets
+#   finish_startup     the deferred part of startup, stores included
+#   tab_cycle          add_new_tab() and close_tab() of one foreground tab
+#   load_session       restoring a 100-tab session journal
+#   open_sidebar       View History and its first page over a large history
+#   interceptor        RequestInterceptor decisions, per 1000 requests
+#
+# Medians are compared with a baseline recorded on the same machine; the run
+# exits with status 1 when one is slower than baseline * (1 + threshold).
+#
+#   python val_regression_bench.py --save-baseline      # record the baseline
+#   python val_regression_bench.py [--threshold 0.25]   # compare against it
+#   python val_regression_bench.py --only tab_cycle --json results.json
+
+#imports
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import statistics
+import tempfile
+import contextlib
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, 'val_regression_baseline.json')
+THRESHOLD = 0.25
+NOISE_FLOOR_MS = 0.5  # Medians this close to their baseline never count as regressions
+SESSION_TABS = 100
+HISTORY_VISITS = 100000
+INTERCEPTOR_RULES = 20000
+INTERCEPTOR_BATCH = 1000
+
+def summarize(samples):
+    values = sorted(samples)
+    return {'runs': len(values), 'median_ms': statistics.median(values) * 1000, 'min_ms': values[0] * 1000,
+            'max_ms': values[-1] * 1000}
+
+@contextlib.contextmanager
+def unattended():
+    # Every dialog the browser can raise answers at once, as if dismissed
+    from PyQt5.QtWidgets import QMessageBox, QInputDialog, QFileDialog, QDialog
+    stubs = [
+        (QMessageBox, 'information', QMessageBox.Ok), (QMessageBox, 'warning', QMessageBox.Ok),
+        (QMessageBox, 'critical', QMessageBox.Ok), (QMessageBox, 'question', QMessageBox.No),
+        (QInputDialog, 'getText', ('', False)), (QInputDialog, 'getInt', (0, False)),
+        (QFileDialog, 'getOpenFileName', ('', '')), (QFileDialog, 'getSaveFileName', ('', '')),
+        (QDialog, 'exec_', QDialog.Rejected),
+    ]
+    with contextlib.ExitStack() as stack:
+        for owner, name, answer in stubs:
+            stack.enter_context(mock.patch.object(owner, name, return_value=answer))
+        yield
+
+class Workspace:
+    # A data directory per window, so runs never restore each other's sessions
+    def __init__(self, root):
+        self.root = root
+        self.count = 0
+
+    def fresh(self, template=None):
+        self.count += 1
+        path = os.path.join(self.root, f'data{self.count}')
+        if template is not None:
+            shutil.copytree(template, path)
+        os.environ['XDG_DATA_HOME'] = path
+        return path
+
+def close_window(window):
+    from PyQt5.QtCore import QCoreApplication, QEvent
+    window.close()
+    window.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+def bench_startup(val, workspace, runs):
+    construct, finish = [], []
+    for _ in range(runs):
+        workspace.fresh()
+        t0 = time.perf_counter()
+        window = val.Val()
+        t1 = time.perf_counter()
+        window.finish_startup()
+        t2 = time.perf_counter()
+        construct.append(t1 - t0)
+        finish.append(t2 - t1)
+        close_window(window)
+    return {'construct': construct, 'finish_startup': finish}
+
+def bench_tab_cycle(val, workspace, runs):
+    from PyQt5.QtCore import QCoreApplication, QEvent
+    workspace.fresh()
+    window = val.Val()
+    window.finish_startup()
+    samples = []
+    for i in range(runs):
+        window.tab_lifecycle.refill()  # What the refill timer does between a user's tab opens
+        t0 = time.perf_counter()
+        window.add_new_tab(f'about:blank#{i}')
+        window.close_tab(window.tab_widget.currentIndex())
+        samples.append(time.perf_counter() - t0)
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    close_window(window)
+    return {'tab_cycle': samples}
+
+def session_template(root):
+    from session import SessionJournal
+    path = os.path.join(root, 'session-template')
+    os.makedirs(os.path.join(path, 'val'))
+    journal = SessionJournal(os.path.join(path, 'val', 'session.journal'))
+    for tab in range(1, SESSION_TABS + 1):
+        journal.record('open', tab, url=f'https://site{tab}.example/page', title=f'Page {tab}', before=None)
+    journal.record('select', SESSION_TABS // 2)
+    journal.close()
+    return path
+
+def bench_load_session(val, workspace, runs):
+    template = session_template(workspace.root)
+    samples = []
+    for _ in range(runs):
+        workspace.fresh(template)
+        window = val.Val()
+        with mock.patch.object(window, 'load_session'):  # Held back so only the restore is timed
+            window.finish_startup()
+        t0 = time.perf_counter()
+        window.load_session()
+        samples.append(time.perf_counter() - t0)
+        if window.tab_widget.count() != SESSION_TABS:
+            raise RuntimeError(f'restored {window.tab_widget.count()} tabs, expected {SESSION_TABS}')
+        close_window(window)
+    return {'load_session': samples}
+
+def history_template(root):
+    from history import HistoryStore
+    path = os.path.join(root, 'history-template')
+    os.makedirs(os.path.join(path, 'val'))
+    store = HistoryStore(os.path.join(path, 'val', 'history.sqlite'))
+    now = time.time()
+    for visit in range(HISTORY_VISITS):
+        store.record(f'https://site{visit % 5000}.example/page{visit % 997}', f'Page {visit}', now - visit * 60)
+    store.close()
+    return path
+
+def bench_open_sidebar(val, workspace, runs):
+    template = history_template(workspace.root)
+    samples = []
+    for _ in range(runs):
+        workspace.fresh(template)
+        window = val.Val()
+        window.finish_startup()
+        t0 = time.perf_counter()
+        window.view_history()
+        model = window.sidebar_model
+        history = model.index(1, 0)
+        if model.canFetchMore(history):
+            model.fetchMore(history)
+        samples.append(time.perf_counter() - t0)
+        if not model.rowCount(history):
+            raise RuntimeError('the sidebar showed no history')
+        close_window(window)
+    return {'open_sidebar': samples}
+
+def bench_interceptor(val, workspace, runs):
+    from filters import FilterEngine
+    from profiles import RequestInterceptor, RESOURCE_TYPE_NAMES
+    from val_filters_bench import RecordedRequest, synthetic_rules, synthetic_corpus
+    rng = random.Random(1528)
+    engine = FilterEngine.with_defaults()
+    engine.add_rules(synthetic_rules(INTERCEPTOR_RULES, rng))
+    interceptor = RequestInterceptor(engine)
+    enums = {name: enum for enum, name in RESOURCE_TYPE_NAMES.items()}
+    requests = [RecordedRequest(url, enums.get(kind, -1), first_party)
+                for url, kind, first_party in synthetic_corpus(INTERCEPTOR_BATCH, rng)]
+    for request in requests:
+        interceptor.interceptRequest(request)  # Warm-up, compiles the lazily built matchers
+    samples = []
+    for _ in range(runs):
+        engine.cache.clear()
+        t0 = time.perf_counter()
+        for request in requests:
+            interceptor.interceptRequest(request)
+        samples.append(time.perf_counter() - t0)
+    return {'interceptor': samples}
+
+BENCHES = {
+    'startup': bench_startup,
+    'tab_cycle': bench_tab_cycle,
+    'load_session': bench_load_session,
+    'open_sidebar': bench_open_sidebar,
+    'interceptor': bench_interceptor,
+}
+
+def compare(summary, baseline, threshold):
+    # [(case, median_ms, baseline_ms, change)] for the cases slower than allowed
+    regressions = []
+    for case, stats in summary.items():
+        reference = baseline.get(case)
+        if reference is None:
+            continue
+        limit = reference['median_ms'] * (1 + threshold)
+        if stats['median_ms'] > limit and stats['median_ms'] - reference['median_ms'] > NOISE_FLOOR_MS:
+            regressions.append((case, stats['median_ms'], reference['median_ms'], stats['median_ms'] / reference['median_ms'] - 1))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Val core operations regression benchmark')
+    parser.add_argument('--runs', type=int, default=15, help='samples per case')
+    parser.add_argument('--only', action='append', choices=sorted(BENCHES), help='run only this bench, may be repeated')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file to compare with or save to')
+    parser.add_argument('--save-baseline', action='store_true', help='record this run as the baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='allowed slowdown, 0.25 is 25%%')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    root = tempfile.mkdtemp(prefix='val-regression-')
+    os.environ['XDG_DATA_HOME'] = root  # Before Qt caches any path, so the real profile is never touched
+    from PyQt5.QtWidgets import QApplication
+    import val
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+
+    samples = {}
+    try:
+        with unattended():
+            for name in args.only or BENCHES:
+                samples.update(BENCHES[name](val, Workspace(os.path.join(root, name)), args.runs))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    summary = {case: summarize(values) for case, values in samples.items()}
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['cases']
+    for case, stats in summary.items():
+        reference = baseline.get(case)
+        change = f'{stats["median_ms"] / reference["median_ms"] - 1:+7.1%} vs {reference["median_ms"]:.2f} ms' if reference else 'no baseline'
+        print(f'{case:16} median {stats["median_ms"]:9.2f} ms   min {stats["min_ms"]:9.2f} ms   max {stats["max_ms"]:9.2f} ms   {change}')
+
+    results = {'python': sys.version.split()[0], 'platform': sys.platform, 'runs': args.runs, 'cases': summary}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            # Cases this run left out keep their old baseline
+            with open(args.baseline) as f:
+                results['cases'] = dict(json.load(f)['cases'], **summary)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'baseline saved to {args.baseline}')
+        return 0
+
+    regressions = compare(summary, baseline, args.threshold)
+    for case, median, reference, change in regressions:
+        print(f'REGRESSION {case}: {median:.2f} ms against a baseline of {reference:.2f} ms ({change:+.0%})')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from session import SessionJournal, SessionState, read_journal
+
+class TestSessionState(unittest.TestCase):
+    def test_open_move_close_select(self):
+        state = SessionState()
+        for tab_id in (1, 2, 3):
+            state.apply({'op': 'open', 'tab': tab_id, 'url': f'https://example.com/{tab_id}'})
+        state.apply({'op': 'move', 'tab': 3, 'before': 1})
+        state.apply({'op': 'select', 'tab': 2})
+        state.apply({'op': 'close', 'tab': 1})
+        self.assertEqual(state.order, [3, 2])
+        self.assertEqual(state.current, 2)
+
+    def test_navigate_replaces_history_and_resets_scroll(self):
+        state = SessionState()
+        state.apply({'op': 'open', 'tab': 1, 'url': 'https://a.example'})
+        state.apply({'op': 'navigate', 'tab': 1, 'url': 'https://b.example', 'title': 'B', 'history': 'AAAA'})
+        self.assertEqual(state.tabs[1]['history'], 'AAAA')
+        state.apply({'op': 'scroll', 'tab': 1, 'scroll': [0, 400]})
+        self.assertEqual(state.tabs[1]['scroll'], [0, 400])
+        # The URL changed but the page has not loaded: B's list would reopen B, so the URL is restored alone
+        state.apply({'op': 'navigate', 'tab': 1, 'url': 'https://c.example', 'title': 'C'})
+        self.assertIsNone(state.tabs[1]['history'])
+        self.assertEqual(state.tabs[1]['url'], 'https://c.example')
+        self.assertIsNone(state.tabs[1]['scroll'])
+
+class TestSessionJournal(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'session.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_replays_after_a_crash(self):
+        journal = SessionJournal(self.path, delay=0.01)
+        journal.record('open', 1, url='https://a.example', title='A', before=None)
+        journal.record('open', 2, url='https://b.example', title='B', before=None)
+        journal.record('select', 2)
+        journal.set_scroll(2, [0, 120])
+        journal.flush()
+        # No close(): the state on disk must already be complete
+        state, _ = read_journal(self.path)
+        self.assertEqual([tab['url'] for tab in state.ordered_tabs()], ['https://a.example', 'https://b.example'])
+        self.assertEqual(state.current, 2)
+        self.assertEqual(state.tabs[2]['scroll'], [0, 120])
+
+    def test_torn_last_line_is_ignored(self):
+        journal = SessionJournal(self.path)
+        journal.record('open', 1, url='https://a.example', title='A', before=None)
+        journal.close()
+        with open(self.path, 'a') as f:
+            f.write('{"op":"open","tab":2,"url":"https://b.ex')
+        state, _ = read_journal(self.path)
+        self.assertEqual(state.order, [1])
+
+    def test_background_flush_and_compaction(self):
+        journal = SessionJournal(self.path, delay=0.01, compact_after=50)
+        journal.record('open', 1, url='https://a.example', title='A', before=None)
+        for i in range(200):
+            journal.record('navigate', 1, url=f'https://a.example/{i}', title=str(i))
+        deadline = time.monotonic() + 5
+        while journal.events >= 50 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertLess(journal.events, 50)
+        journal.close()
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+        state, _ = read_journal(self.path)
+        self.assertEqual(state.tabs[1]['url'], 'https://a.example/199')
+
+    def test_thousands_of_events_replay_quickly(self):
+        journal = SessionJournal(self.path, compact_after=10 ** 9)
+        for tab_id in range(300):
+            journal.record('open', tab_id, url=f'https://example.com/{tab_id}', title=None, before=None)
+        for i in range(20000):
+            journal.record('navigate', i % 300, url=f'https://example.com/{i}', title=str(i))
+        journal.flush()
+        start = time.perf_counter()
+        state, events = read_journal(self.path)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(events, 20300)
+        self.assertEqual(len(state.order), 300)
+        self.assertLess(elapsed, 2.0)
+        journal.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import time
+import unittest
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+from sidebar import SidebarSection, SidebarModel, SidebarView
+
+def numbered_page(total):
+    # Stand-in for a store holding `total` entries, newest (highest key) first
+    def fetch_page(cursor, limit):
+        end = total if cursor is None else cursor
+        return [(key, f'https://example.com/{key}', None) for key in range(end - 1, max(end - limit, 0) - 1, -1)]
+    return fetch_page
+
+class TestSidebarModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.model = SidebarModel([SidebarSection('Bookmarks', numbered_page(3)),
+                                   SidebarSection('History', numbered_page(1000000))], page_size=100)
+        self.history = self.model.index(1, 0)
+
+    def test_fetches_in_pages(self):
+        self.assertEqual(self.model.rowCount(self.history), 0)
+        self.assertTrue(self.model.hasChildren(self.history))
+        self.model.fetchMore(self.history)
+        self.model.fetchMore(self.history)
+        self.assertEqual(self.model.rowCount(self.history), 200)
+        self.assertEqual(self.model.index(199, 0, self.history).data(Qt.UserRole), 'https://example.com/999800')
+        bookmarks = self.model.index(0, 0)
+        self.model.fetchMore(bookmarks)
+        self.assertFalse(self.model.canFetchMore(bookmarks))
+
+    def test_new_entries_are_inserted_on_top(self):
+        self.model.fetchMore(self.history)
+        inserted = []
+        self.model.rowsInserted.connect(lambda parent, first, last: inserted.append((parent.row(), first, last)))
+        self.model.add(1, 'https://new.example')
+        self.model.update_title(1, 'https://new.example', 'New')
+        self.assertEqual(inserted, [(1, 0, 0)])
+        self.assertEqual(self.model.index(0, 0, self.history).data(), 'New')
+        self.assertEqual(self.model.index(1, 0, self.history).data(Qt.UserRole), 'https://example.com/999999')
+        self.assertEqual(self.model.parent(self.model.index(0, 0, self.history)).row(), 1)
+
+    def test_view_scrolls_through_a_million_entries(self):
+        view = SidebarView(self.model)
+        view.resize(300, 600)
+        view.expandAll()
+        view.show()
+        self.app.processEvents()
+        start = time.perf_counter()
+        for _ in range(50):
+            view.scrollToBottom()
+            self.app.processEvents()
+        elapsed = time.perf_counter() - start
+        self.assertGreater(self.model.rowCount(self.history), 1000)
+        self.assertLess(elapsed, 5.0)
+
+if __name__ == '__main__':
+    unittest.main()
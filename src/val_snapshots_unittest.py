@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from snapshots import SnapshotCache, REFRESH_AFTER
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.committed = []
+        self.cache = SnapshotCache(self.dir, budget_bytes=1000, on_committed=self.saved)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.dir)
+
+    def saved(self, url, entry):
+        self.committed.append((url, entry, threading.current_thread()))
+
+    def commit(self, url, title=None, saved_at=None):
+        self.cache.commit(url, title, saved_at)
+        self.cache.flush()
+        return self.committed[-1][1]
+
+    def save(self, url, size=100, title=None, saved_at=None):
+        # What Chromium does with the path handed to QWebEnginePage.save()
+        with open(self.cache.reserve(url), 'wb') as f:
+            f.write(b'x' * size)
+        return self.commit(url, title, saved_at)
+
+    def test_copies_are_keyed_by_normalized_url(self):
+        entry = self.save('HTTPS://Docs.Example:443/guide#install', title='Guide')
+        self.assertIs(self.cache.find('https://docs.example/guide'), entry)
+        self.assertIn('https://docs.example/guide#faq', self.cache)
+        self.assertNotIn('https://docs.example/guide?page=2', self.cache)
+        self.assertEqual(entry['title'], 'Guide')
+        self.assertEqual(os.path.getsize(entry['path']), 100)
+        self.assertEqual(self.committed[0][0], 'HTTPS://Docs.Example:443/guide#install')
+        self.assertIsNot(self.committed[0][2], threading.current_thread())  # Committed on the writer
+
+    def test_least_recently_used_copies_go_first(self):
+        for name in 'abcd':
+            self.save(f'https://{name}.example/', size=300, saved_at=1000)
+        self.assertEqual(len(self.cache), 3)  # a went to stay within 1000 bytes
+        self.cache.touch('https://b.example/', now=2000)
+        self.save('https://e.example/', size=300)
+        self.assertEqual(sorted(entry['url'] for entry in self.cache.entries.values()),
+                         ['https://b.example/', 'https://d.example/', 'https://e.example/'])
+        self.assertEqual(self.cache.total_bytes, 900)
+        self.assertEqual(self.cache.evicted, 2)
+        self.assertEqual(len([name for name in os.listdir(self.dir) if name.endswith('.mhtml')]), 3)
+        self.cache.set_budget(300)
+        self.cache.flush()
+        self.assertEqual([entry['url'] for entry in self.cache.entries.values()], ['https://e.example/'])
+
+    def test_saving_follows_the_policy_and_refresh_interval(self):
+        self.assertTrue(self.cache.due('https://a.example/'))
+        self.assertFalse(self.cache.due('file:///tmp/a.html'))
+        self.save('https://a.example/', saved_at=1000)
+        self.assertFalse(self.cache.due('https://a.example/', now=1000 + REFRESH_AFTER - 1))
+        self.assertTrue(self.cache.due('https://a.example/', now=1000 + REFRESH_AFTER))
+        self.cache.reserve('https://a.example/')
+        self.assertFalse(self.cache.due('https://a.example/', now=1000 + REFRESH_AFTER))  # Already being saved
+        self.cache.discard('https://a.example/')
+        self.assertTrue(self.cache.due('https://a.example/', now=1000 + REFRESH_AFTER))
+        self.cache.policy = 'bookmarked'
+        self.assertFalse(self.cache.due('https://b.example/'))
+        self.assertTrue(self.cache.due('https://b.example/', bookmarked=True))
+        self.cache.policy = 'off'
+        self.assertFalse(self.cache.due('https://b.example/', bookmarked=True))
+
+    def test_failed_and_oversized_saves_are_not_kept(self):
+        self.cache.reserve('https://missing.example/')
+        self.assertIsNone(self.commit('https://missing.example/'))
+        self.assertIsNone(self.save('https://empty.example/', size=0))
+        self.assertIsNone(self.save('https://huge.example/', size=1001))
+        self.assertIsNone(self.commit('https://never-reserved.example/'))
+        self.assertEqual(len(self.cache), 0)
+        self.assertFalse([name for name in os.listdir(self.dir) if name.endswith('.mhtml')])
+
+    def test_a_new_copy_replaces_the_old_one(self):
+        self.save('https://a.example/', size=200, title='Old')
+        entry = self.save('https://a.example/', size=400, title='New')
+        self.assertEqual((len(self.cache), self.cache.total_bytes, entry['title']), (1, 400, 'New'))
+        self.assertEqual(os.path.getsize(entry['path']), 400)
+
+    def test_reopening_keeps_copies_and_clears_leftovers(self):
+        self.save('https://a.example/', saved_at=1000)
+        self.save('https://b.example/', saved_at=1000)
+        self.cache.touch('https://a.example/', now=3000)
+        partial = self.cache.reserve('https://c.example/')
+        open(partial, 'wb').close()
+        open(os.path.join(self.dir, 'stray.mhtml'), 'wb').close()
+        os.remove(self.cache.find('https://b.example/')['path'])
+        self.cache.connection.close()  # Exits without close(), as a crash would
+
+        self.cache = SnapshotCache(self.dir, budget_bytes=1000)
+        self.assertEqual([entry['url'] for entry in self.cache.entries.values()], ['https://a.example/'])
+        self.assertEqual(self.cache.total_bytes, 100)
+        self.assertEqual(sorted(name for name in os.listdir(self.dir) if name.endswith('.mhtml')),
+                         [os.path.basename(self.cache.find('https://a.example/')['path'])])
+
+if __name__ == '__main__':
+    unittest.main()
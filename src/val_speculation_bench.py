@@ -0,0 +1,154 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Speculation payoff against local HTTP servers. Every page comes from an
+# origin of its own, served by a server that holds each new connection for
+# --handshake-ms, standing in for DNS, TCP and TLS setup. Each page is loaded
+# the three ways the URL bar can: cold, after a preconnect --lead-ms earlier
+# (about how long typing the rest of a URL takes), and from a prerender.
+# Times run from "Enter" to loadFinished.
+#
+#   python val_speculation_bench.py --pages 10 --handshake-ms 150 --lead-ms 300 [--json results.json]
+
+#imports
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from PyQt5.QtCore import QEventLoop, QTimer, QUrl, Qt, QCoreApplication
+from pagebench import FixtureServer, QuietHandler, fixture_site, distribution, FIXTURE_RULES
+
+MODES = ('cold', 'preconnect', 'prerender')
+LOAD_TIMEOUT = 30.0
+
+class HandshakeHandler(QuietHandler):
+    # Keep-alive, so only a new connection pays the handshake
+    protocol_version = 'HTTP/1.1'
+    handshake = 0.0
+
+    def setup(self):
+        time.sleep(self.handshake)
+        super().setup()
+
+def wait(seconds):
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+def wait_for_load(page, timeout=LOAD_TIMEOUT):
+    # The loadFinished result, or None on timeout
+    loop = QEventLoop()
+    result = []
+    def finished(ok):
+        result.append(ok)
+        loop.quit()
+    page.loadFinished.connect(finished)
+    QTimer.singleShot(int(timeout * 1000), loop.quit)
+    loop.exec_()
+    page.loadFinished.disconnect(finished)
+    return result[0] if result else None
+
+def cold(speculator, page, url, lead):
+    wait(lead)
+    started = time.perf_counter()
+    page.setUrl(QUrl(url))
+    return wait_for_load(page), time.perf_counter() - started
+
+def preconnected(speculator, page, url, lead):
+    speculator.preconnect([url])
+    wait(lead)
+    speculator.navigated(url)
+    started = time.perf_counter()
+    page.setUrl(QUrl(url))
+    return wait_for_load(page), time.perf_counter() - started
+
+def prerendered(speculator, page, url, lead):
+    speculator.prerender(url)
+    wait(lead)
+    started = time.perf_counter()
+    taken = speculator.take_prerender(url)
+    if taken is None:
+        return False, time.perf_counter() - started
+    taken_page, ok = taken
+    if ok is None:
+        ok = wait_for_load(taken_page)
+    elapsed = time.perf_counter() - started
+    taken_page.deleteLater()
+    return ok, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Val speculative preconnect/prerender benchmark')
+    parser.add_argument('--pages', type=int, default=10, help='pages (and origins) per mode')
+    parser.add_argument('--handshake-ms', type=float, default=150.0, help='delay every new connection this long')
+    parser.add_argument('--lead-ms', type=float, default=300.0, help='time between speculating and pressing Enter')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication([sys.argv[0]])
+    from filters import FilterEngine
+    from profiles import ProfileManager
+    from speculation import Speculator, Budget
+
+    HandshakeHandler.handshake = args.handshake_ms / 1000
+    lead = args.lead_ms / 1000
+    workdir = tempfile.TemporaryDirectory(prefix='val-speculation-bench-')
+    servers = []
+    try:
+        site = os.path.join(workdir.name, 'site')
+        path = fixture_site(site, 1)[0]
+        engine = FilterEngine.with_defaults()
+        engine.add_rules(FIXTURE_RULES)
+        profiles = ProfileManager(engine, os.path.join(workdir.name, 'profile'), os.path.join(workdir.name, 'cache'))
+        profiles.configure_cache(cache_mode='none')  # Connections are what is measured, not the cache
+        speculator = Speculator(lambda parent: profiles.new_page(False, parent), prerender_enabled=True)
+        # Budgets lifted, so every page is speculated on and the modes compare like for like
+        speculator.preconnect_budget = Budget(10 ** 6, 1.0)
+        speculator.prerender_budget = Budget(10 ** 6, 1.0)
+        page = profiles.new_page(False, None)
+
+        # Starts the renderer and network service, so the first measured load is not paying for them
+        warmup = FixtureServer(site, handler=HandshakeHandler)
+        servers.append(warmup)
+        cold(speculator, page, warmup.url(path), 0)
+
+        results = {}
+        for mode, run in zip(MODES, (cold, preconnected, prerendered)):
+            times, failed = [], 0
+            for _ in range(args.pages):
+                server = FixtureServer(site, handler=HandshakeHandler)  # A fresh origin, nothing pooled yet
+                servers.append(server)
+                ok, elapsed = run(speculator, page, server.url(path), lead)
+                if ok:
+                    times.append(elapsed * 1000)
+                else:
+                    failed += 1
+            results[mode] = {'failed': failed, 'enter_to_load_ms': distribution(times)}
+        results['speculator'] = speculator.report()
+        speculator.close()
+        page.deleteLater()
+    finally:
+        for server in servers:
+            server.close()
+        workdir.cleanup()
+
+    print(f'{args.pages} pages per mode, {args.handshake_ms:.0f} ms handshake, {args.lead_ms:.0f} ms lead')
+    for mode in MODES:
+        stats = results[mode]['enter_to_load_ms']
+        if stats is None:
+            print(f'{mode:12} all {results[mode]["failed"]} failed')
+        else:
+            print(f'{mode:12} p50 {stats["p50"]:8.1f} ms   p90 {stats["p90"]:8.1f} ms   max {stats["max"]:8.1f} ms   '
+                  f'({results[mode]["failed"]} failed)')
+    report = results['speculator']
+    print(f'{"hit rate":12} preconnect {report["preconnect_hit_rate"]:.0%}, prerender {report["prerender_hit_rate"]:.0%}')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# Copyright 2025 the Val authors
+# This project is governed under the GNU General Public License, v2.0. See in the LICENSE file.
+
+# Cold start benchmark: import time of val.py and time to first paint of the
+# main window under the offscreen Qt platform. Every run is a fresh process.
+#
+#   python val_startup_bench.py --runs 5 [--json results.json]
+
+#imports
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+HEAVY_MODULES = ['PyQt5.QtWebEngineWidgets', 'requests', 'psutil']
+
+IMPORT_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import val
+elapsed = time.perf_counter() - start
+print(json.dumps({"import": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+''' % (HEAVY_MODULES,)
+
+PAINT_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+import val
+imported = time.perf_counter()
+app = QApplication(sys.argv)
+window = val.Val()
+constructed = time.perf_counter()
+window.show()
+result = {}
+
+def poll():
+    if window.first_paint_time is not None and "first_paint" not in result:
+        result["first_paint"] = window.first_paint_time - start
+    if window.startup_finished:
+        result["startup_finished"] = time.perf_counter() - start
+        app.quit()
+
+timer = QTimer()
+timer.timeout.connect(poll)
+timer.start(1)
+QTimer.singleShot(%d, app.quit)
+app.exec_()
+result.update({"import": imported - start, "construct": constructed - imported})
+print(json.dumps(result))
+'''
+
+def run_probe(code, timeout_ms=30000):
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    # Keep the benchmark from touching the real profile, session and caches
+    env.setdefault('XDG_DATA_HOME', tempfile.mkdtemp(prefix='val-bench-'))
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, timeout=timeout_ms / 1000 + 10)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'probe failed')
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def summarize(samples, key):
+    values = [sample[key] for sample in samples if key in sample]
+    if not values:
+        return None
+    return {'median_ms': statistics.median(values) * 1000, 'min_ms': min(values) * 1000, 'max_ms': max(values) * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description='Val cold start benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=int, default=30000, help='per run, in milliseconds')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    imports = [run_probe(IMPORT_PROBE) for _ in range(args.runs)]
+    paints = [run_probe(PAINT_PROBE % args.timeout, args.timeout) for _ in range(args.runs)]
+
+    summary = {
+        'runs': args.runs,
+        'import': summarize(imports, 'import'),
+        'eager_heavy_modules': imports[-1]['loaded'],
+        'construct': summarize(paints, 'construct'),
+        'first_paint': summarize(paints, 'first_paint'),
+        'startup_finished': summarize(paints, 'startup_finished'),
+    }
+    for key in ('import', 'construct', 'first_paint', 'startup_finished'):
+        stats = summary[key]
+        if stats is None:
+            print(f'{key:18} n/a')
+        else:
+            print(f'{key:18} median {stats["median_ms"]:8.1f} ms   min {stats["min_ms"]:8.1f} ms   max {stats["max_ms"]:8.1f} ms')
+    print(f'{"heavy at import":18} {", ".join(summary["eager_heavy_modules"]) or "none"}')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import os
+import unittest
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication, QWidget, QTabWidget
+from PyQt5.QtCore import QCoreApplication, QEvent
+from tabs import TabPlaceholder, TabLifecycle, HibernationManager, is_placeholder, pick_tabs_to_discard
+
+class BlankView(QWidget):
+    # Just enough of a QWebEngineView for the lifecycle
+    def __init__(self, is_private, parent=None):
+        super().__init__(parent)
+        self.is_private = is_private
+        self.loaded = None
+
+    def setUrl(self, url):
+        self.loaded = url.toString()
+
+class RendererPage:
+    def __init__(self, pid):
+        self.pid = pid
+
+    def renderProcessPid(self):
+        return self.pid
+
+class RendererView(QWidget):
+    # A loaded tab with its renderer's pid
+    def __init__(self, pid, parent=None):
+        super().__init__(parent)
+        self.last_active = float(pid)
+        self.renderer = RendererPage(pid)
+
+    def page(self):
+        return self.renderer
+
+class Window(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.is_private_browsing = False
+        self.tab_widget = QTabWidget(self)
+        self.hibernated = []
+
+    def hibernate_tab(self, index):
+        self.hibernated.append(self.tab_widget.widget(index).renderer.pid)
+
+def process_deletes():
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+class TestTabs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_placeholder_keeps_url_and_title(self):
+        placeholder = TabPlaceholder('https://www.example.com', 'Example')
+        self.assertTrue(is_placeholder(placeholder))
+        self.assertEqual(placeholder.url().toString(), 'https://www.example.com')
+        self.assertEqual(placeholder.title(), 'Example')
+
+    def test_placeholder_title_defaults_to_url(self):
+        placeholder = TabPlaceholder('https://www.example.com')
+        self.assertEqual(placeholder.title(), 'https://www.example.com')
+
+    def test_discard_least_recently_used_first(self):
+        candidates = [(30.0, 100, 'c'), (10.0, 100, 'a'), (20.0, 100, 'b')]
+        self.assertEqual(pick_tabs_to_discard(candidates, 150), ['a', 'b'])
+
+    def test_discard_at_least_one(self):
+        self.assertEqual(pick_tabs_to_discard([(5.0, 0, 'a'), (1.0, 0, 'b')], 1), ['b', 'a'])
+        self.assertEqual(pick_tabs_to_discard([(5.0, 10, 'a')], 0), ['a'])
+        self.assertEqual(pick_tabs_to_discard([], 100), [])
+
+class TestHibernation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.window = Window()
+        for pid in (101, 102, 103):
+            self.window.tab_widget.addTab(RendererView(pid), f'Tab {pid}')
+        self.window.tab_widget.setCurrentIndex(2)
+        self.usage = {}
+        self.manager = HibernationManager(self.window, budget_mb=100, memory=lambda: self.usage)
+
+    def tearDown(self):
+        self.window.deleteLater()
+        process_deletes()
+
+    def test_only_tab_renderers_count_against_the_budget(self):
+        mb = 1024 * 1024
+        # GPU process, warm pool and prerender renderers together far over budget, tabs well under
+        self.usage = {1: 400 * mb, 2: 150 * mb, 3: 150 * mb, 101: 20 * mb, 102: 20 * mb, 103: 20 * mb}
+        for _ in range(3):
+            self.manager.check_memory()
+        self.assertEqual(self.window.hibernated, [])
+        self.usage[101] = 90 * mb
+        self.manager.check_memory()
+        self.assertEqual(self.window.hibernated, [101])
+
+class TestTabLifecycle(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.window = Window()
+        self.lifecycle = TabLifecycle(self.window, lambda is_private: BlankView(is_private, self.window), pool_size=2)
+
+    def tearDown(self):
+        self.lifecycle.close()
+        self.window.deleteLater()
+        process_deletes()
+
+    def test_new_views_come_from_the_warm_pool(self):
+        self.lifecycle.refill()
+        self.lifecycle.refill()
+        warm = list(self.lifecycle.warm[False])
+        self.assertEqual([view.loaded for view in warm], ['about:blank', 'about:blank'])
+        view = self.lifecycle.new_view(False)
+        self.assertIn(view, warm)
+        self.assertEqual((self.lifecycle.warm_hits, self.lifecycle.warm_misses), (1, 0))
+        self.assertTrue(self.lifecycle.refill_timer.isActive())
+        private = self.lifecycle.new_view(True)
+        self.assertTrue(private.is_private)
+        self.assertEqual(self.lifecycle.warm_misses, 1)
+
+    def test_views_out_of_use_leak_until_disposed(self):
+        kept = self.lifecycle.new_view(False)
+        closed = self.lifecycle.new_view(False)
+        dropped = self.lifecycle.new_view(False)
+        self.window.tab_widget.addTab(kept, 'kept')
+        self.lifecycle.dispose(closed)
+        self.assertEqual(self.lifecycle.audit(), 1)  # dropped was never disposed of
+        process_deletes()
+        self.assertEqual(len(self.lifecycle.live), 2)
+        self.lifecycle.dispose(dropped)
+        process_deletes()
+        self.assertEqual(self.lifecycle.audit(), 0)
+
+    def test_recently_closed_keeps_public_tabs_newest_first(self):
+        self.lifecycle.remember(TabPlaceholder('https://a.example/', 'A', history='aGlzdA==', scroll=[0, 40]), 3)
+        self.lifecycle.remember(TabPlaceholder('https://private.example/', is_private=True), 0)
+        self.lifecycle.remember(TabPlaceholder('https://b.example/'), 1)
+        self.assertEqual(self.lifecycle.pop_closed()['url'], 'https://b.example/')
+        self.assertEqual(self.lifecycle.pop_closed(), {'url': 'https://a.example/', 'title': 'A', 'history': 'aGlzdA==', 'scroll': [0, 40], 'index': 3})
+        self.assertIsNone(self.lifecycle.pop_closed())
+
+    def test_open_latency_is_the_recent_median(self):
+        self.assertEqual(self.lifecycle.open_latency_ms(), 0.0)
+        for seconds in (0.004, 0.001, 0.100):
+            self.lifecycle.record_open(seconds)
+        self.assertAlmostEqual(self.lifecycle.open_latency_ms(), 4.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import unittest
+from datetime import datetime
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication, QMainWindow
+from theme import ThemeEngine, scheduled_theme, next_transition, STYLESHEETS
+
+class TestSchedule(unittest.TestCase):
+    def test_scheduled_theme(self):
+        self.assertEqual(scheduled_theme(datetime(2025, 1, 1, 5, 59)), 'dark')
+        self.assertEqual(scheduled_theme(datetime(2025, 1, 1, 6, 0)), 'light')
+        self.assertEqual(scheduled_theme(datetime(2025, 1, 1, 17, 59)), 'light')
+        self.assertEqual(scheduled_theme(datetime(2025, 1, 1, 18, 0)), 'dark')
+
+    def test_next_transition(self):
+        self.assertEqual(next_transition(datetime(2025, 1, 1, 3, 0)), datetime(2025, 1, 1, 6, 0))
+        self.assertEqual(next_transition(datetime(2025, 1, 1, 6, 0)), datetime(2025, 1, 1, 18, 0))
+        self.assertEqual(next_transition(datetime(2025, 12, 31, 20, 0)), datetime(2026, 1, 1, 6, 0))
+
+class TestThemeEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.window = QMainWindow()
+        self.engine = ThemeEngine(self.window)
+        self.restyles = []
+        self.engine.changed.connect(self.restyles.append)
+
+    def test_restyles_only_on_change(self):
+        self.assertTrue(self.engine.apply('dark'))
+        self.assertFalse(self.engine.apply('dark'))
+        self.assertEqual(self.restyles, ['dark'])
+        self.assertEqual(self.window.styleSheet(), STYLESHEETS['dark'])
+
+    def test_schedule_arms_one_timer_for_the_next_transition(self):
+        self.engine.follow_schedule(datetime(2025, 1, 1, 17, 30))
+        self.assertEqual(self.engine.theme, 'light')
+        self.assertTrue(self.engine.timer.isSingleShot())
+        self.assertAlmostEqual(self.engine.timer.interval(), 30 * 60 * 1000, delta=10)
+        self.engine.follow_schedule(datetime(2025, 1, 1, 18, 0, 1))
+        self.engine.follow_schedule(datetime(2025, 1, 1, 23, 0))
+        self.assertEqual(self.restyles, ['light', 'dark'])
+
+if __name__ == '__main__':
+    unittest.main()
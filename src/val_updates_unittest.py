@@ -0,0 +1,88 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from updates import UpdateChecker, parse_version, is_newer
+
+class ReleasesHandler(BaseHTTPRequestHandler):
+    tag = '14.0.1528.15'
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        etag = f'"{self.tag}"'
+        ReleasesHandler.requests_seen.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({'tag_name': self.tag}).encode()
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class TestVersions(unittest.TestCase):
+    def test_parse_release_tags(self):
+        self.assertEqual(parse_version('14.0.1528.15'), (14, 0, 1528, 15))
+        self.assertEqual(parse_version('v13.0.5571.263'), (13, 0, 5571, 263))
+        with self.assertRaises(ValueError):
+            parse_version('nightly')
+
+    def test_numeric_comparison(self):
+        self.assertTrue(is_newer('14.0.1528.100', '14.0.1528.15'))
+        self.assertFalse(is_newer('13.0.5571.263', '14.0.1528.15'))
+        self.assertFalse(is_newer('14.0.1528.15', '14.0.1528.15'))
+        self.assertFalse(is_newer('14.0', '14.0.0.0'))
+
+class TestUpdateChecker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ReleasesHandler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}/latest?channel={{channel}}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        ReleasesHandler.tag = '14.0.1528.15'
+        ReleasesHandler.requests_seen = []
+        self.dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.dir, 'updates.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_fresh_cache_skips_network(self):
+        checker = UpdateChecker(self.cache_path, self.url)
+        self.assertFalse(checker.check('stable')['available'])
+        result = UpdateChecker(self.cache_path, self.url).check('stable')
+        self.assertTrue(result['cached'])
+        self.assertEqual(len(ReleasesHandler.requests_seen), 1)
+
+    def test_expired_cache_revalidates_with_etag(self):
+        checker = UpdateChecker(self.cache_path, self.url, ttl=0)
+        checker.check('stable')
+        result = checker.check('stable')
+        self.assertTrue(result['cached'])
+        self.assertEqual(ReleasesHandler.requests_seen, [None, '"14.0.1528.15"'])
+
+    def test_new_release_detected(self):
+        checker = UpdateChecker(self.cache_path, self.url, ttl=0)
+        checker.check('stable')
+        ReleasesHandler.tag = '14.0.1600.1'
+        result = checker.check('stable')
+        self.assertFalse(result['cached'])
+        self.assertTrue(result['available'])
+        self.assertEqual(result['latest'], '14.0.1600.1')
+
+if __name__ == '__main__':
+    unittest.main()